@@ -0,0 +1,611 @@
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from codigos import (CODIGO_DIRECCION, DELTA_FILA, DELTA_COLUMNA, ARRIBA, DERECHA, ABAJO, IZQUIERDA,
+                     celdas_transitables)
+from recorrido import TablasRecorrido
+from campos_distancia import perfil_movimiento
+
+# Celdas que rodean a una celda, en orden; las vecinas ortogonales quedan en las posiciones impares
+ANILLO = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+# Celdas que pueden visitar las búsquedas de IndiceAlcance._separar antes de reetiquetar la componente entera
+MAX_BUSQUEDA_SEPARACION = 20_000
+
+
+# %% Etiquetado
+def _unir(n, a, b, tipo):
+    """
+    Unión-búsqueda vectorizada sobre n nodos: padre[x] es la raíz (el menor índice) del conjunto de x tras
+    unir cada a[i] con b[i]. En cada vuelta la raíz mayor de cada par se cuelga de la menor y después se
+    comprime todo saltando de abuelo en abuelo (las raíces de los pares quedan a un paso).
+    """
+    padre = np.arange(n, dtype=tipo)
+    while len(a):
+        raiz_a, raiz_b = padre[a], padre[b]
+        distintas = raiz_a != raiz_b
+        a, b, raiz_a, raiz_b = a[distintas], b[distintas], raiz_a[distintas], raiz_b[distintas]
+        np.minimum.at(padre, np.maximum(raiz_a, raiz_b), np.minimum(raiz_a, raiz_b))
+        while True:
+            abuelo = padre[padre]
+            if np.array_equal(abuelo, padre):
+                break
+            padre = abuelo
+    return padre
+
+
+def etiquetar_grupos(transitable, libre, rango=1):
+    """
+    Grupos de celdas mutuamente alcanzables para un agente que gira y avanza hasta `rango` celdas.
+
+    Cada tramo recto se parte en cadenas por posición módulo rango (dentro de una cadena se va y se vuelve
+    de rango en rango); las cadenas de los dos extremos forman el núcleo del tramo, y al que llegan todas
+    las demás al chocar con un extremo. Una celda une su cadena horizontal con la vertical, así que los
+    grupos son uniones de cadenas y solo quedan, entre grupos, las aristas de salto hacia un núcleo.
+    Con rango 1 cada tramo es una sola cadena y los grupos son las componentes conexas.
+
+    Devuelve (grupo, origen, destino): grupo[celda] es la celda raíz de su grupo (-1 si no es transitable)
+    y (origen, destino) las aristas de salto entre grupos, sin repetir (vacías con rango 1).
+    """
+    n = transitable.size
+    ancho = transitable.shape[1]
+    tipo = np.int32 if n < np.iinfo(np.int32).max else np.int64
+    celdas = np.flatnonzero(transitable).astype(tipo, copy=False)
+    izquierda_de = libre[IZQUIERDA].ravel()
+
+    # Cadenas horizontales: el representante es la primera celda de la cadena (el inicio del tramo en el núcleo)
+    izquierda = izquierda_de[celdas].astype(tipo)
+    largo = izquierda + libre[DERECHA].ravel()[celdas] + 1
+    clase = izquierda % rango
+    nucleo = (clase == 0) | (clase == (largo - 1) % rango)
+    inicio = celdas - izquierda
+    representante = np.full(n, -1, dtype=tipo)
+    representante[celdas] = inicio + np.where(nucleo, 0, clase)
+    saltos = []
+    if rango > 1:
+        sueltas = ~nucleo & (izquierda < rango)  # Una celda por cadena fuera del núcleo
+        saltos.append((celdas[sueltas], inicio[sueltas]))
+    del izquierda, largo, clase, nucleo, inicio
+
+    # Cadenas verticales: pares de celdas de la misma cadena que unen cadenas horizontales
+    arriba = libre[ARRIBA].ravel()[celdas].astype(tipo)
+    abajo = libre[ABAJO].ravel()[celdas].astype(tipo)
+    if rango == 1:
+        a = celdas[abajo > 0]
+        b = a + ancho
+        # Si las celdas de la izquierda también son un par, las dos corridas ya quedan unidas por él
+        nuevo = (izquierda_de[a] == 0) | (izquierda_de[b] == 0)
+        a, b = a[nuevo], b[nuevo]
+    else:
+        siguiente = abajo >= rango
+        tope = (arriba == 0) & (abajo > 0)  # Une la cadena del extremo de arriba con la del de abajo
+        a = np.concatenate([celdas[siguiente], celdas[tope]])
+        b = np.concatenate([celdas[siguiente] + rango * ancho, celdas[tope] + abajo[tope] * ancho])
+        largo = arriba + abajo + 1
+        clase = arriba % rango
+        sueltas = (clase != 0) & (clase != (largo - 1) % rango) & (arriba < rango)
+        saltos.append((celdas[sueltas], celdas[sueltas] - arriba[sueltas] * ancho))
+        del largo, clase, sueltas
+    del arriba, abajo
+
+    # La unión se hace sobre índices densos de los representantes (uno por cadena horizontal)
+    es_representante = representante[celdas] == celdas
+    denso = np.full(n, -1, dtype=tipo)
+    denso[celdas[es_representante]] = np.arange(np.count_nonzero(es_representante), dtype=tipo)
+    padre = _unir(np.count_nonzero(es_representante), denso[representante[a]], denso[representante[b]], tipo)
+    del a, b
+    grupo = np.full(n, -1, dtype=tipo)
+    grupo[celdas] = celdas[es_representante][padre[denso[representante[celdas]]]]
+    del denso, es_representante
+    origen = np.concatenate([grupo[o] for o, _ in saltos]) if saltos else np.zeros(0, dtype=tipo)
+    destino = np.concatenate([grupo[d] for _, d in saltos]) if saltos else np.zeros(0, dtype=tipo)
+    distintos = origen != destino
+    origen, destino = np.divmod(np.unique(origen[distintos].astype(np.int64) * n + destino[distintos]), n)
+    return grupo, origen.astype(tipo), destino.astype(tipo)
+
+
+# %% Rango mayor que 1
+def _aristas_de(indices, nodos):
+    """Posiciones (en un grafo CSR) de todas las aristas que salen de `nodos`"""
+    cuantas = indices[nodos + 1] - indices[nodos]
+    return np.repeat(indices[nodos] - np.cumsum(cuantas) + cuantas, cuantas) + np.arange(cuantas.sum())
+
+
+def _componentes_fuertes(indices, destinos):
+    """
+    Componente fuertemente conexa de cada nodo de un grafo CSR (el identificador es uno de sus nodos).
+    Primero se descartan de forma vectorizada los nodos sin entrada o sin salida (no están en ningún ciclo)
+    y el algoritmo de Tarjan, iterativo, solo recorre lo que queda.
+    """
+    m = len(indices) - 1
+    componente = np.arange(m)
+    origenes = np.repeat(np.arange(m), np.diff(indices))
+    vivo = np.ones(m, dtype=bool)
+    activa = np.ones(len(destinos), dtype=bool)
+    while True:
+        muerto = vivo & ((np.bincount(destinos[activa], minlength=m) == 0)
+                         | (np.bincount(origenes[activa], minlength=m) == 0))
+        if not muerto.any():
+            break
+        vivo &= ~muerto
+        activa &= vivo[origenes] & vivo[destinos]
+    if not activa.any():
+        return componente
+
+    inicio = np.searchsorted(origenes[activa], np.arange(m + 1)).tolist()
+    siguientes = destinos[activa].tolist()
+    indice, bajo, pila, en_pila = {}, {}, [], set()
+    for raiz in np.flatnonzero(vivo).tolist():
+        if raiz in indice:
+            continue
+        indice[raiz] = bajo[raiz] = len(indice)
+        pila.append(raiz)
+        en_pila.add(raiz)
+        trabajo = [(raiz, inicio[raiz])]
+        while trabajo:
+            nodo, i = trabajo[-1]
+            if i < inicio[nodo + 1]:
+                trabajo[-1] = (nodo, i + 1)
+                siguiente = siguientes[i]
+                if siguiente not in indice:
+                    indice[siguiente] = bajo[siguiente] = len(indice)
+                    pila.append(siguiente)
+                    en_pila.add(siguiente)
+                    trabajo.append((siguiente, inicio[siguiente]))
+                elif siguiente in en_pila:
+                    bajo[nodo] = min(bajo[nodo], indice[siguiente])
+                continue
+            trabajo.pop()
+            if trabajo:
+                anterior = trabajo[-1][0]
+                bajo[anterior] = min(bajo[anterior], bajo[nodo])
+            if bajo[nodo] == indice[nodo]:
+                while True:
+                    miembro = pila.pop()
+                    en_pila.discard(miembro)
+                    componente[miembro] = nodo
+                    if miembro == nodo:
+                        break
+    return componente
+
+
+class _AlcanceRango:
+    """
+    Alcance entre grupos para un rango > 1. Los grupos unidos por un ciclo de saltos se juntan en un nodo
+    y queda un grafo acíclico, que casi siempre desemboca en un nodo principal (el que más saltos recibe).
+
+    - Se guarda qué nodos alcanza el principal: desde el principal, o desde un nodo que solo salta a él
+      (o a ninguno), la respuesta es inmediata.
+    - Desde los demás, alcanza recorre el grafo hasta el principal (con caché LRU de los recorridos) y
+      alcanzan propaga bits de alcance de cientos de orígenes a la vez, nivel a nivel del orden topológico.
+    """
+
+    def __init__(self, transitable, libre, rango, max_cache=4096, origenes_por_lote=512):
+        self.grupo, origen, destino = etiquetar_grupos(transitable, libre, rango)
+        self.grupos = np.unique(np.concatenate([origen, destino]))
+        origen, destino = np.searchsorted(self.grupos, origen), np.searchsorted(self.grupos, destino)
+        indices = np.searchsorted(origen, np.arange(len(self.grupos) + 1))
+        _, self.nodo_grupo = np.unique(_componentes_fuertes(indices, destino), return_inverse=True)
+        m = int(self.nodo_grupo.max()) + 1 if len(self.grupos) else 0
+        origen, destino = self.nodo_grupo[origen], self.nodo_grupo[destino]
+        distintos = origen != destino
+        origen, destino = np.divmod(np.unique(origen[distintos] * m + destino[distintos]), m)
+        self.indices = np.searchsorted(origen, np.arange(m + 1))
+        self.destinos = destino
+
+        # Niveles del orden topológico; las aristas se guardan agrupadas por el nivel de su origen
+        self.nivel = np.zeros(m, dtype=np.int64)
+        entrada = np.bincount(destino, minlength=m)
+        frente, k = np.flatnonzero(entrada == 0), 0
+        while len(frente):
+            self.nivel[frente] = k
+            salen = destino[_aristas_de(self.indices, frente)]
+            np.subtract.at(entrada, salen, 1)
+            frente, k = np.unique(salen[entrada[salen] == 0]), k + 1
+        orden = np.argsort(self.nivel[origen], kind='stable')
+        self._origen_nivel, self._destino_nivel = origen[orden], destino[orden]
+        self._cortes = np.searchsorted(self.nivel[self._origen_nivel], np.arange(k + 1))
+
+        self.principal = int(np.argmax(np.bincount(destino, minlength=m))) if m else -1
+        self.desde_principal = np.zeros(m, dtype=bool)
+        self.a_principal = np.zeros(m, dtype=bool)
+        self.solo_principal = np.ones(m, dtype=bool)
+        if m:
+            self.desde_principal[self._recorrer(self.principal)] = True
+            self.a_principal[origen[destino == self.principal]] = True
+            self.solo_principal[origen[destino != self.principal]] = False
+        self.max_cache = max_cache
+        self.origenes_por_lote = origenes_por_lote
+        self._cache = OrderedDict()
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.grupo, self.grupos, self.nodo_grupo, self.indices, self.destinos,
+                                      self.nivel, self._origen_nivel, self._destino_nivel, self.desde_principal,
+                                      self.a_principal, self.solo_principal))
+
+    def _recorrer(self, nodo, hasta_principal=False):
+        """Nodos alcanzables desde `nodo` (incluido), ordenados; con hasta_principal no se sigue desde él"""
+        visitado = {nodo}
+        frente = [nodo]
+        while frente:
+            nuevo = []
+            for actual in frente:
+                if hasta_principal and actual == self.principal:
+                    continue
+                for siguiente in self.destinos[self.indices[actual]:self.indices[actual + 1]].tolist():
+                    if siguiente not in visitado:
+                        visitado.add(siguiente)
+                        nuevo.append(siguiente)
+            frente = nuevo
+        return np.array(sorted(visitado), dtype=np.int64)
+
+    def _local(self, nodo):
+        """(nodos alcanzables sin pasar por el principal, si se llega al principal), con caché LRU"""
+        if nodo in self._cache:
+            self._cache.move_to_end(nodo)
+            return self._cache[nodo]
+        alcanzados = self._recorrer(nodo, hasta_principal=True)
+        i = np.searchsorted(alcanzados, self.principal)
+        resultado = (alcanzados, bool(i < len(alcanzados) and alcanzados[i] == self.principal))
+        self._cache[nodo] = resultado
+        if len(self._cache) > self.max_cache:
+            self._cache.popitem(last=False)
+        return resultado
+
+    def _bits(self, origenes):
+        """bits[nodo, j // 64] >> (j % 64) & 1: si desde origenes[j] (sin repetir) se llega al nodo"""
+        j = np.arange(len(origenes))
+        bits = np.zeros((len(self.nivel), (len(origenes) + 63) // 64), dtype=np.uint64)
+        bits[origenes, j // 64] = np.uint64(1) << (j % 64).astype(np.uint64)
+        for k in range(self.nivel[origenes].min(), len(self._cortes) - 1):
+            a, b = self._cortes[k], self._cortes[k + 1]
+            np.bitwise_or.at(bits, self._destino_nivel[a:b], bits[self._origen_nivel[a:b]])
+        return bits
+
+    def _nodos_de(self, celdas):
+        """Nodo de cada celda transitable (-1 si su grupo no tiene saltos)"""
+        grupos = self.grupo[celdas]
+        i = np.minimum(np.searchsorted(self.grupos, grupos), len(self.grupos) - 1)
+        return np.where(self.grupos[i] == grupos, self.nodo_grupo[i], -1)
+
+    def alcanza(self, origen, destino):
+        """Si desde la celda transitable `origen` se llega a la celda transitable `destino`"""
+        if self.grupo[origen] == self.grupo[destino]:
+            return True
+        if not len(self.grupos):
+            return False
+        o, d = self._nodos_de(np.array([origen, destino])).tolist()
+        if o < 0 or d < 0:
+            return False
+        if o == d or (o == self.principal and self.desde_principal[d]):
+            return True
+        if self.solo_principal[o]:
+            return bool(self.a_principal[o] and self.desde_principal[d])
+        alcanzados, pasa = self._local(o)
+        i = np.searchsorted(alcanzados, d)
+        return bool((i < len(alcanzados) and alcanzados[i] == d) or (pasa and self.desde_principal[d]))
+
+    def alcanzan(self, origenes, destinos):
+        """Versión por lotes de alcanza"""
+        resultado = self.grupo[origenes] == self.grupo[destinos]
+        if not len(self.grupos):
+            return resultado
+        o, d = self._nodos_de(origenes), self._nodos_de(destinos)
+        pendiente = ~resultado & (o >= 0) & (d >= 0)
+        resultado |= pendiente & (o == d)
+        llega = pendiente & self.desde_principal[d]
+        principal = o == self.principal
+        resultado |= llega & (principal | (self.solo_principal[o] & self.a_principal[o]))
+        resto = np.flatnonzero(pendiente & (o != d) & ~principal & ~self.solo_principal[o])
+        if len(resto):
+            unicos, columna = np.unique(o[resto], return_inverse=True)
+            orden = np.argsort(columna, kind='stable')
+            resto, columna = resto[orden], columna[orden]
+            lote = self.origenes_por_lote
+            cortes = np.searchsorted(columna, np.arange(0, len(unicos) + lote, lote))
+            for k, inicio in enumerate(range(0, len(unicos), lote)):
+                consulta, j = resto[cortes[k]:cortes[k + 1]], columna[cortes[k]:cortes[k + 1]] - inicio
+                bits = self._bits(unicos[inicio:inicio + lote])
+                resultado[consulta] = (bits[d[consulta], j // 64] >> (j % 64).astype(np.uint64)) & np.uint64(1) == 1
+        return resultado
+
+
+# %% Índice
+class IndiceAlcance:
+    """
+    Qué celdas se alcanzan desde cuáles, para validar al instante inicio y objetivo según las habilidades
+    del agente (sin planificar).
+
+    - Con rango 1 y algún giro (tres giros a la derecha equivalen a uno a la izquierda) el movimiento es
+      simétrico: se alcanza justo la componente conexa. Las componentes se etiquetan de forma vectorizada y
+      se mantienen con una unión-búsqueda sobre las etiquetas: actualizar_celda une al abrir una celda y, al
+      cerrarla, si el anillo de celdas que la rodea no mantiene unidas a sus vecinas, busca si se separó
+      algún trozo (ver _separar).
+    - Con rango > 1 (el agente se pasa de largo o choca antes) el alcance es dirigido: ver etiquetar_grupos
+      y _AlcanceRango. Se construye al primer uso de cada rango y se descarta al editar el mapa.
+    - Sin giros el agente solo avanza en línea recta: se resuelve con las tablas de recorrido.
+
+    alcanzable responde un par; alcanzables, arreglos de millones de pares.
+    """
+
+    def __init__(self, laberinto, tablas=None, max_cache=4096):
+        self.laberinto = np.asarray(laberinto)
+        self.alto, self.ancho = self.laberinto.shape
+        self.tablas = tablas if tablas is not None else TablasRecorrido(self.laberinto)
+        self.tipo_celda = np.int32 if self.laberinto.size < np.iinfo(np.int32).max else np.int64
+        self.max_cache = max_cache
+        self._paso_celda = DELTA_FILA * self.ancho + DELTA_COLUMNA
+        self.reconstruir()
+
+    # %% Construcción
+    def reconstruir(self):
+        """Recalcula todas las componentes"""
+        self.etiqueta, _, _ = etiquetar_grupos(celdas_transitables(self.laberinto), self.tablas.libre)
+        self.padre = np.arange(self.laberinto.size, dtype=self.tipo_celda)  # Cada etiqueta es su propia raíz
+        self._etiquetas = self.laberinto.size  # Etiquetas en uso en padre
+        self._sin_comprimir = False
+        self._rangos = {}
+
+    @property
+    def nbytes(self):
+        return self.etiqueta.nbytes + self.padre.nbytes + sum(r.nbytes for r in self._rangos.values())
+
+    def _nuevas_etiquetas(self, cuantas):
+        primera, fin = self._etiquetas, self._etiquetas + cuantas
+        if fin > len(self.padre):
+            padre = np.empty(max(fin, 2 * len(self.padre)), dtype=self.tipo_celda)
+            padre[:len(self.padre)] = self.padre
+            self.padre = padre
+        self.padre[primera:fin] = np.arange(primera, fin)
+        self._etiquetas = fin
+        return np.arange(primera, fin, dtype=self.tipo_celda)
+
+    def _raiz(self, etiqueta):
+        """Raíz de una etiqueta, comprimiendo el camino"""
+        padre = self.padre
+        raiz = etiqueta = int(etiqueta)
+        while padre[raiz] != raiz:
+            raiz = int(padre[raiz])
+        while padre[etiqueta] != raiz:
+            padre[etiqueta], etiqueta = raiz, int(padre[etiqueta])
+        return raiz
+
+    def _comprimir(self):
+        """Deja padre apuntando directamente a las raíces (para las consultas por lotes)"""
+        if self._sin_comprimir:
+            padre = self.padre[:self._etiquetas]
+            while True:
+                abuelo = padre[padre]
+                if np.array_equal(abuelo, padre):
+                    break
+                padre[:] = abuelo
+            self._sin_comprimir = False
+
+    def _raices(self, celdas):
+        self._comprimir()
+        etiquetas = self.etiqueta[celdas]
+        return np.where(etiquetas >= 0, self.padre[etiquetas], -1)
+
+    def componente(self, fila, columna):
+        """Identificador de la componente conexa de la celda (-1 si no es transitable)"""
+        etiqueta = self.etiqueta[fila * self.ancho + columna]
+        return self._raiz(etiqueta) if etiqueta >= 0 else -1
+
+    @property
+    def num_componentes(self):
+        raices = self._raices(np.flatnonzero(self.etiqueta >= 0))
+        marcadas = np.zeros(self._etiquetas, dtype=bool)
+        marcadas[raices] = True
+        return int(marcadas.sum())
+
+    def _rango(self, rango):
+        modelo = self._rangos.get(rango)
+        if modelo is None:
+            modelo = self._rangos[rango] = _AlcanceRango(celdas_transitables(self.laberinto), self.tablas.libre,
+                                                         rango, self.max_cache)
+        return modelo
+
+    # %% Edición
+    def actualizar_celda(self, fila, columna):
+        """Corrige las componentes tras editar una celda (con las tablas de recorrido ya corregidas)"""
+        self._rangos.clear()
+        celda = fila * self.ancho + columna
+        abierta = bool(celdas_transitables(self.laberinto[fila:fila + 1, columna:columna + 1])[0, 0])
+        vecinas = [celda + int(self._paso_celda[d]) for d in range(4) if self.tablas.distancia(fila, columna, d) > 0]
+        antes = int(self.etiqueta[celda])
+        if abierta and antes < 0:
+            raices = sorted({self._raiz(self.etiqueta[vecina]) for vecina in vecinas})
+            if not raices:
+                raices = [int(self._nuevas_etiquetas(1)[0])]
+            for otra in raices[1:]:
+                self.padre[otra] = raices[0]
+                self._sin_comprimir = True
+            self.etiqueta[celda] = raices[0]
+        elif not abierta and antes >= 0:
+            self.etiqueta[celda] = -1
+            if len(vecinas) > 1 and not self._unidas_alrededor(fila, columna):
+                self._separar(vecinas, self._raiz(antes))
+
+    def _unidas_alrededor(self, fila, columna):
+        """Si las vecinas transitables de la celda siguen unidas por el anillo de ocho celdas que la rodea"""
+        libres = [0 <= fila + df < self.alto and 0 <= columna + dc < self.ancho
+                  and self.etiqueta[(fila + df) * self.ancho + columna + dc] >= 0 for df, dc in ANILLO]
+        if all(libres):
+            return True
+        # Tramos de celdas libres seguidas del anillo que contienen alguna vecina
+        primera = libres.index(False)
+        tramos, con_vecina = 0, False
+        for i in range(1, 9):
+            j = (primera + i) % 8
+            if libres[j]:
+                con_vecina |= j % 2 == 1
+            else:
+                tramos += con_vecina
+                con_vecina = False
+        return tramos <= 1
+
+    def _separar(self, vecinas, raiz):
+        """
+        Tras cerrar una celda, busca en anchura desde cada vecina, por turnos: las búsquedas que se encuentran
+        siguen unidas y la que se agota sin encontrar otra es un trozo separado, que recibe etiqueta nueva.
+        El coste depende del trozo más pequeño; si se pasa de MAX_BUSQUEDA_SEPARACION, se reetiqueta todo.
+        """
+        dueno = {vecina: i for i, vecina in enumerate(vecinas)}
+        unida = list(range(len(vecinas)))  # Búsqueda con la que se juntó cada una
+        frentes = [deque([vecina]) for vecina in vecinas]
+        visitadas = [[vecina] for vecina in vecinas]
+        abiertas = list(range(len(vecinas)))
+        pasos = 0
+        while len(abiertas) > 1:
+            if pasos > MAX_BUSQUEDA_SEPARACION:
+                self._reetiquetar(raiz)
+                return
+            for i in list(abiertas):
+                if unida[i] != i:
+                    continue
+                if not frentes[i]:
+                    self.etiqueta[visitadas[i]] = self._nuevas_etiquetas(1)[0]
+                    abiertas.remove(i)
+                    continue
+                celda = frentes[i].popleft()
+                pasos += 1
+                fila, columna = divmod(celda, self.ancho)
+                for d in range(4):
+                    if self.tablas.libre[d, fila, columna] == 0:
+                        continue
+                    siguiente = celda + int(self._paso_celda[d])
+                    j = dueno.get(siguiente)
+                    if j is None:
+                        dueno[siguiente] = i
+                        frentes[i].append(siguiente)
+                        visitadas[i].append(siguiente)
+                        continue
+                    while unida[j] != j:
+                        j = unida[j]
+                    if j != i:
+                        unida[j] = i
+                        frentes[i].extend(frentes[j])
+                        visitadas[i].extend(visitadas[j])
+                        abiertas.remove(j)
+            abiertas = [i for i in abiertas if unida[i] == i]
+
+    def _reetiquetar(self, raiz):
+        """Reetiqueta la componente `raiz`, que puede haberse partido, dentro del rectángulo que la contiene"""
+        celdas = np.flatnonzero(self._raices(np.arange(self.laberinto.size)) == raiz)
+        if not len(celdas):
+            return
+        filas, columnas = np.divmod(celdas, self.ancho)
+        f0, f1, c0, c1 = filas.min(), filas.max() + 1, columnas.min(), columnas.max() + 1
+        mascara = np.zeros((f1 - f0, c1 - c0), dtype=bool)
+        mascara[filas - f0, columnas - c0] = True
+        # Los tramos de la componente no salen del rectángulo: las tablas globales sirven recortadas
+        grupo, _, _ = etiquetar_grupos(mascara, self.tablas.libre[:, f0:f1, c0:c1])
+        grupos, inversa = np.unique(grupo[(filas - f0) * (c1 - c0) + columnas - c0], return_inverse=True)
+        if len(grupos) > 1:
+            self.etiqueta[celdas] = self._nuevas_etiquetas(len(grupos))[inversa]
+
+    # %% Consultas
+    def _estado(self, estado):
+        """(fila, columna, dirección) de un Estado o de una tupla (fila, columna[, dirección]); None: cualquiera"""
+        if hasattr(estado, 'codigo_direccion'):
+            return estado.fila, estado.columna, estado.codigo_direccion
+        direccion = estado[2] if len(estado) > 2 else None
+        return int(estado[0]), int(estado[1]), CODIGO_DIRECCION.get(direccion, direccion)
+
+    def _en_linea(self, fila, columna, direccion, fila_objetivo, columna_objetivo, rango):
+        """Sin giros: si avanzando en `direccion` se para en el objetivo (de rango en rango o al chocar)"""
+        t = (fila_objetivo - fila) * DELTA_FILA[direccion] + (columna_objetivo - columna) * DELTA_COLUMNA[direccion]
+        if t <= 0 or (fila + t * DELTA_FILA[direccion], columna + t * DELTA_COLUMNA[direccion]) != (
+                fila_objetivo, columna_objetivo):
+            return False
+        largo = self.tablas.distancia(fila, columna, direccion)
+        return bool(t <= largo and (t % rango == 0 or t == largo))
+
+    def _alcanza(self, origen, destino, rango):
+        if rango == 1:
+            return self._raiz(self.etiqueta[origen]) == self._raiz(self.etiqueta[destino])
+        return self._rango(rango).alcanza(origen, destino)
+
+    def _aterrizajes(self, fila, columna, rango):
+        """Celdas a las que se llega con el primer avance desde una celda no transitable (montaña)"""
+        for d in range(4):
+            pasos = min(rango, self.tablas.distancia(fila, columna, d))
+            if pasos:
+                yield (fila + pasos * int(DELTA_FILA[d])) * self.ancho + columna + pasos * int(DELTA_COLUMNA[d])
+
+    def alcanzable(self, inicio, objetivo, habilidades=None):
+        """
+        Si un agente con esas habilidades puede llegar de inicio a objetivo (Estado o (fila, columna[, dirección])).
+        Sin dirección en el inicio vale cualquiera; en el objetivo, solo cuenta si el agente no puede girar.
+        """
+        puede_izquierda, puede_derecha, rango = perfil_movimiento(habilidades or {})
+        fila, columna, direccion = self._estado(inicio)
+        fila_objetivo, columna_objetivo, direccion_objetivo = self._estado(objetivo)
+        if not (0 <= fila < self.alto and 0 <= columna < self.ancho
+                and 0 <= fila_objetivo < self.alto and 0 <= columna_objetivo < self.ancho):
+            return False
+        if self.laberinto[fila, columna] == 0:  # Desde una pared no se sale
+            return False
+        gira = puede_izquierda or puede_derecha
+        if not gira:
+            return any((direccion_objetivo is None or direccion_objetivo == d) and (
+                (fila, columna) == (fila_objetivo, columna_objetivo)
+                or self._en_linea(fila, columna, d, fila_objetivo, columna_objetivo, rango))
+                for d in (range(4) if direccion is None else (direccion,)))
+        if (fila, columna) == (fila_objetivo, columna_objetivo):
+            return True
+        destino = fila_objetivo * self.ancho + columna_objetivo
+        if self.etiqueta[destino] < 0:
+            return False
+        origen = fila * self.ancho + columna
+        if self.etiqueta[origen] >= 0:
+            return self._alcanza(origen, destino, rango)
+        return any(self._alcanza(c, destino, rango) for c in self._aterrizajes(fila, columna, rango))
+
+    def alcanzables(self, inicios, objetivos, habilidades=None):
+        """
+        Versión por lotes de alcanzable: inicios y objetivos son arreglos (n, 2) o (n, 3) de (fila, columna[,
+        código de dirección]); una dirección negativa vale cualquiera. Devuelve un arreglo de n booleanos.
+        """
+        puede_izquierda, puede_derecha, rango = perfil_movimiento(habilidades or {})
+        inicios = np.asarray(inicios, dtype=np.int64).reshape(len(inicios), -1)
+        objetivos = np.asarray(objetivos, dtype=np.int64).reshape(len(objetivos), -1)
+        sin_direccion = np.full(len(inicios), -1, dtype=np.int64)
+        fila, columna = inicios[:, 0], inicios[:, 1]
+        direccion = inicios[:, 2] if inicios.shape[1] > 2 else sin_direccion
+        fila_objetivo, columna_objetivo = objetivos[:, 0], objetivos[:, 1]
+        direccion_objetivo = objetivos[:, 2] if objetivos.shape[1] > 2 else sin_direccion
+
+        dentro = ((fila >= 0) & (fila < self.alto) & (columna >= 0) & (columna < self.ancho) & (fila_objetivo >= 0)
+                  & (fila_objetivo < self.alto) & (columna_objetivo >= 0) & (columna_objetivo < self.ancho))
+        fila, columna = np.where(dentro, fila, 0), np.where(dentro, columna, 0)
+        fila_objetivo, columna_objetivo = np.where(dentro, fila_objetivo, 0), np.where(dentro, columna_objetivo, 0)
+        dentro &= self.laberinto[fila, columna] != 0  # Desde una pared no se sale
+        misma = dentro & (fila == fila_objetivo) & (columna == columna_objetivo)
+        resultado = np.zeros(len(inicios), dtype=bool)
+
+        if not (puede_izquierda or puede_derecha):
+            for d in range(4):
+                t = (fila_objetivo - fila) * DELTA_FILA[d] + (columna_objetivo - columna) * DELTA_COLUMNA[d]
+                en_rayo = ((t > 0) & (fila + t * DELTA_FILA[d] == fila_objetivo)
+                           & (columna + t * DELTA_COLUMNA[d] == columna_objetivo))
+                largo = self.tablas.libre[d, fila, columna].astype(np.int64)
+                para = misma | (en_rayo & (t <= largo) & ((t % rango == 0) | (t == largo)))
+                resultado |= (dentro & para & ((direccion < 0) | (direccion == d))
+                              & ((direccion_objetivo < 0) | (direccion_objetivo == d)))
+            return resultado
+
+        origen = fila * self.ancho + columna
+        destino = fila_objetivo * self.ancho + columna_objetivo
+        resultado[misma] = True
+        abierto = dentro & ~misma & (self.etiqueta[destino] >= 0)
+        directo = abierto & (self.etiqueta[origen] >= 0)
+        if rango == 1:
+            resultado[directo] = self._raices(origen[directo]) == self._raices(destino[directo])
+        else:
+            resultado[directo] = self._rango(rango).alcanzan(origen[directo], destino[directo])
+        for i in np.flatnonzero(abierto & ~directo).tolist():  # Inicio en montaña (las paredes ya se descartaron)
+            resultado[i] = any(self._alcanza(c, int(destino[i]), rango)
+                               for c in self._aterrizajes(int(fila[i]), int(columna[i]), rango))
+        return resultado
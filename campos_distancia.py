@@ -0,0 +1,177 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from codigos import ACCIONES, AVANZAR, GIRAR_IZQUIERDA, GIRAR_DERECHA, CODIGO_DIRECCION
+from planificador import Planificador, INFINITO
+
+
+def huella_laberinto(laberinto):
+    """Hash del contenido del laberinto (forma, tipo y celdas)"""
+    laberinto = np.ascontiguousarray(laberinto)
+    huella = hashlib.blake2b(digest_size=16)
+    huella.update(repr((laberinto.shape, laberinto.dtype.str)).encode())
+    huella.update(memoryview(laberinto).cast('B'))
+    return huella.hexdigest()
+
+
+def perfil_movimiento(habilidades):
+    """Las únicas habilidades que cambian las transiciones (y por tanto las distancias)"""
+    return (bool(habilidades.get('puede_girar_izquierda', True)),
+            bool(habilidades.get('puede_girar_derecha', True)),
+            int(habilidades.get('rango_movimiento', 1)))
+
+
+# %% Campo de distancias
+class CampoDistancia:
+    """
+    Coste óptimo y primera acción óptima hacia un objetivo desde cada estado (fila, columna, direccion).
+    No guarda el Planificador ni sus tablas (que cambian al editar el laberinto): solo las distancias, las
+    acciones y los primeros avances desde las montañas, todo contado en nbytes.
+    """
+
+    def __init__(self, distancia, accion, planificador, costos):
+        self.distancia = distancia
+        self.accion = accion
+        self.ancho = planificador.ancho
+        self.giros = [(codigo, giro) for codigo, puede, giro in ((GIRAR_IZQUIERDA, planificador.puede_girar_izquierda, 3),
+                                                                 (GIRAR_DERECHA, planificador.puede_girar_derecha, 1))
+                      if puede]
+
+        # Primer avance (estado de llegada y coste) desde cada dirección de cada celda de montaña
+        self.montanas = np.flatnonzero(planificador.laberinto.ravel() == 5).astype(planificador.tipo_indice)
+        estados = (self.montanas.astype(np.int64)[:, None] * 4 + np.arange(4)).ravel()
+        vecinos, costes, acciones, origen = planificador.sucesores(estados, costos)
+        avances = acciones == AVANZAR
+        self.avance = np.full(len(estados), -1, dtype=planificador.tipo_indice)
+        self.avance[origen[avances]] = vecinos[avances]
+        self.costo_avance = np.zeros(len(estados), dtype=np.int32)
+        self.costo_avance[origen[avances]] = costes[avances]
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.distancia, self.accion, self.montanas, self.avance, self.costo_avance))
+
+    def _indice(self, fila, columna, direccion):
+        return (fila * self.ancho + columna) * 4 + CODIGO_DIRECCION.get(direccion, direccion)
+
+    def distancia_desde(self, estado):
+        """Coste óptimo hasta el objetivo, o None si no se puede llegar"""
+        distancia = int(self.distancia[self._indice(estado.fila, estado.columna, estado.direccion)])
+        if distancia >= INFINITO:
+            return self._un_paso(estado)[0]
+        return distancia
+
+    def siguiente_accion(self, estado):
+        """Nombre de la mejor acción desde el estado ('avanzar', 'girar_izquierda'...), None si ya se llegó o no hay camino"""
+        indice = self._indice(estado.fila, estado.columna, estado.direccion)
+        if self.distancia[indice] >= INFINITO:
+            return self._un_paso(estado)[1]
+        codigo = self.accion[indice]
+        return ACCIONES[codigo] if codigo >= 0 else None
+
+    def _un_paso(self, estado):
+        """
+        Estados sobre montañas (por ejemplo, al empezar sobre una) no aparecen en la búsqueda
+        hacia atrás: se prueban los giros posibles en la celda y el primer avance.
+        """
+        celda = estado.fila * self.ancho + estado.columna
+        posicion = int(np.searchsorted(self.montanas, celda))
+        if posicion == len(self.montanas) or self.montanas[posicion] != celda:
+            return None, None
+        inicial = CODIGO_DIRECCION.get(estado.direccion, estado.direccion)
+        # (coste de girar hasta la dirección, primera acción) para cada dirección alcanzable en la celda
+        giros = {inicial: (0, None)}
+        pendientes = [inicial]
+        while pendientes:
+            direccion = pendientes.pop(0)
+            coste, primera = giros[direccion]
+            for codigo, giro in self.giros:
+                nueva = (direccion + giro) & 3
+                if nueva not in giros:
+                    giros[nueva] = (coste + 1, primera or ACCIONES[codigo])
+                    pendientes.append(nueva)
+
+        mejor, mejor_accion = INFINITO, None
+        for direccion, (coste, primera) in giros.items():
+            vecino = int(self.avance[posicion * 4 + direccion])
+            if vecino >= 0:
+                total = coste + int(self.costo_avance[posicion * 4 + direccion]) + int(self.distancia[vecino])
+                if total < mejor:
+                    mejor, mejor_accion = total, primera or 'avanzar'
+        if mejor >= INFINITO:
+            return None, None
+        return mejor, mejor_accion
+
+    def distancias(self, filas, columnas, direcciones):
+        """Versión vectorizada de distancia_desde (sin el caso especial de celdas no transitables)"""
+        return self.distancia[(np.asarray(filas) * self.ancho + np.asarray(columnas)) * 4 + np.asarray(direcciones)]
+
+
+# %% Caché LRU
+class CacheCamposDistancia:
+    """
+    Campos de distancia indexados por (huella del laberinto, objetivo, perfil de movimiento, costes).
+    La memoria está acotada: al superar max_bytes o max_campos se descarta el campo menos usado.
+    """
+
+    def __init__(self, max_bytes=512 * 2 ** 20, max_campos=32):
+        self.max_bytes = max_bytes
+        self.max_campos = max_campos
+        self.campos = OrderedDict()
+        self.bytes_usados = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def __len__(self):
+        return len(self.campos)
+
+    def obtener(self, laberinto, objetivo, habilidades, costos='terreno', solo_posicion=False, tablas=None,
+                huella=None):
+        """Devuelve el campo hacia `objetivo` (Estado o tupla), calculándolo solo si no está en la caché"""
+        if huella is None:
+            huella = huella_laberinto(laberinto)
+        fila, columna, direccion = (objetivo if isinstance(objetivo, tuple)
+                                    else (objetivo.fila, objetivo.columna, objetivo.direccion))
+        direccion = None if solo_posicion else CODIGO_DIRECCION.get(direccion, direccion)
+        clave = (huella, (fila, columna, direccion), perfil_movimiento(habilidades), costos)
+
+        campo = self.campos.get(clave)
+        if campo is not None:
+            self.campos.move_to_end(clave)
+            self.aciertos += 1
+            return campo
+
+        self.fallos += 1
+        planificador = Planificador(laberinto, habilidades, tablas)
+        distancia, accion = planificador.explorar_hacia([(fila, columna, direccion or 0)], costos, solo_posicion)
+        campo = CampoDistancia(distancia, accion, planificador, costos)
+        self.campos[clave] = campo
+        self.bytes_usados += campo.nbytes
+        self._desalojar()
+        return campo
+
+    def _desalojar(self):
+        # El campo recién calculado se conserva aunque por sí solo supere el límite
+        while len(self.campos) > 1 and (self.bytes_usados > self.max_bytes or len(self.campos) > self.max_campos):
+            _, campo = self.campos.popitem(last=False)
+            self.bytes_usados -= campo.nbytes
+            self.desalojos += 1
+
+    def limpiar(self):
+        self.campos.clear()
+        self.bytes_usados = 0
+
+
+# Caché compartida por el proceso: sobrevive a los reinicios del juego, que solo reconstruyen el Problema
+CACHE_CAMPOS = CacheCamposDistancia()
+
+
+def campo_para(problema, objetivo=None, costos='terreno', solo_posicion=False, cache=None):
+    """Campo de distancias hacia un objetivo de un Problema (por defecto, el primero)"""
+    cache = cache if cache is not None else CACHE_CAMPOS
+    objetivo = objetivo if objetivo is not None else problema.estados_objetivos[0]
+    return cache.obtener(problema.laberinto, objetivo, problema.agente.habilidades, costos, solo_posicion,
+                         tablas=problema.tablas, huella=problema.huella)
@@ -0,0 +1,50 @@
+import numpy as np
+
+# %% Direcciones
+# Codificadas en sentido horario: girar a la derecha suma 1 y girar a la izquierda resta 1 (módulo 4)
+DIRECCIONES = ('arriba', 'derecha', 'abajo', 'izquierda')
+ARRIBA, DERECHA, ABAJO, IZQUIERDA = range(4)
+CODIGO_DIRECCION = {nombre: codigo for codigo, nombre in enumerate(DIRECCIONES)}
+
+# Desplazamiento (fila, columna) de un paso en cada dirección
+DESPLAZAMIENTOS = ((-1, 0), (0, 1), (1, 0), (0, -1))
+DELTA_FILA = np.array([d[0] for d in DESPLAZAMIENTOS], dtype=np.int64)
+DELTA_COLUMNA = np.array([d[1] for d in DESPLAZAMIENTOS], dtype=np.int64)
+
+GIRO_IZQUIERDA = np.array([(d - 1) % 4 for d in range(4)], dtype=np.int8)
+GIRO_DERECHA = np.array([(d + 1) % 4 for d in range(4)], dtype=np.int8)
+
+# %% Estados empaquetados
+# (fila, columna, dirección) en un solo entero: fila << 32 | columna << 2 | dirección.
+# Sirve como clave de diccionario y también opera sobre arreglos de NumPy de tipo int64.
+BITS_COLUMNA = 30
+MASCARA_COLUMNA = (1 << BITS_COLUMNA) - 1
+
+
+def empaquetar_estado(fila, columna, direccion):
+    """Empaqueta un estado (o arreglos de estados) en un entero"""
+    return (fila << (BITS_COLUMNA + 2)) | (columna << 2) | direccion
+
+
+def desempaquetar_estado(clave):
+    """Inversa de empaquetar_estado: devuelve (fila, columna, direccion)"""
+    return clave >> (BITS_COLUMNA + 2), (clave >> 2) & MASCARA_COLUMNA, clave & 3
+
+
+# %% Acciones
+ACCIONES = ('avanzar', 'girar_izquierda', 'girar_derecha', 'sensar', 'vision_omni')
+AVANZAR, GIRAR_IZQUIERDA, GIRAR_DERECHA, SENSAR, VISION_OMNI = range(5)
+NINGUNA = -1  # El agente no actúa en este paso
+CODIGO_ACCION = {nombre: codigo for codigo, nombre in enumerate(ACCIONES)}
+
+# %% Terreno
+CELDAS_BLOQUEANTES = (0, 5)  # Pared y montaña
+ALCANCE_VISION_LEJANA = 3
+ALCANCE_OMNI = 3
+COOLDOWN_OMNI = 5
+
+
+def celdas_transitables(laberinto):
+    """Máscara booleana de las celdas por las que se puede pasar (ni pared ni montaña)"""
+    laberinto = np.asarray(laberinto)
+    return (laberinto != 0) & (laberinto != 5)
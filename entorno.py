@@ -0,0 +1,271 @@
+import os
+
+import numpy as np
+
+from codigos import ACCIONES, CODIGO_ACCION, CODIGO_DIRECCION, DERECHA, celdas_transitables
+from recorrido import TablasRecorrido
+from simulador_lote import SimuladorLote
+from main import Agente, Estado, Problema, PERFILES_AGENTE, CELDA_OCULTA, RenderizadorIncremental, pygame
+
+# Recompensas: un pequeño costo por paso y un premio al llegar al objetivo
+RECOMPENSA_PASO = -0.01
+RECOMPENSA_OBJETIVO = 1.0
+# Valor de la vista local fuera del mapa (como una pared); las celdas no reveladas valen CELDA_OCULTA
+CELDA_FUERA = 0
+
+
+# %% Utilidades comunes
+def _perfil(perfil):
+    """Nombre y habilidades a partir de una clave de PERFILES_AGENTE o de un dict de habilidades"""
+    if isinstance(perfil, dict):
+        return "Agente", dict(perfil)
+    nombre, habilidades = PERFILES_AGENTE[perfil]
+    return nombre, dict(habilidades)
+
+
+def _codigo_accion(accion):
+    codigo = CODIGO_ACCION.get(accion, accion)
+    if not isinstance(codigo, (int, np.integer)) or not 0 <= codigo < len(ACCIONES):
+        raise ValueError(f"Acción desconocida: {accion}")
+    return int(codigo)
+
+
+def _sortear_episodio(rng, celdas, ancho, inicio, objetivo):
+    """
+    Inicio (fila, columna, código de dirección) y objetivo (fila, columna) de un episodio.
+    Los que no se fijan se eligen al azar entre las celdas transitables, siempre en el mismo orden
+    para que un EntornoLaberinto y un EntornoVectorizado con la misma semilla den los mismos episodios.
+    """
+    if inicio is None:
+        fila, columna = divmod(int(rng.choice(celdas)), ancho)
+        inicio = (fila, columna, int(rng.integers(4)))
+    else:
+        fila, columna, direccion = (*inicio, 'derecha')[:3]
+        inicio = (fila, columna, CODIGO_DIRECCION.get(direccion, direccion))
+    if objetivo is None:
+        objetivo = divmod(int(rng.choice(celdas)), ancho)
+    return inicio, tuple(objetivo[:2])
+
+
+# %% Entorno de un agente
+class EntornoLaberinto:
+    """
+    Entorno con interfaz reset/step (al estilo de Gym) sobre un Problema, sin pygame salvo al dibujar.
+
+    Observación: dict con
+    - 'vista': int8 de (2 * radio_vista + 1) lados centrada en el agente; el terreno donde está revelado,
+      CELDA_OCULTA donde no y CELDA_FUERA fuera del mapa
+    - 'direccion': código de codigos.DIRECCIONES
+    - 'cooldown_omni': turnos que faltan para poder usar la visión omni
+    - 'posicion' y 'objetivo': (fila, columna)
+    Acciones: códigos o nombres de codigos.ACCIONES. El objetivo se alcanza como en el juego (Problema.es_objetivo).
+    """
+
+    def __init__(self, laberinto, inicio=None, objetivo=None, perfil="1", radio_vista=5, max_pasos=1000,
+                 semilla=None, tablas=None, tamano_celda=40):
+        """
+        inicio: (fila, columna[, dirección]) fijo o None para elegirlo al azar en cada reset; igual con objetivo.
+        perfil: clave de PERFILES_AGENTE o dict de habilidades.
+        tablas: TablasRecorrido ya calculadas para este laberinto (se comparten entre reinicios).
+        """
+        self.laberinto = np.asarray(laberinto)
+        self.alto, self.ancho = self.laberinto.shape
+        self.inicio, self.objetivo = inicio, objetivo
+        self.nombre, self.habilidades = _perfil(perfil)
+        self.radio_vista = radio_vista
+        self.max_pasos = max_pasos
+        self.tablas = tablas if tablas is not None else TablasRecorrido(self.laberinto)
+        self.celdas = np.flatnonzero(celdas_transitables(self.laberinto))
+        if len(self.celdas) == 0:
+            raise ValueError("El laberinto no tiene celdas transitables")
+        self.rng = np.random.default_rng(semilla)
+        self.tamano_celda = tamano_celda
+
+        self.problema = None
+        self.estado = None
+        self.pasos = 0
+        self.terminado = True
+        self.renderizador = None
+
+    def reset(self, semilla=None):
+        """Empieza un episodio nuevo. Devuelve (observación, info)"""
+        if semilla is not None:
+            self.rng = np.random.default_rng(semilla)
+        inicio, objetivo = _sortear_episodio(self.rng, self.celdas, self.ancho, self.inicio, self.objetivo)
+
+        agente = Agente(self.nombre, dict(self.habilidades))
+        self.estado = Estado.interno(*inicio)
+        # Las tablas de recorrido se calculan una vez para todos los episodios
+        self.problema = Problema(self.estado, [Estado(*objetivo)], self.laberinto, agente, tablas=self.tablas)
+        self.pasos = 0
+        self.terminado = False
+        return self.observacion(), {}
+
+    def step(self, accion):
+        """Aplica una acción. Devuelve (observación, recompensa, terminado, truncado, info)"""
+        if self.terminado:
+            raise RuntimeError("El episodio terminó: hay que llamar a reset()")
+        self.estado, resultado = self.problema.aplicar_accion(self.estado, _codigo_accion(accion))
+        self.pasos += 1
+
+        terminado = self.problema.es_objetivo(self.estado)
+        truncado = not terminado and self.pasos >= self.max_pasos
+        self.terminado = terminado or truncado
+        recompensa = RECOMPENSA_OBJETIVO if terminado else RECOMPENSA_PASO
+        return self.observacion(), recompensa, terminado, truncado, {'resultado': resultado, 'pasos': self.pasos}
+
+    def vista(self):
+        """Vista local alrededor del agente (ver la descripción de la clase)"""
+        r = self.radio_vista
+        fila, columna = self.estado.fila, self.estado.columna
+        fila_min, fila_max = max(fila - r, 0), min(fila + r + 1, self.alto)
+        columna_min, columna_max = max(columna - r, 0), min(columna + r + 1, self.ancho)
+
+        vista = np.full((2 * r + 1, 2 * r + 1), CELDA_FUERA, dtype=np.int8)
+        visibles = self.problema.mapa_visible.como_arreglo(fila_min, columna_min, fila_max, columna_max)
+        vista[fila_min - fila + r:fila_max - fila + r, columna_min - columna + r:columna_max - columna + r] = \
+            np.where(visibles, self.laberinto[fila_min:fila_max, columna_min:columna_max], CELDA_OCULTA)
+        return vista
+
+    def observacion(self):
+        objetivo = self.problema.estados_objetivos[0]
+        return {
+            'vista': self.vista(),
+            'direccion': self.estado.codigo_direccion,
+            'cooldown_omni': self.problema.agente.cooldown_omni,
+            'posicion': (self.estado.fila, self.estado.columna),
+            'objetivo': (objetivo.fila, objetivo.columna),
+        }
+
+    # %% Dibujo (aquí se importa pygame)
+    def render(self, modo='humano'):
+        """
+        'humano': dibuja en una ventana; 'rgb': devuelve la imagen como arreglo (alto, ancho, 3).
+        En modo 'rgb' no hace falta pantalla: si pygame aún no se cargó se usa el controlador de video dummy.
+        """
+        if self.problema is None:
+            raise RuntimeError("Hay que llamar a reset() antes de dibujar")
+        if self.renderizador is None:
+            if modo == 'rgb':
+                os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+            cs = self.tamano_celda
+            screen = pygame.display.set_mode((self.ancho * cs, self.alto * cs + 100))
+            pygame.display.set_caption(f"Laberinto con Agente: {self.nombre}")
+            self.renderizador = RenderizadorIncremental(self.laberinto, screen, pygame.font.SysFont(None, 24), cs)
+
+        pygame.event.pump()  # Para que la ventana siga respondiendo
+        self.renderizador.dibujar(self.estado, self.problema)
+        if modo == 'rgb':
+            return pygame.surfarray.array3d(self.renderizador.screen).swapaxes(0, 1)
+
+    def close(self):
+        if self.renderizador is not None:
+            pygame.display.quit()
+            self.renderizador = None
+
+
+# %% Entornos vectorizados
+class EntornoVectorizado:
+    """
+    N entornos sobre un mismo laberinto avanzados a la vez con SimuladorLote (sin objetos Problema).
+
+    Las observaciones son las de EntornoLaberinto apiladas en arreglos con una primera dimensión de tamaño n.
+    Los entornos que terminan se reinician solos: la observación devuelta ya es la del episodio nuevo y la
+    última del anterior queda en info['observacion_final'] (arreglos completos; valen las filas de terminado | truncado).
+    Con semilla s, el entorno i da los mismos episodios que un EntornoLaberinto con semilla s + i.
+    Guarda un mapa visible de alto x ancho bytes por entorno.
+    """
+
+    def __init__(self, laberinto, n, inicio=None, objetivo=None, perfil="1", radio_vista=5, max_pasos=1000,
+                 semilla=None, tablas=None):
+        self.laberinto = np.asarray(laberinto)
+        self.alto, self.ancho = self.laberinto.shape
+        self.n = n
+        self.inicio, self.objetivo = inicio, objetivo
+        self.nombre, self.habilidades = _perfil(perfil)
+        self.radio_vista = radio_vista
+        self.max_pasos = max_pasos
+        self.tablas = tablas if tablas is not None else TablasRecorrido(self.laberinto)
+        self.celdas = np.flatnonzero(celdas_transitables(self.laberinto))
+        if len(self.celdas) == 0:
+            raise ValueError("El laberinto no tiene celdas transitables")
+        self._sembrar(semilla)
+
+        ceros = np.zeros(n, dtype=np.int64)
+        self.simulador = SimuladorLote(self.laberinto, ceros, ceros, ceros, self.habilidades,
+                                       registrar_visibilidad=True, tablas=self.tablas)
+        self.filas_objetivo = np.zeros(n, dtype=np.int64)
+        self.columnas_objetivo = np.zeros(n, dtype=np.int64)
+        self.pasos = np.zeros(n, dtype=np.int64)
+        self._desplazamientos = np.arange(-radio_vista, radio_vista + 1)
+
+    def _sembrar(self, semilla):
+        # Un generador por entorno, para que cada uno no dependa de cuándo terminan los demás
+        self.rngs = [np.random.default_rng(None if semilla is None else semilla + i) for i in range(self.n)]
+
+    def _reiniciar(self, indices):
+        episodios = [_sortear_episodio(self.rngs[i], self.celdas, self.ancho, self.inicio, self.objetivo)
+                     for i in indices]
+        inicios = np.array([inicio for inicio, _ in episodios], dtype=np.int64).reshape(-1, 3)
+        objetivos = np.array([objetivo for _, objetivo in episodios], dtype=np.int64).reshape(-1, 2)
+        self.simulador.reiniciar(indices, inicios[:, 0], inicios[:, 1], inicios[:, 2])
+        self.filas_objetivo[indices] = objetivos[:, 0]
+        self.columnas_objetivo[indices] = objetivos[:, 1]
+        self.pasos[indices] = 0
+
+    def reset(self, semilla=None):
+        """Reinicia todos los entornos. Devuelve (observaciones, info)"""
+        if semilla is not None:
+            self._sembrar(semilla)
+        self._reiniciar(np.arange(self.n))
+        return self.observacion(), {}
+
+    def step(self, acciones):
+        """
+        Aplica una acción por entorno (códigos o nombres de codigos.ACCIONES; NINGUNA para no actuar).
+        Devuelve (observaciones, recompensas, terminados, truncados, info) como arreglos de tamaño n.
+        """
+        acciones = np.asarray(acciones)
+        if acciones.dtype.kind in 'UO':
+            acciones = np.array([CODIGO_ACCION[a] for a in acciones])
+        simulador = self.simulador
+        # Como Problema.aplicar_accion: cada paso cuenta como un cuadro y primero baja el cooldown
+        simulador.actualizar_cooldown()
+        exito = simulador.paso(acciones)
+        self.pasos += 1
+
+        terminados = simulador.es_objetivo(self.filas_objetivo, self.columnas_objetivo, DERECHA)
+        truncados = ~terminados & (self.pasos >= self.max_pasos)
+        recompensas = np.where(terminados, RECOMPENSA_OBJETIVO, RECOMPENSA_PASO)
+        info = {'exito': exito, 'pasos': self.pasos.copy()}
+
+        observacion = self.observacion()
+        fin = np.flatnonzero(terminados | truncados)
+        if len(fin):
+            info['observacion_final'] = observacion
+            self._reiniciar(fin)
+            observacion = self.observacion()
+        return observacion, recompensas, terminados, truncados, info
+
+    def vistas(self):
+        """Vistas locales de todos los entornos, de forma (n, 2 * radio_vista + 1, 2 * radio_vista + 1)"""
+        simulador = self.simulador
+        filas = simulador.filas[:, None, None] + self._desplazamientos[None, :, None]
+        columnas = simulador.columnas[:, None, None] + self._desplazamientos[None, None, :]
+        dentro = (filas >= 0) & (filas < self.alto) & (columnas >= 0) & (columnas < self.ancho)
+        filas = np.clip(filas, 0, self.alto - 1)
+        columnas = np.clip(columnas, 0, self.ancho - 1)
+
+        visibles = simulador.mapas_visibles[np.arange(self.n)[:, None, None], filas, columnas]
+        vistas = np.where(visibles, self.laberinto[filas, columnas], CELDA_OCULTA).astype(np.int8)
+        vistas[~dentro] = CELDA_FUERA
+        return vistas
+
+    def observacion(self):
+        return {
+            'vista': self.vistas(),
+            'direccion': self.simulador.direcciones.astype(np.int64),
+            'cooldown_omni': self.simulador.cooldown_omni.copy(),
+            'posicion': np.stack((self.simulador.filas, self.simulador.columnas), axis=1),
+            'objetivo': np.stack((self.filas_objetivo, self.columnas_objetivo), axis=1),
+        }
@@ -0,0 +1,309 @@
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from codigos import (ACCIONES, AVANZAR, GIRAR_IZQUIERDA, GIRAR_DERECHA, SENSAR, VISION_OMNI, DERECHA,
+                     celdas_transitables)
+from recorrido import TablasRecorrido
+from alcance import IndiceAlcance
+from campos_distancia import huella_laberinto
+from formato_mapa import cargar_mapa
+
+# Una tarea del pool: solo índices y números, nunca el laberinto
+Episodio = namedtuple('Episodio', 'indice mapa inicio objetivo perfil politica semilla max_pasos')
+
+POLITICAS = ('optima', 'aleatoria')
+
+
+# %% Arreglos compartidos
+# Un descriptor identifica un arreglo que los trabajadores abren sin copiarlo:
+# ('shm', nombre, forma, tipo) para memoria compartida, ('memmap', ruta, desplazamiento, forma, tipo) para archivos
+class ArreglosCompartidos:
+    """Publica laberintos y tablas de recorrido para los trabajadores; se libera con cerrar() o con `with`"""
+
+    def __init__(self):
+        self.memorias = []
+        self.temporales = []
+
+    def compartir(self, arreglo):
+        if isinstance(arreglo, np.memmap) and arreglo.filename is not None:
+            # Ya está en disco: cada trabajador lo abre con su propio memmap
+            return ('memmap', arreglo.filename, arreglo.offset, arreglo.shape, arreglo.dtype.str)
+        memoria = shared_memory.SharedMemory(create=True, size=max(arreglo.nbytes, 1))
+        np.ndarray(arreglo.shape, dtype=arreglo.dtype, buffer=memoria.buf)[...] = arreglo
+        self.memorias.append(memoria)
+        return ('shm', memoria.name, arreglo.shape, arreglo.dtype.str)
+
+    def compartir_mapa(self, laberinto):
+        """Descriptores del laberinto y de sus tablas de recorrido, y su huella (todo calculado una sola vez aquí)"""
+        if isinstance(laberinto, np.memmap):
+            # Mapa enorme: las tablas van a un archivo temporal con nombre que los trabajadores puedan abrir
+            descriptor, ruta = tempfile.mkstemp(suffix='.tablas')
+            os.close(descriptor)
+            self.temporales.append(ruta)
+            tablas = TablasRecorrido(laberinto, archivo=ruta)
+            tablas.libre.flush()
+        else:
+            laberinto = np.ascontiguousarray(laberinto)
+            tablas = TablasRecorrido(laberinto)
+        return self.compartir(laberinto), self.compartir(tablas.libre), huella_laberinto(laberinto)
+
+    def cerrar(self):
+        for memoria in self.memorias:
+            memoria.close()
+            memoria.unlink()
+        for ruta in self.temporales:
+            os.remove(ruta)
+        self.memorias, self.temporales = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+
+def abrir_compartido(descriptor, abiertas):
+    """Abre un arreglo publicado con ArreglosCompartidos; `abiertas` mantiene viva la memoria compartida"""
+    if descriptor[0] == 'memmap':
+        _, ruta, desplazamiento, forma, tipo = descriptor
+        return np.memmap(ruta, dtype=tipo, mode='r', offset=desplazamiento, shape=forma)
+    _, nombre, forma, tipo = descriptor
+    memoria = shared_memory.SharedMemory(name=nombre)
+    abiertas.append(memoria)
+    return np.ndarray(forma, dtype=tipo, buffer=memoria.buf)
+
+
+# %% Episodios
+def generar_episodios(laberintos, episodios_por_mapa, perfiles, politicas=('optima',), objetivos_por_mapa=4,
+                      semilla=0, max_pasos=10000, solo_alcanzables=True):
+    """
+    Combinaciones (mapa, inicio, objetivo, perfil, política) con inicios y objetivos al azar entre las
+    celdas transitables. Cada mapa usa pocos objetivos distintos para que los campos de distancia se reutilicen.
+    Con solo_alcanzables se descartan (con una consulta por lotes al índice de alcance) los episodios cuyo
+    objetivo no se puede alcanzar con las habilidades del perfil; los que quedan son los mismos que sin descartar.
+    """
+    from main import PERFILES_AGENTE
+
+    rng = np.random.default_rng(semilla)
+    episodios = []
+    for mapa, laberinto in enumerate(laberintos):
+        celdas = np.flatnonzero(celdas_transitables(laberinto))
+        if len(celdas) == 0:
+            raise ValueError(f"El mapa {mapa} no tiene celdas transitables")
+        ancho = np.shape(laberinto)[1]
+        objetivos = [divmod(int(c), ancho) for c in rng.choice(celdas, objetivos_por_mapa)]
+        candidatos = []
+        for i in range(episodios_por_mapa):
+            fila, columna = divmod(int(rng.choice(celdas)), ancho)
+            inicio = (fila, columna, int(rng.integers(4)))
+            objetivo = objetivos[i % len(objetivos)]
+            for perfil in perfiles:
+                for politica in politicas:
+                    candidatos.append((inicio, objetivo, perfil, politica, int(rng.integers(2 ** 31))))
+        if solo_alcanzables and candidatos:
+            alcance = IndiceAlcance(laberinto)
+            inicios = np.array([inicio for inicio, *_ in candidatos])
+            destinos = np.array([objetivo + (DERECHA,) for _, objetivo, *_ in candidatos])  # Como Estado(*objetivo)
+            de_perfil = np.array([perfil for _, _, perfil, *_ in candidatos])
+            alcanzable = np.zeros(len(candidatos), dtype=bool)
+            for perfil in np.unique(de_perfil):
+                elegidos = de_perfil == perfil
+                alcanzable[elegidos] = alcance.alcanzables(inicios[elegidos], destinos[elegidos],
+                                                           PERFILES_AGENTE[perfil][1])
+            candidatos = [candidato for candidato, sirve in zip(candidatos, alcanzable) if sirve]
+        for candidato in candidatos:
+            episodios.append(Episodio(len(episodios), mapa, *candidato, max_pasos))
+    # Agrupados por mapa y objetivo: cada trabajador recibe bloques que comparten campo de distancias
+    episodios.sort(key=lambda e: (e.mapa, e.objetivo, e.perfil))
+    return episodios
+
+
+def ejecutar_episodio(laberinto, tablas, episodio, huella=None):
+    """Juega un episodio sin pygame y devuelve sus métricas"""
+    from main import Agente, Estado, Problema, PERFILES_AGENTE
+    from campos_distancia import campo_para
+
+    nombre, habilidades = PERFILES_AGENTE[episodio.perfil]
+    agente = Agente(nombre, dict(habilidades))
+    estado = Estado.interno(*episodio.inicio)
+    objetivo = Estado(*episodio.objetivo)
+    inicio_reloj = time.perf_counter()
+    problema = Problema(estado, [objetivo], laberinto, agente, tablas=tablas, huella=huella)
+
+    pasos = 0
+    if episodio.politica == 'optima':
+        campo = campo_para(problema)
+        while pasos < episodio.max_pasos and not problema.es_objetivo(estado):
+            accion = campo.siguiente_accion(estado)
+            if accion is None:
+                break  # No hay camino
+            estado, _ = problema.aplicar_accion(estado, accion)
+            pasos += 1
+    elif episodio.politica == 'aleatoria':
+        posibles = [AVANZAR, SENSAR]
+        if habilidades.get('puede_girar_izquierda', True):
+            posibles.append(GIRAR_IZQUIERDA)
+        if habilidades.get('puede_girar_derecha', True):
+            posibles.append(GIRAR_DERECHA)
+        if habilidades.get('vision_omni', False):
+            posibles.append(VISION_OMNI)
+        rng = np.random.default_rng(episodio.semilla)
+        for codigo in rng.choice(posibles, episodio.max_pasos).tolist():
+            if problema.es_objetivo(estado):
+                break
+            estado, _ = problema.aplicar_accion(estado, ACCIONES[codigo])
+            pasos += 1
+    else:
+        raise ValueError(f"Política desconocida: {episodio.politica}")
+
+    return {
+        'episodio': episodio.indice,
+        'mapa': episodio.mapa,
+        'perfil': nombre,
+        'politica': episodio.politica,
+        'exito': problema.es_objetivo(estado),
+        'pasos': pasos,
+        'celdas_visitadas': len(agente.camino_visitado),
+        'decisiones': len(agente.historial),
+        'explorado': problema.mapa_visible.fraccion_explorada,
+        'tiempo': time.perf_counter() - inicio_reloj,
+    }
+
+
+# %% Trabajadores
+_trabajador = {}
+
+
+def _iniciar_trabajador(descriptores):
+    """Inicializador del pool: abre una vez por proceso todos los mapas compartidos"""
+    abiertas = []
+    mapas = []
+    for descriptor_laberinto, descriptor_libre, huella in descriptores:
+        laberinto = abrir_compartido(descriptor_laberinto, abiertas)
+        tablas = TablasRecorrido.desde_libre(laberinto, abrir_compartido(descriptor_libre, abiertas))
+        mapas.append((laberinto, tablas, huella))
+    _trabajador['memorias'] = abiertas
+    _trabajador['mapas'] = mapas
+
+
+def _ejecutar_en_trabajador(episodio):
+    laberinto, tablas, huella = _trabajador['mapas'][episodio.mapa]
+    return ejecutar_episodio(laberinto, tablas, episodio, huella)
+
+
+def ejecutar_experimentos(laberintos, episodios, procesos=None, tamano_bloque=None):
+    """
+    Reparte los episodios entre un pool de procesos y devuelve sus métricas a medida que terminan
+    (en cualquier orden). Los laberintos se publican una vez en memoria compartida; con procesos=0
+    todo se ejecuta en este mismo proceso.
+    """
+    if procesos == 0:
+        mapas = [(laberinto, TablasRecorrido(laberinto), huella_laberinto(laberinto)) for laberinto in laberintos]
+        for episodio in episodios:
+            laberinto, tablas, huella = mapas[episodio.mapa]
+            yield ejecutar_episodio(laberinto, tablas, episodio, huella)
+        return
+
+    procesos = procesos or os.cpu_count()
+    tamano_bloque = tamano_bloque or max(1, len(episodios) // (procesos * 8))
+    with ArreglosCompartidos() as compartidos:
+        descriptores = [compartidos.compartir_mapa(laberinto) for laberinto in laberintos]
+        with Pool(procesos, initializer=_iniciar_trabajador, initargs=(descriptores,)) as pool:
+            yield from pool.imap_unordered(_ejecutar_en_trabajador, episodios, chunksize=tamano_bloque)
+            # Cierre ordenado: terminate() mataría a los trabajadores con SIGTERM, que pygame intercepta si
+            # alguna política llegara a dibujar
+            pool.close()
+            pool.join()
+
+
+# %% Resumen
+def resumir(resultados):
+    """Agrega las métricas por (mapa, perfil, política)"""
+    grupos = {}
+    for r in resultados:
+        grupos.setdefault((r['mapa'], r['perfil'], r['politica']), []).append(r)
+    filas = []
+    for (mapa, perfil, politica), grupo in sorted(grupos.items()):
+        filas.append({
+            'mapa': mapa,
+            'perfil': perfil,
+            'politica': politica,
+            'episodios': len(grupo),
+            'exito': np.mean([r['exito'] for r in grupo]),
+            'pasos': np.mean([r['pasos'] for r in grupo]),
+            'celdas_visitadas': np.mean([r['celdas_visitadas'] for r in grupo]),
+            'decisiones': np.mean([r['decisiones'] for r in grupo]),
+            'explorado': np.mean([r['explorado'] for r in grupo]),
+            'tiempo': np.mean([r['tiempo'] for r in grupo]),
+        })
+    return filas
+
+
+def tabla(filas):
+    """Tabla de texto con el resumen de resumir()"""
+    lineas = [f"{'Mapa':>4}  {'Perfil':<18} {'Política':<10} {'Episodios':>9} {'Éxito':>7} {'Pasos':>9} "
+              f"{'Celdas':>9} {'Decisiones':>10} {'Explorado':>9} {'Tiempo (ms)':>11}"]
+    for f in filas:
+        lineas.append(f"{f['mapa']:>4}  {f['perfil']:<18} {f['politica']:<10} {f['episodios']:>9} "
+                      f"{f['exito']:>7.1%} {f['pasos']:>9.1f} {f['celdas_visitadas']:>9.1f} "
+                      f"{f['decisiones']:>10.1f} {f['explorado']:>9.2%} {f['tiempo'] * 1000:>11.2f}")
+    return "\n".join(lineas)
+
+
+def linea_de_comandos(argumentos=None):
+    from main import PERFILES_AGENTE
+
+    parser = argparse.ArgumentParser(description="Ejecuta episodios de agentes en paralelo y resume sus métricas")
+    parser.add_argument('mapas', nargs='+', help="Mapas en formato de texto (map.txt) o binario")
+    parser.add_argument('--episodios', type=int, default=100, help="Inicios distintos por mapa")
+    parser.add_argument('--perfiles', nargs='+', default=sorted(PERFILES_AGENTE), choices=sorted(PERFILES_AGENTE))
+    parser.add_argument('--politicas', nargs='+', default=['optima'], choices=POLITICAS)
+    parser.add_argument('--objetivos', type=int, default=4, help="Objetivos distintos por mapa")
+    parser.add_argument('--max-pasos', type=int, default=10000)
+    parser.add_argument('--procesos', type=int, default=None, help="0: sin pool; por defecto, uno por núcleo")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="CSV donde escribir las métricas de cada episodio según terminan")
+    parser.add_argument('--incluir-inalcanzables', action='store_true',
+                        help="No descartar los episodios cuyo objetivo no se puede alcanzar con el perfil")
+    args = parser.parse_args(argumentos)
+
+    laberintos = [cargar_mapa(ruta) for ruta in args.mapas]
+    episodios = generar_episodios(laberintos, args.episodios, args.perfiles, args.politicas, args.objetivos,
+                                  args.semilla, args.max_pasos, not args.incluir_inalcanzables)
+    descartados = len(laberintos) * args.episodios * len(args.perfiles) * len(args.politicas) - len(episodios)
+    if descartados:
+        print(f"{descartados} episodios descartados: objetivo inalcanzable para su perfil", file=sys.stderr)
+
+    archivo = open(args.salida, 'w', newline='') if args.salida else None
+    escritor = None
+    resultados = []
+    inicio = time.perf_counter()
+    try:
+        for resultado in ejecutar_experimentos(laberintos, episodios, args.procesos):
+            resultados.append(resultado)
+            if archivo is not None:
+                if escritor is None:
+                    escritor = csv.DictWriter(archivo, fieldnames=list(resultado))
+                    escritor.writeheader()
+                escritor.writerow(resultado)
+            print(f"\r{len(resultados)}/{len(episodios)} episodios", end='', file=sys.stderr)
+    finally:
+        if archivo is not None:
+            archivo.close()
+    total = time.perf_counter() - inicio
+    print(file=sys.stderr)
+
+    print(tabla(resumir(resultados)))
+    print(f"\n{len(resultados)} episodios en {total:.2f} s ({len(resultados) / total:.1f} episodios/s)")
+
+
+if __name__ == '__main__':
+    linea_de_comandos()
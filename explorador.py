@@ -0,0 +1,433 @@
+import argparse
+import heapq
+import sys
+import time
+
+import numpy as np
+
+from codigos import (DESPLAZAMIENTOS, AVANZAR, GIRAR_IZQUIERDA, GIRAR_DERECHA, SENSAR, VISION_OMNI,
+                     ALCANCE_OMNI, ALCANCE_VISION_LEJANA, celdas_transitables)
+from planificador import COSTO_TERRENO, INFINITO, Planificador
+from recorrido import TablasRecorrido
+
+# Las celdas reveladas tras una acción están a esta distancia como mucho de la posición del agente
+RADIO_REVELADO = max(ALCANCE_OMNI, ALCANCE_VISION_LEJANA)
+# Terreno supuesto de las celdas no reveladas (camino: transitable y con el coste mínimo)
+TERRENO_SUPUESTO = 1
+
+
+class Explorador:
+    """
+    Agente autónomo que explora el laberinto de un Problema sin conocerlo.
+
+    Lo que sabe del mapa son las celdas de problema.mapa_visible (más las paredes que deduce cuando
+    un avance recorre menos celdas de las esperadas); las demás las supone camino. La frontera son las
+    celdas conocidas y transitables junto a alguna desconocida. Sus metas son los estados desde los que
+    una acción revela algo: mirando a una celda desconocida sensa (o usa la visión omni si la tiene
+    lista), y si avanzar lo deja en una celda desconocida, avanza (con rango 2 no siempre puede
+    detenerse junto a la frontera).
+
+    Planifica con D* Lite hacia atrás desde todas las metas hasta el agente, en el espacio
+    (fila, columna, dirección) con el mismo modelo de transición y costes que planificador.Planificador.
+    Cuando se revelan celdas solo se corrigen los estados cuyas transiciones o metas cambian, y la
+    búsqueda reaprovecha todo lo demás en lugar de empezar de nuevo. La frontera también se mantiene
+    celda a celda.
+    """
+
+    def __init__(self, problema, costos='terreno'):
+        self.problema = problema
+        self.estado = problema.estado_inicial
+        laberinto = problema.laberinto
+        self.alto, self.ancho = laberinto.shape
+        habilidades = problema.agente.habilidades
+        self.rango = habilidades.get('rango_movimiento', 1)
+        self.puede_girar_izquierda = habilidades.get('puede_girar_izquierda', True)
+        self.puede_girar_derecha = habilidades.get('puede_girar_derecha', True)
+        self.unitario = costos == 'unitario'
+        self._valores = laberinto.ravel()
+
+        # Lo que se cree del mapa: bytearrays (acceso rápido celda a celda) con vistas de NumPy (por zonas)
+        n = self.alto * self.ancho
+        self.conocida = bytearray(n)
+        self.transitable = bytearray(b'\x01') * n
+        self.costo = bytearray(b'\x01') * n
+        self._conocida = np.frombuffer(self.conocida, dtype=np.uint8).reshape(self.alto, self.ancho)
+        self.meta = bytearray(4 * n)
+        self.frontera = set()  # Celdas con algún par de frontera
+
+        # D* Lite
+        self.g = [INFINITO] * (4 * n)
+        self.rhs = [INFINITO] * (4 * n)
+        self._cola = []
+        self._claves = {}  # Estado -> clave vigente en la cola (las demás entradas están obsoletas)
+        self._km = 0
+        self._celda_previa = self._celda(self.estado)
+
+        self.expandidos = 0
+        self.tiempos = []  # Segundos de replanificación de cada paso que tuvo que planificar
+        self._iniciar()
+
+    # %% Conocimiento del mapa
+    def _celda(self, estado):
+        return estado.fila * self.ancho + estado.columna
+
+    def _indice(self, estado):
+        return (self._celda(estado) << 2) | estado.codigo_direccion
+
+    def _iniciar(self):
+        """Toma lo ya revelado del mapa visible y calcula la frontera y las metas de una vez"""
+        visibles = self.problema.mapa_visible.como_arreglo().astype(bool)
+        supuesto = self.laberinto_supuesto()
+        transitable = celdas_transitables(supuesto)
+        self._conocida[...] = visibles
+        self.transitable[:] = transitable.astype(np.uint8).tobytes()
+        self.costo[:] = np.where(transitable, COSTO_TERRENO[np.clip(supuesto, 0, 5)], 1).astype(np.uint8).tobytes()
+
+        # Frontera: celdas conocidas transitables con algún vecino desconocido
+        desconocida = np.pad(~visibles, 1, constant_values=False)
+        base = visibles & transitable
+        metas = np.zeros((self.alto, self.ancho, 4), dtype=bool)
+        for d, (df, dc) in enumerate(DESPLAZAMIENTOS):
+            metas[..., d] = base & desconocida[1 + df:1 + df + self.alto, 1 + dc:1 + dc + self.ancho]
+        self.frontera = set(np.flatnonzero(metas.any(axis=2)).tolist())
+
+        # Metas: además de sensar hacia una desconocida, avanzar hasta caer en una
+        libre = TablasRecorrido(supuesto).libre
+        filas, columnas = np.indices((self.alto, self.ancho))
+        for d, (df, dc) in enumerate(DESPLAZAMIENTOS):
+            pasos = np.minimum(self.rango, libre[d].astype(np.int64))
+            destino = ~visibles[filas + df * pasos, columnas + dc * pasos]
+            metas[..., d] |= base & (pasos > 0) & destino
+        self.meta[:] = metas.astype(np.uint8).tobytes()
+        for s in np.flatnonzero(metas).tolist():
+            self.rhs[s] = 0
+            self._encolar(s)
+
+    def _es_meta(self, s):
+        """Si desde s una acción revela algo: sensar hacia una celda desconocida o avanzar hasta caer en una"""
+        # Solo desde celdas conocidas: a una desconocida solo se llega desde otra meta
+        celda = s >> 2
+        if not (self.conocida[celda] and self.transitable[celda]):
+            return False
+        if self._frente_desconocido(s):
+            return True
+        avance = self._avance(s)
+        return avance is not None and not self.conocida[avance[0] >> 2]
+
+    def _frente_desconocido(self, s):
+        fila, columna = divmod(s >> 2, self.ancho)
+        df, dc = DESPLAZAMIENTOS[s & 3]
+        f, c = fila + df, columna + dc
+        return 0 <= f < self.alto and 0 <= c < self.ancho and not self.conocida[f * self.ancho + c]
+
+    def _revisar_frontera(self, celda):
+        if self.conocida[celda] and self.transitable[celda] and \
+                any(self._frente_desconocido((celda << 2) | d) for d in range(4)):
+            self.frontera.add(celda)
+        else:
+            self.frontera.discard(celda)
+
+    def conocer(self, celdas, bloqueadas=()):
+        """
+        Incorpora celdas recién reveladas (índices planos) y celdas deducidas como bloqueadas sin verlas.
+        Corrige la frontera y, para D* Lite, los estados cuyas transiciones o metas pueden haber cambiado:
+        los de la propia celda y los que la miran desde hasta `rango` celdas antes.
+        """
+        afectados = set()
+        revisar = set()
+        for celda, bloqueada in [(c, False) for c in celdas] + [(c, True) for c in bloqueadas]:
+            if self.conocida[celda]:
+                continue
+            self.conocida[celda] = 1
+            valor = 0 if bloqueada else int(self._valores[celda])
+            self.transitable[celda] = valor != 0 and valor != 5
+            self.costo[celda] = COSTO_TERRENO[valor] if self.transitable[celda] else 1
+
+            fila, columna = divmod(celda, self.ancho)
+            revisar.add(celda)
+            for d, (df, dc) in enumerate(DESPLAZAMIENTOS):
+                afectados.add((celda << 2) | d)
+                for j in range(1, self.rango + 1):
+                    f, c = fila - df * j, columna - dc * j
+                    if not (0 <= f < self.alto and 0 <= c < self.ancho):
+                        break
+                    afectados.add(((f * self.ancho + c) << 2) | d)
+                    if j == 1:
+                        revisar.add(f * self.ancho + c)
+        for celda in revisar:
+            self._revisar_frontera(celda)
+        for s in afectados:
+            self.meta[s] = self._es_meta(s)
+            self._actualizar(s)
+
+    def _nuevas_reveladas(self):
+        """Celdas que el mapa visible tiene reveladas y el explorador aún no, alrededor del agente"""
+        f0, c0 = max(self.estado.fila - RADIO_REVELADO, 0), max(self.estado.columna - RADIO_REVELADO, 0)
+        f1 = min(self.estado.fila + RADIO_REVELADO + 1, self.alto)
+        c1 = min(self.estado.columna + RADIO_REVELADO + 1, self.ancho)
+        zona = self.problema.mapa_visible.como_arreglo(f0, c0, f1, c1).astype(bool)
+        filas, columnas = np.nonzero(zona & (self._conocida[f0:f1, c0:c1] == 0))
+        return ((filas + f0) * self.ancho + columnas + c0).tolist()
+
+    # %% Modelo de transición (según lo que se cree del mapa)
+    def _avance(self, s):
+        """(estado destino, coste) de avanzar desde s, o None si delante no hay nada transitable"""
+        celda, d = s >> 2, s & 3
+        fila, columna = divmod(celda, self.ancho)
+        df, dc = DESPLAZAMIENTOS[d]
+        destino, costo = -1, 0
+        for j in range(1, self.rango + 1):
+            f, c = fila + df * j, columna + dc * j
+            if not (0 <= f < self.alto and 0 <= c < self.ancho):
+                break
+            siguiente = f * self.ancho + c
+            if not self.transitable[siguiente]:
+                break
+            destino, costo = siguiente, costo + self.costo[siguiente]
+        if destino < 0:
+            return None
+        return (destino << 2) | d, 1 if self.unitario else costo
+
+    def _sucesores(self, s):
+        """(estado, coste, acción) de cada transición desde s"""
+        sucesores = []
+        avance = self._avance(s)
+        if avance is not None:
+            sucesores.append((*avance, AVANZAR))
+        base, d = s & ~3, s & 3
+        if self.puede_girar_izquierda:
+            sucesores.append((base | ((d - 1) & 3), 1, GIRAR_IZQUIERDA))
+        if self.puede_girar_derecha:
+            sucesores.append((base | ((d + 1) & 3), 1, GIRAR_DERECHA))
+        return sucesores
+
+    def _predecesores(self, s):
+        """(estado, coste) de cada transición que lleva a s"""
+        predecesores = []
+        base, d = s & ~3, s & 3
+        if self.puede_girar_izquierda:
+            predecesores.append((base | ((d + 1) & 3), 1))
+        if self.puede_girar_derecha:
+            predecesores.append((base | ((d - 1) & 3), 1))
+        fila, columna = divmod(s >> 2, self.ancho)
+        df, dc = DESPLAZAMIENTOS[d]
+        for j in range(1, self.rango + 1):
+            f, c = fila - df * j, columna - dc * j
+            if not (0 <= f < self.alto and 0 <= c < self.ancho) or not self.transitable[f * self.ancho + c]:
+                break
+            previo = ((f * self.ancho + c) << 2) | d
+            avance = self._avance(previo)
+            if avance is not None and avance[0] == s:
+                predecesores.append((previo, avance[1]))
+        return predecesores
+
+    # %% D* Lite
+    def _h(self, s):
+        """Cota inferior del coste desde el agente hasta s (distancia Manhattan entre celdas)"""
+        fila, columna = divmod(s >> 2, self.ancho)
+        distancia = abs(fila - self.estado.fila) + abs(columna - self.estado.columna)
+        return -(-distancia // self.rango) if self.unitario else distancia
+
+    def _clave(self, s):
+        minimo = min(self.g[s], self.rhs[s])
+        return minimo + self._h(s) + self._km, minimo
+
+    def _encolar(self, s):
+        if self.g[s] != self.rhs[s]:
+            clave = self._clave(s)
+            self._claves[s] = clave
+            heapq.heappush(self._cola, (*clave, s))
+        else:
+            self._claves.pop(s, None)
+
+    def _actualizar(self, s):
+        if self.meta[s]:
+            self.rhs[s] = 0
+        else:
+            g = self.g
+            self.rhs[s] = min([costo + g[v] for v, costo, _ in self._sucesores(s)] + [INFINITO])
+        self._encolar(s)
+
+    def _calcular(self):
+        """Repara los valores g hasta que el del agente es el coste óptimo a la frontera más cercana"""
+        g, rhs, cola, claves = self.g, self.rhs, self._cola, self._claves
+        inicio = self._indice(self.estado)
+        while cola:
+            k1, k2, u = cola[0]
+            if claves.get(u) != (k1, k2):
+                heapq.heappop(cola)  # Entrada obsoleta
+                continue
+            if (k1, k2) >= self._clave(inicio) and rhs[inicio] == g[inicio]:
+                break
+            heapq.heappop(cola)
+            nueva = self._clave(u)
+            if (k1, k2) < nueva:
+                claves[u] = nueva
+                heapq.heappush(cola, (*nueva, u))
+                continue
+            del claves[u]
+            self.expandidos += 1
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+                for p, costo in self._predecesores(u):
+                    if costo + g[u] < rhs[p]:
+                        rhs[p] = costo + g[u]
+                        self._encolar(p)
+            else:
+                g[u] = INFINITO
+                for p, _ in self._predecesores(u):
+                    self._actualizar(p)
+                self._actualizar(u)
+
+    # %% Exploración
+    def siguiente_accion(self):
+        """Código de la próxima acción, o None si no queda frontera alcanzable"""
+        inicio = self._indice(self.estado)
+        if self.meta[inicio]:
+            if not self._frente_desconocido(inicio):
+                return AVANZAR  # Cae en una celda desconocida
+            agente = self.problema.agente
+            # aplicar_accion baja el cooldown antes de actuar: con 1 ya se puede usar
+            if agente.habilidades.get('vision_omni', False) and agente.cooldown_omni <= 1:
+                return VISION_OMNI
+            return SENSAR
+        t0 = time.perf_counter()
+        self._calcular()
+        self.tiempos.append(time.perf_counter() - t0)
+        if self.g[inicio] >= INFINITO:
+            return None
+        # La transición que minimiza coste + g (ante empates, avanzar)
+        return min(self._sucesores(inicio), key=lambda t: t[1] + self.g[t[0]])[2]
+
+    def paso(self):
+        """Elige una acción, la aplica al Problema y aprende lo revelado. Devuelve la acción o None"""
+        accion = self.siguiente_accion()
+        if accion is not None:
+            self.ejecutar(accion)
+        return accion
+
+    def ejecutar(self, accion):
+        """Aplica la acción al Problema (como un cuadro del juego) y aprende lo que revele"""
+        previo = self._indice(self.estado)
+        esperado = self._avance(previo) if accion == AVANZAR else None
+        self.estado, _ = self.problema.aplicar_accion(self.estado, accion)
+
+        celda = self._celda(self.estado)
+        if celda != self._celda_previa:
+            # D* Lite: las claves ya encoladas se comparan con las nuevas sumando lo que se movió el agente
+            fila, columna = divmod(self._celda_previa, self.ancho)
+            distancia = abs(fila - self.estado.fila) + abs(columna - self.estado.columna)
+            self._km += -(-distancia // self.rango) if self.unitario else distancia
+            self._celda_previa = celda
+
+        bloqueadas = []
+        if esperado is not None and self._indice(self.estado) != esperado[0]:
+            # Avanzó menos de lo previsto: la celda siguiente a donde quedó está bloqueada
+            df, dc = DESPLAZAMIENTOS[self.estado.codigo_direccion]
+            f, c = self.estado.fila + df, self.estado.columna + dc
+            if 0 <= f < self.alto and 0 <= c < self.ancho:
+                bloqueadas.append(f * self.ancho + c)
+        self.conocer(self._nuevas_reveladas(), bloqueadas)
+
+    def explorar(self, max_pasos=100_000):
+        """Explora hasta que no queda frontera alcanzable o se agotan los pasos. Devuelve los pasos dados"""
+        for pasos in range(max_pasos):
+            if self.paso() is None:
+                return pasos
+        return max_pasos
+
+    # %% Comparación con replanificar desde cero
+    def laberinto_supuesto(self):
+        """El laberinto tal como lo cree el explorador (desconocidas: TERRENO_SUPUESTO; deducidas: pared)"""
+        visibles = self.problema.mapa_visible.como_arreglo().astype(bool)
+        supuesto = np.where(visibles, self.problema.laberinto, TERRENO_SUPUESTO)
+        supuesto[(self._conocida == 1) & ~visibles] = 0
+        return supuesto
+
+    def plan_completo(self):
+        """
+        Dijkstra desde cero (Planificador) sobre el laberinto supuesto: (coste hasta la frontera, segundos).
+        Sin A*: con miles de metas su heurística recorre todas las celdas objetivo en cada expansión.
+        """
+        t0 = time.perf_counter()
+        supuesto = self.laberinto_supuesto()
+        planificador = Planificador(supuesto, self.problema.agente.habilidades, TablasRecorrido(supuesto))
+        metas = [planificador.tupla(s) for s in np.flatnonzero(np.frombuffer(self.meta, dtype=np.uint8))]
+        costo = None
+        if metas:
+            resultado = planificador.buscar(self.estado, metas, 'dijkstra', 'unitario' if self.unitario else 'terreno')
+            costo = resultado.costo
+        return costo, time.perf_counter() - t0
+
+
+def comparar_replanificacion(problema, max_pasos=2000, cada=10, costos='terreno'):
+    """
+    Explora con D* Lite y, una de cada `cada` veces que hay que planificar, mide también cuánto tarda
+    Dijkstra desde cero (Planificador) con el mismo conocimiento, comprobando que el coste coincide.
+    Devuelve un dict con los pasos, la fracción explorada y los tiempos de ambos en milisegundos.
+    """
+    explorador = Explorador(problema, costos)
+    completos = []
+    pasos = 0
+    while pasos < max_pasos:
+        inicio = explorador._indice(explorador.estado)
+        medir = not explorador.meta[inicio] and len(explorador.tiempos) % cada == 0
+        if medir:
+            costo, segundos = explorador.plan_completo()
+            completos.append(segundos)
+        accion = explorador.siguiente_accion()
+        if medir and (costo or INFINITO) != explorador.g[inicio]:
+            raise AssertionError(f"D* Lite ({explorador.g[inicio]}) y Dijkstra ({costo}) difieren en el paso {pasos}")
+        if accion is None:
+            break
+        explorador.ejecutar(accion)
+        pasos += 1
+
+    return {
+        'pasos': pasos,
+        'explorado': problema.mapa_visible.fraccion_explorada,
+        'frontera': len(explorador.frontera),
+        'expandidos': explorador.expandidos,
+        'ms_incremental': np.array(explorador.tiempos) * 1000,
+        'ms_completo': np.array(completos) * 1000,
+    }
+
+
+if __name__ == '__main__':
+    # Ejemplo: python explorador.py --generar bucles 201 201 --semilla 1 --pasos 3000
+    from formato_mapa import cargar_mapa
+    from generador import generar
+    from main import Agente, Estado, Problema, PERFILES_AGENTE
+
+    parser = argparse.ArgumentParser(description="Explora un laberinto con D* Lite y lo compara con replanificar desde cero")
+    parser.add_argument('mapa', nargs='?', help="Mapa de texto o binario (o --generar)")
+    parser.add_argument('--generar', nargs=3, metavar=('TIPO', 'ALTO', 'ANCHO'), help="Generar el mapa con generador.py")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--perfil', default="1", choices=sorted(PERFILES_AGENTE))
+    parser.add_argument('--pasos', type=int, default=2000)
+    parser.add_argument('--cada', type=int, default=10, help="Cada cuántas replanificaciones medir una desde cero")
+    parser.add_argument('--costos', default='terreno', choices=('terreno', 'unitario'))
+    args = parser.parse_args()
+
+    if args.generar:
+        tipo, alto, ancho = args.generar
+        laberinto = generar(tipo, int(alto), int(ancho), args.semilla)
+    elif args.mapa:
+        laberinto = cargar_mapa(args.mapa)
+    else:
+        parser.error("Indique un mapa o --generar")
+
+    celdas = np.flatnonzero(celdas_transitables(laberinto))
+    fila, columna = divmod(int(np.random.default_rng(args.semilla).choice(celdas)), laberinto.shape[1])
+    nombre, habilidades = PERFILES_AGENTE[args.perfil]
+    inicio = Estado(fila, columna, 'derecha')
+    problema = Problema(inicio, [inicio], laberinto, Agente(nombre, dict(habilidades)))
+
+    t0 = time.perf_counter()
+    r = comparar_replanificacion(problema, args.pasos, args.cada, args.costos)
+    print(f"{r['pasos']} pasos en {time.perf_counter() - t0:.1f} s | Explorado: {r['explorado']:.1%} | "
+          f"Frontera: {r['frontera']} celdas | Expandidos por D* Lite: {r['expandidos']}", file=sys.stderr)
+    for nombre, ms in (("D* Lite (incremental)", r['ms_incremental']), ("Dijkstra desde cero", r['ms_completo'])):
+        if len(ms):
+            print(f"{nombre:<22} {len(ms):>6} planes | media {ms.mean():8.3f} ms | "
+                  f"p50 {np.percentile(ms, 50):8.3f} ms | p99 {np.percentile(ms, 99):8.3f} ms | máx {ms.max():8.3f} ms")
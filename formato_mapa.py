@@ -0,0 +1,147 @@
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+# Formato binario: cabecera con dimensiones y leyenda de terrenos, seguida de las celdas como uint8
+# fila por fila a partir de una página nueva. Se abre con np.memmap sin copiar nada a memoria.
+MAGIA = b'LABMAPA\x00'
+VERSION = 1
+# Magia, versión, alto, ancho, desplazamiento de los datos, longitud de la leyenda
+_CABECERA = struct.Struct('<8sHQQQI')
+ALINEACION = 4096  # Los datos empiezan en una página nueva
+
+LEYENDA = {0: 'pared', 1: 'camino', 2: 'agua', 3: 'arena', 4: 'bosque', 5: 'montaña'}
+
+
+def _desplazamiento_datos(longitud_leyenda):
+    tamano = _CABECERA.size + longitud_leyenda
+    return -(-tamano // ALINEACION) * ALINEACION
+
+
+def _escribir_cabecera(archivo, alto, ancho, leyenda):
+    leyenda = json.dumps({str(k): v for k, v in leyenda.items()}, ensure_ascii=False).encode('utf-8')
+    desplazamiento = _desplazamiento_datos(len(leyenda))
+    archivo.write(_CABECERA.pack(MAGIA, VERSION, alto, ancho, desplazamiento, len(leyenda)))
+    archivo.write(leyenda)
+    archivo.write(b'\x00' * (desplazamiento - _CABECERA.size - len(leyenda)))
+    return desplazamiento
+
+
+def leer_cabecera(ruta):
+    """Devuelve dict con 'alto', 'ancho', 'desplazamiento' y 'leyenda' de un mapa binario"""
+    with open(ruta, 'rb') as archivo:
+        datos = archivo.read(_CABECERA.size)
+        if len(datos) < _CABECERA.size or not datos.startswith(MAGIA):
+            raise ValueError(f"{ruta} no es un mapa binario")
+        magia, version, alto, ancho, desplazamiento, longitud = _CABECERA.unpack(datos)
+        if version != VERSION:
+            raise ValueError(f"Versión de mapa no soportada: {version}")
+        leyenda = json.loads(archivo.read(longitud).decode('utf-8'))
+    return {
+        'alto': alto,
+        'ancho': ancho,
+        'desplazamiento': desplazamiento,
+        'leyenda': {int(k): v for k, v in leyenda.items()},
+    }
+
+
+def es_mapa_binario(ruta):
+    with open(ruta, 'rb') as archivo:
+        return archivo.read(len(MAGIA)) == MAGIA
+
+
+# %% Escritura
+def crear_mapa_binario(ruta, alto, ancho, leyenda=None):
+    """Crea un mapa binario vacío (todo pared) y lo devuelve abierto como memmap de escritura"""
+    with open(ruta, 'wb') as archivo:
+        desplazamiento = _escribir_cabecera(archivo, alto, ancho, leyenda or LEYENDA)
+        archivo.truncate(desplazamiento + alto * ancho)
+    return np.memmap(ruta, dtype=np.uint8, mode='r+', offset=desplazamiento, shape=(alto, ancho))
+
+
+def guardar_mapa_binario(ruta, laberinto, leyenda=None, filas_por_bloque=1024):
+    """Guarda un laberinto (array o memmap) en formato binario, por bloques de filas"""
+    alto, ancho = np.shape(laberinto)
+    with open(ruta, 'wb') as archivo:
+        _escribir_cabecera(archivo, alto, ancho, leyenda or LEYENDA)
+        for fila in range(0, alto, filas_por_bloque):
+            archivo.write(np.ascontiguousarray(laberinto[fila:fila + filas_por_bloque], dtype=np.uint8).tobytes())
+
+
+def convertir_csv(ruta_csv, ruta_binaria, celdas_por_bloque=1 << 22, leyenda=None):
+    """
+    Convierte un mapa de texto con el formato de map.txt (celdas separadas por comas, una fila por línea)
+    al formato binario, leyendo por bloques de filas: nunca tiene el mapa completo en memoria.
+    """
+    # Primera pasada: dimensiones
+    alto, ancho = 0, None
+    with open(ruta_csv) as archivo:
+        for linea in archivo:
+            if linea.strip():
+                if ancho is None:
+                    ancho = linea.count(',') + 1
+                alto += 1
+    if ancho is None:
+        raise ValueError(f"{ruta_csv} está vacío")
+
+    destino = crear_mapa_binario(ruta_binaria, alto, ancho, leyenda)
+    filas_por_bloque = max(1, celdas_por_bloque // ancho)
+    fila = 0
+    with open(ruta_csv) as archivo:
+        bloque = []
+        for linea in archivo:
+            if linea.strip():
+                bloque.append(linea.strip())
+            if len(bloque) == filas_por_bloque:
+                fila = _volcar_bloque(destino, fila, bloque, ancho)
+                bloque = []
+        if bloque:
+            _volcar_bloque(destino, fila, bloque, ancho)
+    destino.flush()
+    return destino
+
+
+def _volcar_bloque(destino, fila, lineas, ancho):
+    valores = np.fromstring(','.join(lineas), dtype=np.int64, sep=',')
+    if valores.size != len(lineas) * ancho:
+        raise ValueError(f"Filas de distinto ancho entre las filas {fila} y {fila + len(lineas) - 1}")
+    destino[fila:fila + len(lineas)] = valores.reshape(len(lineas), ancho)
+    return fila + len(lineas)
+
+
+# %% Lectura
+def cargar_mapa_binario(ruta, modo='r'):
+    """
+    Abre un mapa binario como np.memmap de (alto, ancho) uint8; solo se leen del disco las páginas que se usan.
+    modo='r' es de solo lectura; con modo='c' (copia al escribir) se puede editar en memoria sin tocar el archivo.
+    """
+    cabecera = leer_cabecera(ruta)
+    return np.memmap(ruta, dtype=np.uint8, mode=modo, offset=cabecera['desplazamiento'],
+                     shape=(cabecera['alto'], cabecera['ancho']))
+
+
+def cargar_mapa(ruta, modo='r'):
+    """Carga un mapa en cualquiera de los dos formatos: binario (memmap abierto con `modo`) o texto como map.txt"""
+    if es_mapa_binario(ruta):
+        return cargar_mapa_binario(ruta, modo)
+    return np.loadtxt(ruta, delimiter=',', dtype=int)
+
+
+def bloques(laberinto, alto_bloque=1024, ancho_bloque=1024):
+    """Recorre el laberinto por bloques: (fila, columna, vista) sin copiar datos"""
+    alto, ancho = np.shape(laberinto)
+    for fila in range(0, alto, alto_bloque):
+        for columna in range(0, ancho, ancho_bloque):
+            yield fila, columna, laberinto[fila:fila + alto_bloque, columna:columna + ancho_bloque]
+
+
+if __name__ == '__main__':
+    # Uso: python formato_mapa.py map.txt map.mapa
+    if len(sys.argv) != 3:
+        print("Uso: python formato_mapa.py <mapa.txt> <mapa.mapa>")
+        sys.exit(1)
+    mapa = convertir_csv(sys.argv[1], sys.argv[2])
+    print(f"{sys.argv[2]}: {mapa.shape[0]}x{mapa.shape[1]} celdas, {os.path.getsize(sys.argv[2])} bytes")
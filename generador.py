@@ -0,0 +1,234 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from formato_mapa import guardar_mapa_binario
+
+# Proporciones por defecto de los terrenos transitables (1 camino, 2 agua, 3 arena, 4 bosque, 5 montaña).
+# La montaña bloquea el paso: en un laberinto perfecto cada montaña puede cortar un pasillo.
+PROPORCIONES = {1: 0.7, 2: 0.1, 3: 0.1, 4: 0.1, 5: 0.0}
+# Orden de los terrenos de menor a mayor "altura" del ruido: las manchas de agua quedan junto a las de arena, etc.
+ORDEN_TERRENOS = (2, 3, 1, 4, 5)
+TIPOS = ('perfecto', 'bucles', 'cuevas')
+
+# Las operaciones al azar se hacen por bandas de filas de como mucho este número de celdas
+CELDAS_POR_BANDA = 1 << 22
+
+
+def _bandas(filas, ancho):
+    paso = max(1, CELDAS_POR_BANDA // max(ancho, 1))
+    for inicio in range(0, filas, paso):
+        yield inicio, min(filas, inicio + paso)
+
+
+# %% Laberintos
+def laberinto_perfecto(alto, ancho, semilla=None):
+    """
+    Laberinto perfecto (un único camino entre cada par de celdas) de 0 (pared) y 1 (camino).
+
+    Las celdas del laberinto son las posiciones de fila y columna impares; con dimensiones pares la
+    última fila o columna queda de pared. Se usa el algoritmo sidewinder, que resuelve cada fila por
+    separado y por tanto se vectoriza entero: cada fila se parte en tramos conectados hacia la derecha
+    y cada tramo abre un único paso hacia la fila de arriba. Al final se voltea al azar para que el
+    pasillo recto que deja en la primera fila no esté siempre arriba.
+    """
+    rng = np.random.default_rng(semilla)
+    laberinto = np.zeros((alto, ancho), dtype=np.uint8)
+    filas, columnas = (alto - 1) // 2, (ancho - 1) // 2
+    if filas <= 0 or columnas <= 0:
+        return laberinto
+
+    laberinto[1:2 * filas:2, 1:2 * columnas:2] = 1
+    laberinto[1, 1:2 * columnas] = 1  # Primera fila: un único tramo
+    for inicio, fin in _bandas(filas - 1, columnas):
+        inicio, fin = inicio + 1, fin + 1  # Filas de celdas 1..filas-1
+        cerrar = rng.random((fin - inicio, columnas), dtype=np.float32) < 0.5
+        cerrar[:, -1] = True
+        # Paso hacia la derecha dentro de cada tramo
+        laberinto[2 * inicio + 1:2 * fin:2, 2:2 * columnas:2] = ~cerrar[:, :-1]
+
+        # Un paso hacia arriba desde una celda al azar de cada tramo
+        finales = np.flatnonzero(cerrar)
+        comienzos = np.concatenate(([0], finales[:-1] + 1))
+        elegidas = comienzos + (rng.random(len(finales)) * (finales - comienzos + 1)).astype(np.int64)
+        fila, columna = np.divmod(elegidas, columnas)
+        laberinto[2 * (inicio + fila), 2 * columna + 1] = 1
+
+    # Solo se voltea el bloque de tamaño impar que ocupan las celdas, para que sigan en posiciones impares
+    bloque = laberinto[:2 * filas + 1, :2 * columnas + 1]
+    if rng.random() < 0.5:
+        bloque[...] = bloque[::-1].copy()
+    if rng.random() < 0.5:
+        bloque[...] = bloque[:, ::-1].copy()
+    return laberinto
+
+
+def abrir_bucles(laberinto, proporcion=0.1, semilla=None):
+    """
+    Quita al azar una `proporcion` de las paredes que separan dos celdas del laberinto,
+    creando caminos alternativos (ciclos). Modifica el laberinto y lo devuelve.
+    """
+    rng = np.random.default_rng(semilla)
+    alto, ancho = laberinto.shape
+    filas, columnas = (alto - 1) // 2, (ancho - 1) // 2
+    # Paredes entre celdas vecinas en horizontal (fila impar, columna par) y en vertical (fila par, columna impar)
+    for fila_inicial, columna_inicial, n_filas, n_columnas in ((1, 2, filas, columnas - 1),
+                                                               (2, 1, filas - 1, columnas)):
+        for inicio, fin in _bandas(n_filas, n_columnas):
+            abrir = rng.random((fin - inicio, max(n_columnas, 0)), dtype=np.float32) < proporcion
+            bloque = laberinto[fila_inicial + 2 * inicio:fila_inicial + 2 * fin:2,
+                               columna_inicial:columna_inicial + 2 * n_columnas:2]
+            bloque[abrir] = 1
+    return laberinto
+
+
+def laberinto_con_bucles(alto, ancho, bucles=0.1, semilla=None):
+    """Laberinto perfecto al que se le abren bucles (ver abrir_bucles)"""
+    rng = np.random.default_rng(semilla)
+    laberinto = laberinto_perfecto(alto, ancho, rng)
+    return abrir_bucles(laberinto, bucles, rng)
+
+
+def cuevas(alto, ancho, relleno=0.45, iteraciones=5, semilla=None):
+    """
+    Cuevas abiertas con un autómata celular: se empieza con un `relleno` de paredes al azar y en cada
+    iteración una celda es pared si hay 5 o más paredes en su vecindario 3x3 (el borde cuenta como pared).
+    No se garantiza que todas las cuevas estén conectadas entre sí.
+    """
+    rng = np.random.default_rng(semilla)
+    pared = np.ones((alto + 2, ancho + 2), dtype=np.uint8)  # Con un marco de pared alrededor
+    for inicio, fin in _bandas(alto, ancho):
+        pared[1 + inicio:1 + fin, 1:-1] = rng.random((fin - inicio, ancho), dtype=np.float32) < relleno
+
+    vecinas = np.empty((alto, ancho), dtype=np.uint8)
+    for _ in range(iteraciones):
+        vecinas[...] = 0
+        for df in range(3):
+            for dc in range(3):
+                vecinas += pared[df:df + alto, dc:dc + ancho]
+        pared[1:-1, 1:-1] = vecinas >= 5
+    return (1 - pared[1:-1, 1:-1]).astype(np.uint8)
+
+
+# %% Terreno
+def _ruido_suave(alto, ancho, escala, rng):
+    """
+    Devuelve una función que da el ruido en un rango de filas: interpolación bilineal de una rejilla
+    al azar con un punto cada `escala` celdas. Así se evalúa por bandas sin crear el campo completo.
+    """
+    rejilla = rng.random((alto // escala + 2, ancho // escala + 2), dtype=np.float32)
+    x = np.arange(ancho) / escala
+    x0 = x.astype(np.int64)
+    fx = (x - x0).astype(np.float32)
+
+    def evaluar(filas):
+        y = np.asarray(filas) / escala
+        y0 = y.astype(np.int64)
+        fy = (y - y0).astype(np.float32)[:, None]
+        # Primero se interpolan en horizontal solo las filas de la rejilla que hacen falta
+        primera = y0.min()
+        gruesas = rejilla[primera:y0.max() + 2]
+        horizontal = gruesas[:, x0] * (1 - fx) + gruesas[:, x0 + 1] * fx
+        return horizontal[y0 - primera] * (1 - fy) + horizontal[y0 + 1 - primera] * fy
+    return evaluar
+
+
+def repartir_terreno(laberinto, proporciones=None, agrupamiento=8, semilla=None):
+    """
+    Reparte los terrenos 1-5 sobre las celdas transitables (las que no son pared) según `proporciones`
+    ({terreno: peso}, se normaliza). Con agrupamiento > 1 los terrenos forman manchas de unas
+    `agrupamiento` celdas de lado siguiendo un ruido suave; con 1, cada celda se elige por separado.
+    Modifica el laberinto y lo devuelve.
+    """
+    rng = np.random.default_rng(semilla)
+    proporciones = PROPORCIONES if proporciones is None else proporciones
+    terrenos = np.array([t for t in ORDEN_TERRENOS if proporciones.get(t, 0) > 0], dtype=np.uint8)
+    if len(terrenos) == 0:
+        raise ValueError("Las proporciones de terreno no pueden ser todas cero")
+    pesos = np.array([proporciones[t] for t in terrenos], dtype=np.float64)
+    acumuladas = np.cumsum(pesos / pesos.sum())[:-1]
+
+    alto, ancho = laberinto.shape
+    if agrupamiento > 1:
+        ruido = _ruido_suave(alto, ancho, agrupamiento, rng)
+        # Umbrales por cuantiles de una muestra del ruido, para que las proporciones se cumplan
+        muestra = ruido(rng.integers(alto, size=min(alto, 256)))
+        umbrales = np.quantile(muestra, acumuladas)
+    else:
+        umbrales = acumuladas
+
+    # Índice 0 para la pared y 1..n para los terrenos, subiendo uno por cada umbral superado
+    terrenos = np.concatenate(([0], terrenos)).astype(np.uint8)
+    for inicio, fin in _bandas(alto, ancho):
+        if agrupamiento > 1:
+            valores = ruido(np.arange(inicio, fin))
+        else:
+            valores = rng.random((fin - inicio, ancho), dtype=np.float32)
+        bloque = laberinto[inicio:fin]
+        indice = (bloque != 0).astype(np.uint8)
+        for umbral in umbrales:
+            indice += (valores > umbral) & (indice > 0)
+        bloque[...] = terrenos[indice]
+    return laberinto
+
+
+# %% Generación y escritura
+def generar(tipo, alto, ancho, semilla=None, proporciones=None, agrupamiento=8, bucles=0.1, relleno=0.45,
+            iteraciones=5):
+    """Genera un mapa completo ('perfecto', 'bucles' o 'cuevas') con terrenos; misma semilla, mismo mapa"""
+    rng = np.random.default_rng(semilla)
+    if tipo == 'perfecto':
+        laberinto = laberinto_perfecto(alto, ancho, rng)
+    elif tipo == 'bucles':
+        laberinto = laberinto_con_bucles(alto, ancho, bucles, rng)
+    elif tipo == 'cuevas':
+        laberinto = cuevas(alto, ancho, relleno, iteraciones, rng)
+    else:
+        raise ValueError(f"Tipo de mapa desconocido: {tipo}")
+    return repartir_terreno(laberinto, proporciones, agrupamiento, rng)
+
+
+def guardar(laberinto, ruta):
+    """Escribe el mapa como texto (.txt o .csv, formato de map.txt) o, con cualquier otra extensión, en binario"""
+    if ruta.endswith(('.txt', '.csv')):
+        with open(ruta, 'w') as archivo:
+            for inicio, fin in _bandas(*laberinto.shape):
+                np.savetxt(archivo, laberinto[inicio:fin], fmt='%d', delimiter=',')
+    else:
+        guardar_mapa_binario(ruta, laberinto)
+
+
+def _proporciones(texto):
+    proporciones = {}
+    for par in texto:
+        terreno, peso = par.split('=')
+        proporciones[int(terreno)] = float(peso)
+    return proporciones
+
+
+if __name__ == '__main__':
+    # Ejemplo: python generador.py bucles 10000 10000 --semilla 1 --salida grande.mapa
+    parser = argparse.ArgumentParser(description="Genera mapas al azar reproducibles")
+    parser.add_argument('tipo', choices=TIPOS)
+    parser.add_argument('alto', type=int)
+    parser.add_argument('ancho', type=int)
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--proporciones', nargs='+', metavar='TERRENO=PESO',
+                        help="Por ejemplo: 1=0.7 2=0.1 3=0.1 4=0.1")
+    parser.add_argument('--agrupamiento', type=int, default=8, help="Tamaño de las manchas de terreno (1: sin manchas)")
+    parser.add_argument('--bucles', type=float, default=0.1, help="Fracción de paredes internas a abrir (tipo bucles)")
+    parser.add_argument('--relleno', type=float, default=0.45, help="Fracción inicial de paredes (tipo cuevas)")
+    parser.add_argument('--iteraciones', type=int, default=5, help="Pasos del autómata celular (tipo cuevas)")
+    parser.add_argument('--salida', help="Archivo de salida (.txt/.csv como map.txt; si no, formato binario)")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    mapa = generar(args.tipo, args.alto, args.ancho, args.semilla,
+                   _proporciones(args.proporciones) if args.proporciones else None,
+                   args.agrupamiento, args.bucles, args.relleno, args.iteraciones)
+    print(f"{args.alto}x{args.ancho} generado en {time.perf_counter() - inicio:.2f} s", file=sys.stderr)
+    if args.salida:
+        guardar(mapa, args.salida)
+        print(f"Guardado en {args.salida}", file=sys.stderr)
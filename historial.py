@@ -0,0 +1,248 @@
+import atexit
+import weakref
+
+import numpy as np
+
+from codigos import DIRECCIONES, ACCIONES, CODIGO_ACCION
+
+# %% Resultados
+# El resultado de una decisión es el nuevo estado (avanzar, girar) o el texto que devuelve sensar
+RESULTADO_ESTADO = 0
+RESULTADO_NINGUNO = 1
+RESULTADO_OTRO = 2  # Cualquier otro valor: se guarda aparte, fuera de las columnas
+RESULTADOS_TEXTO = ('Camino libre', 'Obstáculo detectado')
+CODIGO_RESULTADO_TEXTO = {texto: 3 + i for i, texto in enumerate(RESULTADOS_TEXTO)}
+
+# %% Registro en disco
+# Cabecera de 16 bytes seguida de registros de tamaño fijo (sin relleno), en el orden en que se tomaron
+MAGIA = b'HISTDEC\x00'
+VERSION = 1
+REGISTRO = np.dtype([
+    ('fila', '<i4'), ('columna', '<i4'), ('direccion', 'i1'), ('accion', 'i1'),
+    ('resultado', 'i1'), ('fila_resultado', '<i4'), ('columna_resultado', '<i4'), ('direccion_resultado', 'i1'),
+])
+_CABECERA = np.dtype([('magia', 'S8'), ('version', '<u4'), ('tamano_registro', '<u4')])
+
+
+def leer_registro(ruta):
+    """Abre con memmap el registro volcado por HistorialDecisiones: arreglo estructurado con dtype REGISTRO"""
+    with open(ruta, 'rb') as archivo:
+        datos = archivo.read(_CABECERA.itemsize)
+    if len(datos) < _CABECERA.itemsize or not datos.startswith(MAGIA):
+        raise ValueError(f"{ruta} no es un registro de decisiones")
+    cabecera = np.frombuffer(datos, dtype=_CABECERA)[0]
+    if cabecera['version'] != VERSION or cabecera['tamano_registro'] != REGISTRO.itemsize:
+        raise ValueError(f"Versión de registro no soportada: {cabecera['version']}")
+    return np.memmap(ruta, dtype=REGISTRO, mode='r', offset=_CABECERA.itemsize)
+
+
+# Decisiones que se conservan en memoria al volcar a un archivo sin límite explícito (el resto solo en disco)
+VENTANA_ARCHIVO = 1 << 16
+
+
+def _tupla_estado(fila, columna, direccion):
+    return fila, columna, DIRECCIONES[direccion]
+
+
+def _cerrar_al_salir(referencia):
+    historial = referencia()
+    if historial is not None:
+        historial.cerrar()
+
+
+# %% Historial
+class HistorialDecisiones:
+    """
+    Historial de decisiones en columnas (arreglos de NumPy preasignados) en lugar de una lista de dicts.
+
+    - limite: si se indica, es un búfer circular que solo conserva las últimas `limite` decisiones.
+    - archivo: si se indica, las decisiones se vuelcan al disco por bloques antes de perderse, y en memoria
+      solo quedan las últimas `limite` (VENTANA_ARCHIVO si no se indica): la memoria no crece con la partida.
+
+    Los índices son absolutos (la decisión i es la i-ésima registrada) y len() es el total registrado;
+    historial[i] devuelve el mismo dict que antes ({'estado', 'accion', 'resultado'}), construido al leerlo.
+    Con archivo hay que llamar a cerrar() (o usarlo con `with`) para volcar las últimas decisiones; si no,
+    se vuelcan al destruir el historial o al terminar el programa.
+    """
+
+    def __init__(self, limite=None, archivo=None, capacidad=1024, bloque_volcado=4096,
+                 crear_estado=_tupla_estado, crear_accion=None):
+        if archivo is not None and limite is None:
+            limite = VENTANA_ARCHIVO
+        self.limite = limite
+        self.capacidad = limite if limite is not None else capacidad
+        self.crear_estado = crear_estado
+        self.crear_accion = crear_accion or (lambda codigo: ACCIONES[codigo])
+        self.columnas = {nombre: np.zeros(self.capacidad, dtype=REGISTRO[nombre]) for nombre in REGISTRO.names}
+        self.otros = {}  # índice absoluto -> resultado que no cabe en las columnas
+        self.total = 0
+
+        self.archivo = None
+        self.volcados = 0
+        self.bloque_volcado = min(bloque_volcado, self.capacidad)
+        if archivo is not None:
+            self.archivo = open(archivo, 'wb')
+            cabecera = np.zeros(1, dtype=_CABECERA)
+            cabecera[0] = (MAGIA, VERSION, REGISTRO.itemsize)
+            self.archivo.write(cabecera.tobytes())
+            atexit.register(_cerrar_al_salir, weakref.ref(self))
+
+    def __len__(self):
+        return self.total
+
+    @property
+    def primero(self):
+        """Índice absoluto de la decisión más antigua que sigue en memoria"""
+        return max(0, self.total - self.capacidad) if self.limite is not None else 0
+
+    # %% Escritura
+    def registrar(self, fila, columna, direccion, accion, resultado):
+        """Añade una decisión; el resultado puede ser un Estado, un texto o None"""
+        if self.limite is None and self.total == self.capacidad:
+            self._crecer()
+        elif self.archivo is not None and self.total - self.volcados >= self.bloque_volcado:
+            self.volcar()
+        posicion = self.total % self.capacidad
+        if self.limite is not None and self.total >= self.capacidad:
+            self.otros.pop(self.total - self.capacidad, None)  # Se sobrescribe la más antigua
+
+        c = self.columnas
+        c['fila'][posicion] = fila
+        c['columna'][posicion] = columna
+        c['direccion'][posicion] = direccion
+        accion = getattr(accion, 'nombre', accion)  # Acepta Accion, su nombre o su código
+        c['accion'][posicion] = CODIGO_ACCION[accion] if isinstance(accion, str) else accion
+
+        if resultado is None:
+            c['resultado'][posicion] = RESULTADO_NINGUNO
+        elif hasattr(resultado, 'codigo_direccion'):
+            c['resultado'][posicion] = RESULTADO_ESTADO
+            c['fila_resultado'][posicion] = resultado.fila
+            c['columna_resultado'][posicion] = resultado.columna
+            c['direccion_resultado'][posicion] = resultado.codigo_direccion
+        elif isinstance(resultado, str) and resultado in CODIGO_RESULTADO_TEXTO:
+            c['resultado'][posicion] = CODIGO_RESULTADO_TEXTO[resultado]
+        else:
+            c['resultado'][posicion] = RESULTADO_OTRO
+            self.otros[self.total] = resultado  # En el archivo solo queda el código RESULTADO_OTRO
+        self.total += 1
+
+    def _crecer(self):
+        if self.archivo is not None:
+            self.volcar()
+        self.capacidad *= 2
+        for nombre, columna in self.columnas.items():
+            self.columnas[nombre] = np.concatenate([columna, np.zeros_like(columna)])
+
+    def volcar(self):
+        """Escribe en el archivo las decisiones aún no volcadas"""
+        if self.archivo is None or self.volcados == self.total:
+            return
+        posiciones = np.arange(self.volcados, self.total) % self.capacidad
+        registros = np.empty(len(posiciones), dtype=REGISTRO)
+        for nombre, columna in self.columnas.items():
+            registros[nombre] = columna[posiciones]
+        self.archivo.write(registros.tobytes())
+        self.volcados = self.total
+
+    def restaurar(self, total):
+        """
+        Vuelve a dejar `total` decisiones, sin borrar las columnas (para saltar dentro de una repetición).
+        Solo sin límite ni archivo: las decisiones hasta `total` tienen que haberse registrado antes, y como
+        una repetición es determinista, al seguir desde ahí se vuelven a escribir los mismos valores.
+        """
+        if self.limite is not None or self.archivo is not None:
+            raise ValueError("Solo se puede restaurar un historial sin límite ni archivo")
+        if not 0 <= total <= self.capacidad:
+            raise ValueError(f"No hay {total} decisiones en memoria")
+        self.total = total
+
+    def cerrar(self):
+        """Vuelca las decisiones pendientes y cierra el archivo (si lo hay)"""
+        if getattr(self, 'archivo', None) is not None:
+            self.volcar()
+            self.archivo.close()
+            self.archivo = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def __del__(self):
+        self.cerrar()
+
+    # %% Lectura
+    def _posicion(self, indice):
+        if indice < 0:
+            indice += self.total
+        if not self.primero <= indice < self.total:
+            raise IndexError(f"Decisión {indice} fuera del historial en memoria")
+        return indice, indice % self.capacidad
+
+    def __getitem__(self, indice):
+        indice, posicion = self._posicion(indice)
+        c = self.columnas
+        codigo = int(c['resultado'][posicion])
+        if codigo == RESULTADO_ESTADO:
+            resultado = self.crear_estado(int(c['fila_resultado'][posicion]), int(c['columna_resultado'][posicion]),
+                                          int(c['direccion_resultado'][posicion]))
+        elif codigo == RESULTADO_NINGUNO:
+            resultado = None
+        elif codigo == RESULTADO_OTRO:
+            resultado = self.otros[indice]
+        else:
+            resultado = RESULTADOS_TEXTO[codigo - 3]
+        return {
+            'estado': self.crear_estado(int(c['fila'][posicion]), int(c['columna'][posicion]),
+                                        int(c['direccion'][posicion])),
+            'accion': self.crear_accion(int(c['accion'][posicion])),
+            'resultado': resultado,
+        }
+
+    def __iter__(self):
+        for indice in range(self.primero, self.total):
+            yield self[indice]
+
+    def arreglo(self, desde=None, hasta=None):
+        """Decisiones [desde, hasta) en memoria como arreglo estructurado con dtype REGISTRO"""
+        desde = self.primero if desde is None else max(desde, self.primero)
+        hasta = self.total if hasta is None else min(hasta, self.total)
+        posiciones = np.arange(desde, max(desde, hasta)) % self.capacidad
+        registros = np.empty(len(posiciones), dtype=REGISTRO)
+        for nombre, columna in self.columnas.items():
+            registros[nombre] = columna[posiciones]
+        return registros
+
+    def describir(self, indices):
+        """Texto de cada decisión (índices absolutos en memoria), con el formato del visor del juego"""
+        indices = np.asarray(indices, dtype=np.int64)
+        posiciones = indices % self.capacidad
+        c = self.columnas
+        textos = []
+        for i, fila, columna, direccion, accion, codigo, fila_r, columna_r, direccion_r in zip(
+                indices.tolist(), *(c[nombre][posiciones].tolist() for nombre in REGISTRO.names)):
+            if codigo == RESULTADO_ESTADO:
+                resultado = f"({fila_r}, {columna_r}, {DIRECCIONES[direccion_r]})"
+            elif codigo == RESULTADO_NINGUNO:
+                resultado = "None"
+            elif codigo == RESULTADO_OTRO:
+                resultado = self.otros.get(i)
+            else:
+                resultado = RESULTADOS_TEXTO[codigo - 3]
+            textos.append(f"{i + 1}. En ({fila}, {columna}, {DIRECCIONES[direccion]}) -> {ACCIONES[accion]} -> {resultado}")
+        return textos
+
+    def indices_accion(self, codigos):
+        """Índices absolutos de las decisiones en memoria cuya acción está en `codigos`"""
+        indices = np.arange(self.primero, self.total)
+        acciones = self.columnas['accion'][indices % self.capacidad]
+        return indices[np.isin(acciones, codigos)]
+
+    def celdas(self, desde=0):
+        """(filas, columnas) de las celdas por las que pasó el agente desde la decisión `desde`"""
+        registros = self.arreglo(desde)
+        con_estado = registros['resultado'] == RESULTADO_ESTADO
+        return (np.concatenate([registros['fila'], registros['fila_resultado'][con_estado]]),
+                np.concatenate([registros['columna'], registros['columna_resultado'][con_estado]]))
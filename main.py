@@ -1,10 +1,39 @@
-import pygame
 import numpy as np
 import sys
-from collections import defaultdict
-
-# Inicializar pygame
-pygame.init()
+import time
+from collections import OrderedDict, defaultdict
+
+from codigos import (DIRECCIONES, ACCIONES, CODIGO_DIRECCION, DESPLAZAMIENTOS, AVANZAR, GIRAR_IZQUIERDA,
+                     GIRAR_DERECHA, SENSAR, VISION_OMNI,
+                     ALCANCE_VISION_LEJANA, ALCANCE_OMNI, COOLDOWN_OMNI, empaquetar_estado, desempaquetar_estado)
+from recorrido import TablasRecorrido
+from campos_distancia import campo_para, huella_laberinto
+from formato_mapa import cargar_mapa
+from visibilidad import MapaVisibilidad
+from historial import HistorialDecisiones
+from topologia import IndiceTopologico, PASILLO
+from alcance import IndiceAlcance
+from repeticion import Grabador, REINICIAR, CUADROS_POR_SEGUNDO
+from perfilado import Perfilador, SIN_PERFILADO
+
+
+# %% pygame bajo demanda
+class _PygamePerezoso:
+    """
+    Sustituye al módulo pygame: lo importa e inicializa la primera vez que se usa (al dibujar o jugar).
+    Así importar main es rápido y funciona sin pantalla, por ejemplo desde entorno.py o experimentos.py.
+    """
+    _modulo = None
+
+    def __getattr__(self, nombre):
+        if _PygamePerezoso._modulo is None:
+            import pygame as modulo
+            modulo.init()
+            _PygamePerezoso._modulo = modulo
+        return getattr(_PygamePerezoso._modulo, nombre)
+
+
+pygame = _PygamePerezoso()
 
 
 # %% Acción
@@ -16,26 +45,71 @@ class Accion:
         return self.nombre
 
 
+# Una Accion por código de codigos.ACCIONES, compartida por todo el historial
+ACCIONES_AGENTE = tuple(Accion(nombre) for nombre in ACCIONES)
+
+
 # %% Estado
 class Estado:
+    # Sin __dict__: cada estado guarda solo tres enteros (la dirección como código de codigos.DIRECCIONES)
+    __slots__ = ('fila', 'columna', 'codigo_direccion')
+
+    # Estados compartidos por clave empaquetada (ver Estado.interno)
+    _internados = {}
+
     def __init__(self, fila, columna, direccion='derecha'):
-        self.fila = fila
-        self.columna = columna
-        self.direccion = direccion  # 'arriba', 'abajo', 'izquierda', 'derecha'
+        # int(): los enteros de NumPy no admiten los desplazamientos de __hash__ ni de clave
+        self.fila = int(fila)
+        self.columna = int(columna)
+        self.codigo_direccion = int(CODIGO_DIRECCION.get(direccion, direccion))  # Acepta nombre o código
+
+    @property
+    def direccion(self):
+        return DIRECCIONES[self.codigo_direccion]  # 'arriba', 'abajo', 'izquierda', 'derecha'
+
+    @direccion.setter
+    def direccion(self, direccion):
+        self.codigo_direccion = int(CODIGO_DIRECCION.get(direccion, direccion))
+
+    @property
+    def clave(self):
+        """Estado empaquetado en un entero, usable como clave o dentro de arreglos de NumPy"""
+        return empaquetar_estado(self.fila, self.columna, self.codigo_direccion)
+
+    @classmethod
+    def desde_clave(cls, clave):
+        fila, columna, direccion = desempaquetar_estado(int(clave))
+        return cls.interno(fila, columna, direccion)
+
+    @classmethod
+    def interno(cls, fila, columna, direccion):
+        """Devuelve la instancia compartida de este estado, creándola solo la primera vez (no debe modificarse)"""
+        fila, columna, direccion = int(fila), int(columna), int(CODIGO_DIRECCION.get(direccion, direccion))
+        clave = (fila << 32) | (columna << 2) | direccion  # empaquetar_estado, en línea por rapidez
+        try:
+            return cls._internados[clave]
+        except KeyError:
+            estado = cls._internados[clave] = cls(fila, columna, direccion)
+            return estado
+
+    @classmethod
+    def limpiar_internados(cls):
+        cls._internados.clear()
 
     def __str__(self):
         return f"({self.fila}, {self.columna}, {self.direccion})"
 
     def __eq__(self, otro):
-        return self.fila == otro.fila and self.columna == otro.columna and self.direccion == otro.direccion
+        return (self.fila == otro.fila and self.columna == otro.columna
+                and self.codigo_direccion == otro.codigo_direccion)
 
     def __hash__(self):
-        return hash((self.fila, self.columna, self.direccion))
+        return (self.fila << 32) | (self.columna << 2) | self.codigo_direccion
 
 
 # %% Clase Agente
 class Agente:
-    def __init__(self, nombre, habilidades):
+    def __init__(self, nombre, habilidades, limite_historial=None, archivo_historial=None):
         """
         habilidades: dict con:
         - 'puede_girar_izquierda': bool
@@ -43,197 +117,288 @@ class Agente:
         - 'vision_lejana': bool (si puede ver más allá de la celda actual al sensar)
         - 'rango_movimiento': int (cuántas celdas puede avanzar de una vez)
         - 'vision_omni': bool (nueva habilidad para ver en todas direcciones)
+        limite_historial: conservar en memoria solo las últimas decisiones (búfer circular)
+        archivo_historial: volcar todas las decisiones a este archivo (ver historial.leer_registro); en memoria
+            quedan solo las últimas (limite_historial o historial.VENTANA_ARCHIVO)
         """
         self.nombre = nombre
         self.habilidades = habilidades
-        self.historial = []
+        self.historial = HistorialDecisiones(limite_historial, archivo_historial,
+                                             crear_estado=Estado.interno, crear_accion=ACCIONES_AGENTE.__getitem__)
         self.camino_visitado = set()
         self.puntos_decision = set()
         self.vision_omni_activada = False
         self.cooldown_omni = 0
         self.duracion_omni = 3  # Turnos que dura la visión omni
 
+    def cerrar(self):
+        """Vuelca al archivo las decisiones que falten (si hay archivo_historial)"""
+        self.historial.cerrar()
+
     def puede_realizar_accion(self, accion):
-        if accion.nombre == 'girar_izquierda':
+        accion = getattr(accion, 'nombre', accion)  # Acepta Accion o su nombre
+        if accion == 'girar_izquierda':
             return self.habilidades.get('puede_girar_izquierda', True)
-        elif accion.nombre == 'girar_derecha':
+        elif accion == 'girar_derecha':
             return self.habilidades.get('puede_girar_derecha', True)
         return True
 
-    def registrar_decision(self, estado, accion, resultado):
-        self.historial.append({
-            'estado': estado,
-            'accion': accion,
-            'resultado': resultado
-        })
-        self.camino_visitado.add((estado.fila, estado.columna))
+    @property
+    def es_punto_decision(self):
+        """Si el agente puede elegir entre varias acciones de movimiento (avanzar y algún giro)"""
+        # Avanzar siempre es posible: basta con poder girar hacia algún lado
+        return bool(self.habilidades.get('puede_girar_izquierda', True) or
+                    self.habilidades.get('puede_girar_derecha', True))
 
-        # Si hay múltiples acciones posibles, es punto de decisión
-        if len([a for a in ['avanzar', 'girar_izquierda', 'girar_derecha']
-                if self.puede_realizar_accion(Accion(a))]) > 1:
+    def registrar_decision(self, estado, accion, resultado, en_union=True):
+        """en_union: si la celda es una unión del laberinto (Problema lo sabe); solo ahí hay decisión que marcar"""
+        self.historial.registrar(estado.fila, estado.columna, estado.codigo_direccion, accion, resultado)
+        self.camino_visitado.add((estado.fila, estado.columna))
+        if en_union and self.es_punto_decision:
             self.puntos_decision.add((estado.fila, estado.columna))
 
 
+# Perfiles del menú de __main__ (opción -> nombre y habilidades); también los usa experimentos.py
+PERFILES_AGENTE = {
+    "1": ("Explorador Básico", {
+        'vision_lejana': False
+    }),
+    "2": ("Explorador Zurdo", {
+        'puede_girar_izquierda': False,
+        'vision_lejana': False
+    }),
+    "3": ("Corredor Veloz", {
+        'rango_movimiento': 2,
+        'vision_lejana': False,
+        'puede_sensar': False
+    }),
+    "4": ("Explorador Omni", {
+        'vision_omni': True,
+        'vision_lejana': False,
+        'puede_girar_izquierda': True,
+        'puede_girar_derecha': True,
+        'rango_movimiento': 1
+    }),
+}
+
+
 # %% Problema
 class Problema:
-    def __init__(self, estado_inicial, estados_objetivos, laberinto, agente):
+    def __init__(self, estado_inicial, estados_objetivos, laberinto, agente, tablas=None, huella=None):
+        """tablas y huella: se pueden reutilizar las de otro Problema sobre el mismo laberinto"""
         self.estado_inicial = estado_inicial
         self.estados_objetivos = estados_objetivos
-        self.laberinto = laberinto
+        self.laberinto = np.asarray(laberinto)
         self.agente = agente
-        self.mapa_visible = np.zeros_like(laberinto)
-        self.mapa_visible[estado_inicial.fila][estado_inicial.columna] = 1
+        # Un bit por celda; mapa_visible[fila][columna] sigue funcionando para leer
+        self.mapa_visible = MapaVisibilidad(*self.laberinto.shape)
+        self.mapa_visible.revelar(estado_inicial.fila, estado_inicial.columna)
+        # Distancia libre en cada dirección desde cada celda
+        self.tablas = tablas if tablas is not None else TablasRecorrido(self.laberinto)
+        self._huella = huella
+        self._topologia = None
+        self._alcance = None
+
+    @property
+    def huella(self):
+        """Hash del contenido del laberinto (clave de la caché de campos de distancia)"""
+        if self._huella is None:
+            self._huella = huella_laberinto(self.laberinto)
+        return self._huella
+
+    @property
+    def topologia(self):
+        """Grafo de uniones del laberinto (topologia.IndiceTopologico), construido la primera vez que se pide"""
+        if self._topologia is None:
+            self._topologia = IndiceTopologico(self.laberinto, self.tablas)
+        return self._topologia
+
+    @property
+    def alcance(self):
+        """Índice de alcance del laberinto (alcance.IndiceAlcance), construido la primera vez que se pide"""
+        if self._alcance is None:
+            self._alcance = IndiceAlcance(self.laberinto, self.tablas)
+        return self._alcance
+
+    def es_union(self, fila, columna):
+        """Si desde la celda se puede seguir por más de dos lados (las tablas bastan, sin construir el grafo)"""
+        return sum(self.tablas.distancia(fila, columna, d) > 0 for d in range(4)) > PASILLO
 
     def es_objetivo(self, estado):
         return estado in self.estados_objetivos
 
+    def editar_celda(self, fila, columna, valor):
+        """Cambia el terreno de una celda y corrige las tablas de recorrido (y el grafo de uniones y el alcance, si existen)"""
+        if not self.laberinto.flags.writeable:
+            raise ValueError("El laberinto es de solo lectura: abre el mapa binario con cargar_mapa(ruta, modo='c')")
+        self.laberinto[fila][columna] = valor
+        self.tablas.actualizar_celda(fila, columna)
+        if self._topologia is not None:
+            self._topologia.actualizar_celda(fila, columna)
+        if self._alcance is not None:
+            self._alcance.actualizar_celda(fila, columna)
+        self._huella = None
+
+    def revelar_rayo(self, fila, columna, direccion, alcance, hasta_obstaculo=True):
+        """Revela hasta `alcance` celdas en línea recta; con hasta_obstaculo se detiene tras la primera pared o montaña"""
+        n = min(alcance, self.tablas.hasta_borde(fila, columna, direccion))
+        if hasta_obstaculo:
+            n = min(n, self.tablas.distancia(fila, columna, direccion) + 1)  # La pared también se ve
+        if n > 0:
+            self.mapa_visible.revelar_rayo(fila, columna, direccion, n)
+
     def sensar_camino(self, estado):
         """Sensar si hay camino en la dirección actual según las habilidades del agente"""
         fila, columna = estado.fila, estado.columna
+        direccion = estado.codigo_direccion
 
         # Revelar según habilidades del agente
         if self.agente.vision_omni_activada:
             # Visión omni-direccional (todas direcciones)
-            direcciones = ['arriba', 'abajo', 'izquierda', 'derecha']
-            alcance = 3
-
-            for direccion in direcciones:
-                for i in range(1, alcance + 1):
-                    if direccion == "arriba":
-                        f, c = fila - i, columna
-                    elif direccion == "abajo":
-                        f, c = fila + i, columna
-                    elif direccion == "izquierda":
-                        f, c = fila, columna - i
-                    elif direccion == "derecha":
-                        f, c = fila, columna + i
-
-                    if 0 <= f < len(self.laberinto) and 0 <= c < len(self.laberinto[0]):
-                        self.mapa_visible[f][c] = 1
-                        if self.laberinto[f][c] in [0, 5]:  # Si es pared o montaña
-                            break
+            for d in range(4):
+                self.revelar_rayo(fila, columna, d, ALCANCE_OMNI)
 
             # Desactivar después de usar
             self.agente.vision_omni_activada = False
-            self.agente.cooldown_omni = 5  # 5 turnos de cooldown
+            self.agente.cooldown_omni = COOLDOWN_OMNI
 
         elif self.agente.habilidades.get('vision_lejana', False):
             # Visión de largo alcance (3 celdas)
-            for i in range(1, 4):
-                if estado.direccion == "arriba":
-                    f, c = fila - i, columna
-                elif estado.direccion == "abajo":
-                    f, c = fila + i, columna
-                elif estado.direccion == "izquierda":
-                    f, c = fila, columna - i
-                elif estado.direccion == "derecha":
-                    f, c = fila, columna + i
-
-                if 0 <= f < len(self.laberinto) and 0 <= c < len(self.laberinto[0]):
-                    self.mapa_visible[f][c] = 1
-                    if self.laberinto[f][c] in [0, 5]:  # Si es pared o montaña
-                        break
+            self.revelar_rayo(fila, columna, direccion, ALCANCE_VISION_LEJANA)
         else:
             # Visión normal (solo celda frontal)
-            if estado.direccion == "arriba":
-                f, c = fila - 1, columna
-            elif estado.direccion == "abajo":
-                f, c = fila + 1, columna
-            elif estado.direccion == "izquierda":
-                f, c = fila, columna - 1
-            elif estado.direccion == "derecha":
-                f, c = fila, columna + 1
-
-            if 0 <= f < len(self.laberinto) and 0 <= c < len(self.laberinto[0]):
-                self.mapa_visible[f][c] = 1
+            self.revelar_rayo(fila, columna, direccion, 1, hasta_obstaculo=False)
 
         # Verificar si la celda frontal es transitable
-        if estado.direccion == "arriba":
-            nueva_fila, nueva_columna = fila - 1, columna
-        elif estado.direccion == "abajo":
-            nueva_fila, nueva_columna = fila + 1, columna
-        elif estado.direccion == "izquierda":
-            nueva_fila, nueva_columna = fila, columna - 1
-        elif estado.direccion == "derecha":
-            nueva_fila, nueva_columna = fila, columna + 1
-
-        if (0 <= nueva_fila < len(self.laberinto) and 0 <= nueva_columna < len(self.laberinto[0])
-                and self.laberinto[nueva_fila][nueva_columna] != 0  # Pared
-                and self.laberinto[nueva_fila][nueva_columna] != 5  # Montaña
-        ):
-            return True
-        return False
+        return self.tablas.distancia(fila, columna, direccion) > 0
 
     def avanzar(self, estado):
         """Avanzar en la dirección actual según habilidades del agente"""
-        fila, columna = estado.fila, estado.columna
         rango = self.agente.habilidades.get('rango_movimiento', 1)
+        direccion = estado.codigo_direccion
+
+        # Se avanza hasta el rango o hasta la última celda libre antes de una pared o montaña
+        pasos = min(rango, self.tablas.distancia(estado.fila, estado.columna, direccion))
+        if pasos <= 0:
+            return None  # No se pudo mover
 
-        for paso in range(1, rango + 1):
-            if estado.direccion == "arriba":
-                nueva_fila, nueva_columna = fila - paso, columna
-            elif estado.direccion == "abajo":
-                nueva_fila, nueva_columna = fila + paso, columna
-            elif estado.direccion == "izquierda":
-                nueva_fila, nueva_columna = fila, columna - paso
-            elif estado.direccion == "derecha":
-                nueva_fila, nueva_columna = fila, columna + paso
-
-            # Verificar si la nueva posición es válida
-            if not (0 <= nueva_fila < len(self.laberinto)
-                    and 0 <= nueva_columna < len(self.laberinto[0])
-                    and self.laberinto[nueva_fila][nueva_columna] != 0  # Pared
-                    and self.laberinto[nueva_fila][nueva_columna] != 5  # Montaña
-            ):
-                if paso == 1:
-                    return None  # No se pudo mover
-                break  # Para movimiento de múltiples pasos
-
-            # Actualizar posición si este paso es válido
-            fila, columna = nueva_fila, nueva_columna
+        delta_fila, delta_columna = DESPLAZAMIENTOS[direccion]
+        fila, columna = estado.fila + delta_fila * pasos, estado.columna + delta_columna * pasos
 
         # Revelar solo la celda final
-        self.mapa_visible[fila][columna] = 1
-        return Estado(fila, columna, estado.direccion)
+        self.mapa_visible.revelar(fila, columna)
+        return Estado.interno(fila, columna, direccion)
 
     def girar_izquierda(self, estado):
         """Girar 90 grados a la izquierda si el agente puede"""
-        if not self.agente.puede_realizar_accion(Accion('girar_izquierda')):
+        if not self.agente.puede_realizar_accion('girar_izquierda'):
             return None
-
-        direcciones = ['arriba', 'izquierda', 'abajo', 'derecha']
-        current_idx = direcciones.index(estado.direccion)
-        nueva_direccion = direcciones[(current_idx + 1) % 4]
-        return Estado(estado.fila, estado.columna, nueva_direccion)
+        return Estado.interno(estado.fila, estado.columna, (estado.codigo_direccion - 1) % 4)
 
     def girar_derecha(self, estado):
         """Girar 90 grados a la derecha si el agente puede"""
-        if not self.agente.puede_realizar_accion(Accion('girar_derecha')):
+        if not self.agente.puede_realizar_accion('girar_derecha'):
             return None
+        return Estado.interno(estado.fila, estado.columna, (estado.codigo_direccion + 1) % 4)
 
-        direcciones = ['arriba', 'derecha', 'abajo', 'izquierda']
-        current_idx = direcciones.index(estado.direccion)
-        nueva_direccion = direcciones[(current_idx + 1) % 4]
-        return Estado(estado.fila, estado.columna, nueva_direccion)
+    def aplicar_accion(self, estado, accion):
+        """
+        Ejecuta una acción (nombre o código de codigos.ACCIONES) igual que el juego con el teclado,
+        registrándola en el historial del agente. Cada llamada cuenta como un cuadro: primero baja el cooldown.
+        Devuelve (estado siguiente, resultado); si la acción no se pudo realizar el estado no cambia.
+        """
+        if self.agente.cooldown_omni > 0:
+            self.agente.cooldown_omni -= 1
+        return self.ejecutar_accion(estado, accion)
+
+    def ejecutar_accion(self, estado, accion):
+        """Como aplicar_accion pero sin contar un cuadro: el juego baja el cooldown una vez por cuadro, no por tecla"""
+        agente = self.agente
+        accion = ACCIONES[accion] if isinstance(accion, (int, np.integer)) else accion
+
+        if accion == 'sensar':
+            resultado = "Camino libre" if self.sensar_camino(estado) else "Obstáculo detectado"
+            agente.registrar_decision(estado, accion, resultado, self.es_union(estado.fila, estado.columna))
+            return estado, resultado
+        if accion == 'vision_omni':
+            if agente.habilidades.get('vision_omni', False) and agente.cooldown_omni == 0 \
+                    and not agente.vision_omni_activada:
+                agente.vision_omni_activada = True
+                return estado, self.sensar_camino(estado)
+            return estado, None
+
+        nuevo_estado = getattr(self, accion)(estado)  # avanzar, girar_izquierda o girar_derecha
+        if nuevo_estado is None:
+            return estado, None
+        agente.registrar_decision(estado, accion, nuevo_estado, self.es_union(estado.fila, estado.columna))
+        return nuevo_estado, nuevo_estado
 
 
 # %% Visualización con Pygame
-def visualizar_laberinto_pygame(laberinto, estado_actual, problema, screen, font, cell_size=40):
-    # Colores
-    COLORES = {
-        0: (0, 0, 0),  # Pared - negro
-        1: (255, 255, 255),  # Camino - blanco
-        2: (0, 0, 255),  # Agua - azul
-        3: (255, 255, 0),  # Arena - amarillo
-        4: (0, 128, 0),  # Bosque - verde oscuro
-        5: (128, 128, 128),  # Montaña - gris
-        'oculto': (50, 50, 50),  # Área no explorada - gris oscuro
-        'agente': (255, 0, 0),  # Agente - rojo
-        'objetivo': (0, 255, 0),  # Objetivo - verde
-        'visitado': (200, 200, 255),  # Camino visitado - azul claro
-        'decision': (255, 165, 0)  # Punto de decisión - naranja
-    }
+# Colores
+COLORES = {
+    0: (0, 0, 0),  # Pared - negro
+    1: (255, 255, 255),  # Camino - blanco
+    2: (0, 0, 255),  # Agua - azul
+    3: (255, 255, 0),  # Arena - amarillo
+    4: (0, 128, 0),  # Bosque - verde oscuro
+    5: (128, 128, 128),  # Montaña - gris
+    'oculto': (50, 50, 50),  # Área no explorada - gris oscuro
+    'agente': (255, 0, 0),  # Agente - rojo
+    'objetivo': (0, 255, 0),  # Objetivo - verde
+    'visitado': (200, 200, 255),  # Camino visitado - azul claro
+    'decision': (255, 165, 0)  # Punto de decisión - naranja
+}
+
+
+def puntos_flecha(centro_x, centro_y, direccion, cell_size):
+    """Triángulo que indica hacia dónde mira el agente"""
+    if direccion == "arriba":
+        return [
+            (centro_x, centro_y - cell_size // 4),
+            (centro_x - cell_size // 4, centro_y + cell_size // 4),
+            (centro_x + cell_size // 4, centro_y + cell_size // 4)
+        ]
+    elif direccion == "abajo":
+        return [
+            (centro_x, centro_y + cell_size // 4),
+            (centro_x - cell_size // 4, centro_y - cell_size // 4),
+            (centro_x + cell_size // 4, centro_y - cell_size // 4)
+        ]
+    elif direccion == "izquierda":
+        return [
+            (centro_x - cell_size // 4, centro_y),
+            (centro_x + cell_size // 4, centro_y - cell_size // 4),
+            (centro_x + cell_size // 4, centro_y + cell_size // 4)
+        ]
+    return [
+        (centro_x + cell_size // 4, centro_y),
+        (centro_x - cell_size // 4, centro_y - cell_size // 4),
+        (centro_x - cell_size // 4, centro_y + cell_size // 4)
+    ]
 
+
+def lineas_informacion(estado_actual, problema, pista=None):
+    """Las tres líneas de texto que se muestran debajo del laberinto"""
+    info_text = (f"Posición: ({estado_actual.fila}, {estado_actual.columna}) | Dirección: {estado_actual.direccion}"
+                 f" | Explorado: {problema.mapa_visible.fraccion_explorada:.1%}")
+    if pista:
+        info_text += f" | Pista: {pista}"
+
+    # Mostrar estado de la visión omni
+    omni_status = ""
+    if 'vision_omni' in problema.agente.habilidades and problema.agente.habilidades['vision_omni']:
+        if problema.agente.vision_omni_activada:
+            omni_status = " (OMNI ACTIVA)"
+        elif problema.agente.cooldown_omni > 0:
+            omni_status = f" (Cooldown: {problema.agente.cooldown_omni})"
+
+    agente_info = f"Agente: {problema.agente.nombre} | Habilidades: {problema.agente.habilidades}{omni_status}"
+    instrucciones = "Flechas: Moverse | Espacio: Sensar | R: Reiniciar | ESC: Salir | T: Ver Recorrido | O: Visión Omni | P: Pista"
+    return info_text, agente_info, instrucciones
+
+
+def visualizar_laberinto_pygame(laberinto, estado_actual, problema, screen, font, cell_size=40, pista=None):
     # Dibujar el laberinto
     for fila in range(len(laberinto)):
         for columna in range(len(laberinto[0])):
@@ -244,8 +409,6 @@ def visualizar_laberinto_pygame(laberinto, estado_actual, problema, screen, font
                 if (fila, columna) in problema.agente.camino_visitado:
                     # Celda visitada
                     pygame.draw.rect(screen, COLORES['visitado'], rect)
-                elif laberinto[fila][columna] in [0, 5]:  # Pared o montaña
-                    pygame.draw.rect(screen, COLORES[laberinto[fila][columna]], rect)
                 else:
                     pygame.draw.rect(screen, COLORES[laberinto[fila][columna]], rect)
 
@@ -280,162 +443,708 @@ def visualizar_laberinto_pygame(laberinto, estado_actual, problema, screen, font
     # Dibujar la dirección del agente
     centro_x = estado_actual.columna * cell_size + cell_size // 2
     centro_y = estado_actual.fila * cell_size + cell_size // 2
-
-    if estado_actual.direccion == "arriba":
-        puntos = [
-            (centro_x, centro_y - cell_size // 4),
-            (centro_x - cell_size // 4, centro_y + cell_size // 4),
-            (centro_x + cell_size // 4, centro_y + cell_size // 4)
-        ]
-    elif estado_actual.direccion == "abajo":
-        puntos = [
-            (centro_x, centro_y + cell_size // 4),
-            (centro_x - cell_size // 4, centro_y - cell_size // 4),
-            (centro_x + cell_size // 4, centro_y - cell_size // 4)
-        ]
-    elif estado_actual.direccion == "izquierda":
-        puntos = [
-            (centro_x - cell_size // 4, centro_y),
-            (centro_x + cell_size // 4, centro_y - cell_size // 4),
-            (centro_x + cell_size // 4, centro_y + cell_size // 4)
-        ]
-    elif estado_actual.direccion == "derecha":
-        puntos = [
-            (centro_x + cell_size // 4, centro_y),
-            (centro_x - cell_size // 4, centro_y - cell_size // 4),
-            (centro_x - cell_size // 4, centro_y + cell_size // 4)
-        ]
-
-    pygame.draw.polygon(screen, (0, 0, 0), puntos)
+    pygame.draw.polygon(screen, (0, 0, 0), puntos_flecha(centro_x, centro_y, estado_actual.direccion, cell_size))
 
     # Mostrar información
-    info_text = f"Posición: ({estado_actual.fila}, {estado_actual.columna}) | Dirección: {estado_actual.direccion}"
-    text_surface = font.render(info_text, True, (255, 255, 255))
-    screen.blit(text_surface, (10, len(laberinto) * cell_size + 10))
-
-    # Mostrar estado de la visión omni
-    omni_status = ""
-    if 'vision_omni' in problema.agente.habilidades and problema.agente.habilidades['vision_omni']:
-        if problema.agente.vision_omni_activada:
-            omni_status = " (OMNI ACTIVA)"
-        elif problema.agente.cooldown_omni > 0:
-            omni_status = f" (Cooldown: {problema.agente.cooldown_omni})"
-
-    agente_info = f"Agente: {problema.agente.nombre} | Habilidades: {problema.agente.habilidades}{omni_status}"
-    agente_surface = font.render(agente_info, True, (255, 255, 255))
-    screen.blit(agente_surface, (10, len(laberinto) * cell_size + 40))
-
-    instrucciones = "Flechas: Moverse | Espacio: Sensar | R: Reiniciar | ESC: Salir | T: Ver Recorrido | O: Visión Omni"
-    instrucciones_surface = font.render(instrucciones, True, (255, 255, 255))
-    screen.blit(instrucciones_surface, (10, len(laberinto) * cell_size + 70))
+    for i, linea in enumerate(lineas_informacion(estado_actual, problema, pista)):
+        text_surface = font.render(linea, True, (255, 255, 255))
+        screen.blit(text_surface, (10, len(laberinto) * cell_size + 10 + 30 * i))
+
+
+# %% Renderizado incremental
+# Código de cada celda dibujada: tipo base (terreno 0-5, oculta, visitada u objetivo),
+# más 16 si lleva marca de punto de decisión y 32 * (dirección + 1) si está el agente encima
+CELDA_OCULTA, CELDA_VISITADA, CELDA_OBJETIVO = 6, 7, 8
+MARCA_DECISION = 16
+MARCA_AGENTE = 32
+
+# %% Cámara y minimapa
+NIVELES_ZOOM = (8, 12, 16, 24, 32, 40)  # Tamaños de celda en píxeles que recorren las teclas + y -
+VISTA_MAXIMA = (1200, 720)  # Píxeles (ancho, alto) como mucho de la zona del laberinto en la ventana
+LADO_MINIMAPA = 200
+# Color de cada terreno y, en la última fila, el de la niebla
+PALETA_MINIMAPA = np.array([COLORES[terreno] for terreno in range(6)] + [COLORES['oculto']], dtype=np.uint32)
+
+
+def tamano_ventana(alto, ancho, cell_size=40):
+    """
+    (ancho, alto) de la ventana y (ancho, alto) de la vista del laberinto para un mapa de alto x ancho celdas.
+    Si el mapa cabe entero queda como antes; si no, la vista se limita a VISTA_MAXIMA y se deja sitio a la
+    derecha para el minimapa. Debajo siempre quedan 100 píxeles para el texto.
+    """
+    vista = (min(ancho * cell_size, VISTA_MAXIMA[0]), min(alto * cell_size, VISTA_MAXIMA[1]))
+    panel = LADO_MINIMAPA + 20 if vista != (ancho * cell_size, alto * cell_size) else 0
+    return (vista[0] + panel, vista[1] + 100), vista
+
+
+class Minimapa:
+    """
+    Vista reducida de lo explorado: cada píxel es un bloque de k x k celdas con el color medio de sus
+    celdas reveladas (o el de la niebla si no tiene ninguna).
+
+    Guarda por bloque la suma de colores y la cuenta de celdas reveladas ya sumadas, junto con una copia
+    de los bits de visibilidad que ya cuentan. Al empezar se suman con NumPy por bandas (solo las que tienen
+    algo revelado); después, en cada zona donde pudo revelarse algo solo se suman las celdas nuevas y se
+    reescriben con pygame.surfarray los píxeles de sus bloques, así que el coste no depende del mapa.
+    """
+
+    def __init__(self, laberinto, ancho, alto):
+        self.laberinto = laberinto
+        self.filas, self.columnas = laberinto.shape
+        self.k = max(1, -(-self.filas // alto), -(-self.columnas // ancho))
+        self.bloques = (-(-self.filas // self.k), -(-self.columnas // self.k))
+        self.escala = max(1, min(alto // self.bloques[0], ancho // self.bloques[1]))
+        self.superficie = pygame.Surface((self.bloques[1], self.bloques[0]))
+        self.sumas = np.zeros(self.bloques + (3,), dtype=np.uint32)
+        self.cuentas = np.zeros(self.bloques, dtype=np.uint32)
+        self.contadas = None  # Bits de visibilidad ya sumados (mismo formato que MapaVisibilidad.bits)
+        self.escalada = None
+        self.problema = None
+        self.reveladas = -1
+        self.dibujado = None  # (cámara, bloque del agente) del último dibujo
+
+    def _pintar(self, bloque_fila_min, bloque_fila_max, bloque_columna_min, bloque_columna_max):
+        """Escribe en la superficie el color de los bloques del rango"""
+        bloques = np.s_[bloque_fila_min:bloque_fila_max, bloque_columna_min:bloque_columna_max]
+        cuentas = self.cuentas[bloques][..., None]
+        colores = np.where(cuentas > 0, self.sumas[bloques] // np.maximum(cuentas, 1), PALETA_MINIMAPA[6])
+        pixeles = pygame.surfarray.pixels3d(self.superficie)  # Ejes (x, y): columnas primero
+        pixeles[bloque_columna_min:bloque_columna_max, bloque_fila_min:bloque_fila_max] = colores.transpose(1, 0, 2)
+        del pixeles  # Desbloquea la superficie
+        self.escalada = None
+
+    def _sumar_banda(self, mapa_visible, bloque_fila_min, bloque_fila_max):
+        """Suma desde cero las filas de bloques [bloque_fila_min, bloque_fila_max)"""
+        k = self.k
+        f0, f1 = bloque_fila_min * k, min(bloque_fila_max * k, self.filas)
+        visible = mapa_visible.como_arreglo(f0, 0, f1, self.columnas)
+        colores = PALETA_MINIMAPA[self.laberinto[f0:f1]] * visible[..., None]
+        inicios_filas, inicios_columnas = np.arange(0, f1 - f0, k), np.arange(0, self.columnas, k)
+        self.sumas[bloque_fila_min:bloque_fila_max] = np.add.reduceat(
+            np.add.reduceat(colores, inicios_filas, axis=0), inicios_columnas, axis=1)
+        self.cuentas[bloque_fila_min:bloque_fila_max] = np.add.reduceat(
+            np.add.reduceat(visible.astype(np.uint32), inicios_filas, axis=0), inicios_columnas, axis=1)
+        self.contadas[f0:f1] = mapa_visible.bits[f0:f1]
+        self._pintar(bloque_fila_min, bloque_fila_max, 0, self.bloques[1])
+
+    def _sumar_zona(self, mapa_visible, fila_min, columna_min, fila_max, columna_max):
+        """Suma a sus bloques las celdas de la zona (inclusive) reveladas desde la última vez"""
+        f0, f1 = max(fila_min, 0), min(fila_max, self.filas - 1) + 1
+        b0, b1 = max(columna_min, 0) >> 3, (min(columna_max, self.columnas - 1) >> 3) + 1
+        if f0 >= f1 or b0 >= b1:
+            return
+        nuevas = mapa_visible.bits[f0:f1, b0:b1] & ~self.contadas[f0:f1, b0:b1]
+        if not nuevas.any():
+            return
+        self.contadas[f0:f1, b0:b1] |= nuevas
+        filas, columnas = np.nonzero(np.unpackbits(nuevas, axis=1))
+        filas += f0
+        columnas += b0 * 8
+        bloques = (filas // self.k, columnas // self.k)
+        np.add.at(self.sumas, bloques, PALETA_MINIMAPA[self.laberinto[filas, columnas]])
+        np.add.at(self.cuentas, bloques, 1)
+        self._pintar(bloques[0].min(), bloques[0].max() + 1, bloques[1].min(), bloques[1].max() + 1)
+
+    def actualizar(self, problema, zonas):
+        """Pone al día los bloques de las zonas (en celdas) donde pudo revelarse algo; todo si cambió el Problema"""
+        mapa_visible = problema.mapa_visible
+        if problema is not self.problema:
+            self.sumas[:] = 0
+            self.cuentas[:] = 0
+            self.contadas = np.zeros_like(mapa_visible.bits)
+            self.superficie.fill(COLORES['oculto'])
+            banda = max(1, (1 << 20) // (self.columnas * self.k))  # Filas de bloques por banda: ~1M celdas
+            for bloque in range(0, self.bloques[0], banda):
+                if mapa_visible.bits[bloque * self.k:(bloque + banda) * self.k].any():
+                    self._sumar_banda(mapa_visible, bloque, min(bloque + banda, self.bloques[0]))
+            self.problema = problema
+            self.escalada = None
+        elif mapa_visible.reveladas != self.reveladas:
+            for zona in zonas:
+                self._sumar_zona(mapa_visible, *zona)
+        self.reveladas = mapa_visible.reveladas
+
+    def dibujar(self, screen, x, y, camara, estado_actual):
+        """Dibuja el minimapa con el rectángulo de la cámara y el agente; devuelve el rectángulo cambiado o None"""
+        dibujo = (camara, estado_actual.fila // self.k, estado_actual.columna // self.k)
+        if self.escalada is not None and dibujo == self.dibujado:
+            return None
+        if self.escalada is None:
+            self.escalada = pygame.transform.scale(self.superficie, (self.bloques[1] * self.escala,
+                                                                     self.bloques[0] * self.escala))
+        rect = screen.blit(self.escalada, (x, y))
+        escala = self.escala / self.k
+        fila, columna, filas, columnas = camara
+        pygame.draw.rect(screen, (255, 255, 0), (x + int(columna * escala), y + int(fila * escala),
+                                                 max(int(columnas * escala), 2), max(int(filas * escala), 2)), 1)
+        centro = (x + int((estado_actual.columna + 0.5) * escala), y + int((estado_actual.fila + 0.5) * escala))
+        pygame.draw.circle(screen, COLORES['agente'], centro, max(2, self.escala))
+        self.dibujado = dibujo
+        return rect
+
+
+class RenderizadorIncremental:
+    """
+    Dibuja lo mismo que visualizar_laberinto_pygame, pero solo redibuja las celdas que cambiaron.
+
+    Mantiene una superficie de fondo persistente con el laberinto ya dibujado, un azulejo
+    prerenderizado por cada combinación de tipo de celda/marca/agente y el código de lo que hay
+    dibujado en cada celda. En cada cuadro solo se revisan las celdas cercanas a las posiciones
+    por las que pasó el agente desde el cuadro anterior (ahí es donde se revela, se visita o se
+    mueve algo) y solo se actualizan en pantalla los rectángulos que cambiaron.
+
+    Solo se dibuja lo que cae dentro de la vista (`vista`: ancho y alto en píxeles; por defecto toda la
+    pantalla menos 100 píxeles de texto). Si el mapa no cabe, una cámara sigue al agente: se mueve cuando
+    el agente se acerca a menos de un cuarto de la vista del borde, así que el coste de cada cuadro depende
+    del tamaño de la vista y no del mapa. Si a la derecha de la vista queda sitio, se dibuja un minimapa.
+    """
+
+    def __init__(self, laberinto, screen, font, cell_size=40, vista=None):
+        self.laberinto = np.asarray(laberinto)
+        self.alto, self.ancho = self.laberinto.shape
+        self.screen = screen
+        self.font = font
+        # Celdas alrededor del agente que pueden cambiar al sensar
+        self.radio = max(ALCANCE_OMNI, ALCANCE_VISION_LEJANA, 1)
+        ancho_pantalla, alto_pantalla = screen.get_size()
+        self.vista = vista or (ancho_pantalla, alto_pantalla - 100)
+
+        self.minimapa = None
+        sitio = ancho_pantalla - self.vista[0] - 20
+        if sitio >= LADO_MINIMAPA // 2:
+            self.minimapa = Minimapa(self.laberinto, min(sitio, LADO_MINIMAPA), min(self.vista[1], LADO_MINIMAPA))
+        self.textos = [None, None, None]  # (cadena, superficie) de cada línea de información
+
+        self.problema = None
+        self.posicion_previa = None
+        self.decisiones_vistas = 0
+        self.zonas_sucias = []
+        self.camara = (0, 0)  # Celda de la esquina superior izquierda de la vista
+        self.celdas_dibujadas = 0  # En el último cuadro
+        self.zoom(cell_size)
+
+    def zoom(self, cell_size):
+        """Cambia el tamaño de celda: la vista abarca más o menos celdas y se redibuja entera"""
+        self.cell_size = cell_size
+        self.filas_vista = min(self.alto, max(1, self.vista[1] // cell_size))
+        self.columnas_vista = min(self.ancho, max(1, self.vista[0] // cell_size))
+        self.fondo = pygame.Surface((self.columnas_vista * cell_size, self.filas_vista * cell_size))
+        self.codigos = np.full((self.filas_vista, self.columnas_vista), -1, dtype=np.int16)
+        self.azulejos = {}
+        self.completo = True
+        # Al alejar, la vista crece: la cámara no puede quedar pegada a un borde pasándose del mapa
+        self.camara = (max(0, min(self.camara[0], self.alto - self.filas_vista)),
+                       max(0, min(self.camara[1], self.ancho - self.columnas_vista)))
+
+    def invalidar(self):
+        """Fuerza un redibujado completo en el próximo cuadro (p. ej. tras usar la pantalla para otra cosa)"""
+        self.completo = True
+
+    def marcar_sucia(self, fila_min, columna_min, fila_max, columna_max):
+        """Pide revisar una zona en el próximo cuadro (para cambios hechos fuera del agente)"""
+        self.zonas_sucias.append((fila_min, columna_min, fila_max, columna_max))
+
+    def _azulejo(self, codigo):
+        azulejo = self.azulejos.get(codigo)
+        if azulejo is not None:
+            return azulejo
+
+        cs = self.cell_size
+        azulejo = pygame.Surface((cs, cs))
+        rect = pygame.Rect(0, 0, cs, cs)
+        base = codigo & 15
+        if base == CELDA_OCULTA:
+            pygame.draw.rect(azulejo, COLORES['oculto'], rect)
+        elif base == CELDA_OBJETIVO:
+            pygame.draw.rect(azulejo, COLORES['objetivo'], rect)
+        else:
+            pygame.draw.rect(azulejo, COLORES['visitado'] if base == CELDA_VISITADA else COLORES[base], rect)
+            if codigo & MARCA_DECISION:
+                pygame.draw.circle(azulejo, COLORES['decision'], (cs // 2, cs // 2), cs // 4)
+        pygame.draw.rect(azulejo, (0, 0, 0), rect, 1)  # Borde
+
+        if codigo >= MARCA_AGENTE:
+            direccion = DIRECCIONES[codigo // MARCA_AGENTE - 1]
+            pygame.draw.rect(azulejo, COLORES['agente'], pygame.Rect(cs // 4, cs // 4, cs // 2, cs // 2))
+            pygame.draw.polygon(azulejo, (0, 0, 0), puntos_flecha(cs // 2, cs // 2, direccion, cs))
+
+        self.azulejos[codigo] = azulejo
+        return azulejo
+
+    def _codigo(self, fila, columna, estado_actual, problema):
+        objetivo = problema.estados_objetivos[0]
+        if not problema.mapa_visible[fila, columna]:
+            codigo = CELDA_OCULTA
+        elif fila == objetivo.fila and columna == objetivo.columna:
+            codigo = CELDA_OBJETIVO
+        else:
+            codigo = CELDA_VISITADA if (fila, columna) in problema.agente.camino_visitado else self.laberinto[fila, columna]
+            if (fila, columna) in problema.agente.puntos_decision:
+                codigo |= MARCA_DECISION
+        if fila == estado_actual.fila and columna == estado_actual.columna:
+            codigo += MARCA_AGENTE * (estado_actual.codigo_direccion + 1)
+        return codigo
+
+    # %% Cámara
+    @staticmethod
+    def _eje(posicion, inicio, tamano, total):
+        """Inicio de la vista en un eje: igual mientras el agente no se acerque al borde; si no, centrada en él"""
+        margen = tamano // 4
+        if inicio + margen <= posicion < inicio + tamano - margen:
+            return max(0, min(inicio, total - tamano))
+        return max(0, min(posicion - tamano // 2, total - tamano))
+
+    def _seguir(self, estado_actual):
+        """Mueve la cámara si hace falta para seguir al agente; devuelve True si se movió"""
+        camara = (self._eje(estado_actual.fila, self.camara[0], self.filas_vista, self.alto),
+                  self._eje(estado_actual.columna, self.camara[1], self.columnas_vista, self.ancho))
+        movida = camara != self.camara
+        self.camara = camara
+        return movida
+
+    def _codigos_vista(self, estado_actual, problema):
+        """Códigos de todas las celdas de la vista a la vez (al redibujarla entera)"""
+        f0, c0 = self.camara
+        f1, c1 = f0 + self.filas_vista, c0 + self.columnas_vista
+        visible = problema.mapa_visible.como_arreglo(f0, c0, f1, c1) != 0
+        codigos = np.where(visible, self.laberinto[f0:f1, c0:c1], CELDA_OCULTA).astype(np.int16)
+        agente = problema.agente
+        filas, columnas = np.nonzero(visible)
+        for marcadas, visitada in ((agente.camino_visitado, True), (agente.puntos_decision, False)):
+            # Se recorre lo más corto: las celdas visibles de la vista o las marcadas en todo el mapa
+            if len(marcadas) < len(filas):
+                celdas = [(f - f0, c - c0) for f, c in marcadas if f0 <= f < f1 and c0 <= c < c1]
+                celdas = [(f, c) for f, c in celdas if visible[f, c]]
+            else:
+                celdas = [(f, c) for f, c in zip(filas.tolist(), columnas.tolist()) if (f + f0, c + c0) in marcadas]
+            for f, c in celdas:
+                codigos[f, c] = CELDA_VISITADA if visitada else codigos[f, c] | MARCA_DECISION
+        objetivo = problema.estados_objetivos[0]
+        if f0 <= objetivo.fila < f1 and c0 <= objetivo.columna < c1 and visible[objetivo.fila - f0, objetivo.columna - c0]:
+            codigos[objetivo.fila - f0, objetivo.columna - c0] = CELDA_OBJETIVO
+        if f0 <= estado_actual.fila < f1 and c0 <= estado_actual.columna < c1:
+            codigos[estado_actual.fila - f0, estado_actual.columna - c0] += MARCA_AGENTE * (estado_actual.codigo_direccion + 1)
+        return codigos
+
+    def _redibujar_vista(self, estado_actual, problema):
+        """Vuelve a calcular la vista entera y pasa al fondo solo las celdas cuyo código cambió"""
+        cs = self.cell_size
+        codigos = self._codigos_vista(estado_actual, problema)
+        filas, columnas = np.nonzero(codigos != self.codigos)
+        self.fondo.blits([(self._azulejo(codigo), (columna * cs, fila * cs)) for fila, columna, codigo
+                          in zip(filas.tolist(), columnas.tolist(), codigos[filas, columnas].tolist())], doreturn=False)
+        self.codigos = codigos
+        self.celdas_dibujadas = len(filas)
+
+    def _zonas_del_agente(self, estado_actual, problema):
+        """Cajas alrededor de cada posición ocupada por el agente desde el cuadro anterior"""
+        posiciones = [(estado_actual.fila, estado_actual.columna)]
+        if self.posicion_previa is not None:
+            posiciones.append(self.posicion_previa)
+        historial = problema.agente.historial
+        filas, columnas = historial.celdas(self.decisiones_vistas)
+        posiciones.extend(zip(filas.tolist(), columnas.tolist()))
+        self.decisiones_vistas = len(historial)
+
+        r = self.radio
+        return [(f - r, c - r, f + r, c + r) for f, c in set(posiciones)]
+
+    def _texto(self, i, cadena, rects):
+        if self.textos[i] is not None and self.textos[i][0] == cadena:
+            return
+        y = self.vista[1] + 10 + 30 * i
+        banda = pygame.Rect(0, y, self.screen.get_width(), self.font.get_linesize())
+        if self.textos[i] is not None:
+            banda.union_ip(self.textos[i][1].get_rect(topleft=(10, y)))
+        superficie = self.font.render(cadena, True, (255, 255, 255))
+        self.screen.fill((0, 0, 0), banda)
+        self.screen.blit(superficie, (10, y))
+        self.textos[i] = (cadena, superficie)
+        rects.append(banda)
+
+    def dibujar(self, estado_actual, problema, pista=None):
+        """Dibuja el cuadro actual y actualiza en pantalla solo lo que cambió"""
+        cs = self.cell_size
+        rects = []
+        completo = self.completo or problema is not self.problema
+        movida = self._seguir(estado_actual)
+        zonas = self._zonas_del_agente(estado_actual, problema) if problema is self.problema else []
+        zonas += self.zonas_sucias
+        self.zonas_sucias = []
+
+        if completo:
+            # Redibujado completo: al empezar, al reiniciar (nuevo Problema), tras invalidar o al hacer zoom
+            self.codigos[:] = -1
+            self._redibujar_vista(estado_actual, problema)
+            self.screen.fill((0, 0, 0))
+            self.screen.blit(self.fondo, (0, 0))
+            self.textos = [None, None, None]
+        elif movida:
+            # La cámara se movió: se redibuja la vista entera (su tamaño no depende del mapa)
+            self._redibujar_vista(estado_actual, problema)
+            rects.append(self.screen.blit(self.fondo, (0, 0)))
+        else:
+            self.celdas_dibujadas = 0
+            f0, c0 = self.camara
+            f1, c1 = f0 + self.filas_vista - 1, c0 + self.columnas_vista - 1
+            revisadas = set()
+            for fila_min, columna_min, fila_max, columna_max in zonas:
+                for fila in range(max(fila_min, f0), min(fila_max, f1) + 1):
+                    for columna in range(max(columna_min, c0), min(columna_max, c1) + 1):
+                        if (fila, columna) in revisadas:
+                            continue
+                        revisadas.add((fila, columna))
+                        codigo = self._codigo(fila, columna, estado_actual, problema)
+                        if codigo == self.codigos[fila - f0, columna - c0]:
+                            continue
+                        self.codigos[fila - f0, columna - c0] = codigo
+                        rect = self.fondo.blit(self._azulejo(int(codigo)), ((columna - c0) * cs, (fila - f0) * cs))
+                        self.screen.blit(self.fondo, rect, rect)
+                        rects.append(rect)
+                        self.celdas_dibujadas += 1
+
+        for i, linea in enumerate(lineas_informacion(estado_actual, problema, pista)):
+            self._texto(i, linea, rects)
+        if self.minimapa is not None:
+            self.minimapa.actualizar(problema, zonas)
+            if completo:
+                self.minimapa.dibujado = None
+            rect = self.minimapa.dibujar(self.screen, self.vista[0] + 10, 0,
+                                         self.camara + (self.filas_vista, self.columnas_vista), estado_actual)
+            if rect is not None:
+                rects.append(rect)
+
+        if completo:
+            pygame.display.flip()
+            self.problema = problema
+            self.decisiones_vistas = len(problema.agente.historial)
+            self.completo = False
+        elif rects:
+            pygame.display.update(rects)
+        self.posicion_previa = (estado_actual.fila, estado_actual.columna)
 
 
 # %% Mostrar árbol de decisiones
-def mostrar_arbol_decisiones(agente, font, screen, width, height):
-    screen.fill((0, 0, 0))
-    y_pos = 50
-
-    titulo = font.render("Recorrido del agente", True, (255, 255, 255))
-    screen.blit(titulo, (width // 2 - titulo.get_width() // 2, 20))
-
-    for i, decision in enumerate(agente.historial):
-        texto = f"{i + 1}. En {decision['estado']} -> {decision['accion']} -> {decision['resultado']}"
-        texto_surface = font.render(texto, True, (255, 255, 255))
-        screen.blit(texto_surface, (50, y_pos))
-        y_pos += 30
-
-        if y_pos > height - 50:
-            texto_continuar = font.render("Presione cualquier tecla para continuar...", True, (255, 255, 255))
-            screen.blit(texto_continuar, (width // 2 - texto_continuar.get_width() // 2, height - 30))
-            pygame.display.flip()
-            esperar_tecla()
-            screen.fill((0, 0, 0))
-            y_pos = 50
-            titulo = font.render("Árbol de Decisiones del Agente (cont.)", True, (255, 255, 255))
-            screen.blit(titulo, (width // 2 - titulo.get_width() // 2, 20))
-
-    texto_final = font.render("Presione cualquier tecla para volver al juego...", True, (255, 255, 255))
-    screen.blit(texto_final, (width // 2 - texto_final.get_width() // 2, height - 30))
-    pygame.display.flip()
-    esperar_tecla()
+class VisorHistorial:
+    """
+    Vista desplazable del historial de decisiones que solo dibuja las filas visibles.
+
+    Cada fila se genera al verla a partir de las columnas del historial (historial.describir) y su
+    superficie se guarda en una caché LRU acotada, así que abrirla cuesta lo mismo con diez decisiones
+    que con un millón. Teclas: flechas, RePág/AvPág, Inicio/Fin y rueda para moverse; G para ir a un
+    paso; F para filtrar por tipo de acción; / para buscar texto (N: siguiente); Esc, T o Q para volver.
+    """
+
+    ALTO_FILA = 30
+    Y_FILAS = 50
+    PRESUPUESTO_BUSQUEDA = 0.008  # Segundos de búsqueda por cuadro, para no congelar la ventana
+    BLOQUE_BUSQUEDA = 1024
+
+    def __init__(self, historial, screen, font, max_superficies=512):
+        self.historial = historial
+        self.screen = screen
+        self.font = font
+        self.width, self.height = screen.get_size()
+        self.por_pagina = max(1, (self.height - self.Y_FILAS - 50) // self.ALTO_FILA)
+        self.max_superficies = max(max_superficies, 2 * self.por_pagina)
+        self.superficies = OrderedDict()  # (índice absoluto, seleccionada) -> superficie de la fila
+
+        self.filtro = None  # Código de acción filtrada, o None para ver todas
+        self.filas = None  # Índices absolutos que pasan el filtro (None: todos los que siguen en memoria)
+        self.superior = 0  # Posición en la vista de la primera fila visible
+        self.seleccion = 0
+        self.modo = None  # 'saltar' o 'buscar' mientras se escribe
+        self.entrada = ''
+        self.texto_buscado = ''
+        self.busqueda = None  # [posición siguiente a revisar, filas revisadas] de la búsqueda en curso
+        self.mensaje = ''
+        self.abierto = False
+        self.sucio = True
+
+    # %% Vista
+    def __len__(self):
+        if self.filas is not None:
+            return len(self.filas)
+        return self.historial.total - self.historial.primero
+
+    def _indice(self, posicion):
+        """Índice absoluto en el historial de la fila `posicion` de la vista"""
+        if self.filas is not None:
+            return int(self.filas[posicion])
+        return self.historial.primero + posicion
+
+    def _posicion(self, indice):
+        """Fila de la vista con el índice absoluto `indice` o, si no está, la siguiente"""
+        if self.filas is not None:
+            return int(np.searchsorted(self.filas, indice))
+        return indice - self.historial.primero
+
+    def mover(self, posicion):
+        """Selecciona la fila `posicion` de la vista y desplaza lo justo para que se vea"""
+        self.seleccion = max(0, min(posicion, len(self) - 1))
+        if self.seleccion < self.superior:
+            self.superior = self.seleccion
+        elif self.seleccion >= self.superior + self.por_pagina:
+            self.superior = self.seleccion - self.por_pagina + 1
+        self.sucio = True
+
+    def saltar(self, paso):
+        """Va al paso `paso` (numerado desde 1, como en la lista) o al más cercano que se vea"""
+        self.mover(self._posicion(paso - 1))
+        self.superior = max(0, min(self.seleccion - self.por_pagina // 2, len(self) - self.por_pagina))
+
+    def filtrar(self, codigo):
+        """Muestra solo las decisiones con esa acción (None: todas), manteniendo el paso seleccionado"""
+        indice = self._indice(self.seleccion) if len(self) else self.historial.primero
+        self.filtro = codigo
+        self.filas = None if codigo is None else self.historial.indices_accion([codigo])
+        self.busqueda = None
+        self.saltar(indice + 1)
+
+    # %% Búsqueda incremental
+    def buscar(self, texto, desde):
+        """Empieza a buscar `texto` (sin distinguir mayúsculas) desde la fila `desde`, dando la vuelta al final"""
+        self.texto_buscado = texto.lower()
+        self.busqueda = [desde, 0] if self.texto_buscado and len(self) else None
+        self.mensaje = ''
+        self.sucio = True
+
+    def _continuar_busqueda(self):
+        """Revisa filas por bloques durante PRESUPUESTO_BUSQUEDA segundos como mucho"""
+        total = len(self)
+        limite = time.perf_counter() + self.PRESUPUESTO_BUSQUEDA
+        posicion, revisadas = self.busqueda
+        while revisadas < total and time.perf_counter() < limite:
+            fin = min(posicion + self.BLOQUE_BUSQUEDA, total, posicion + total - revisadas)
+            if self.filas is not None:
+                indices = self.filas[posicion:fin]
+            else:
+                indices = np.arange(posicion, fin) + self.historial.primero
+            for desplazamiento, texto in enumerate(self.historial.describir(indices)):
+                if self.texto_buscado in texto.lower():
+                    self.busqueda = None
+                    self.saltar(self._indice(posicion + desplazamiento) + 1)
+                    return
+            revisadas += fin - posicion
+            posicion = fin % total
+        if revisadas >= total:
+            self.busqueda = None
+            self.mensaje = f"Sin coincidencias para '{self.texto_buscado}'"
+        else:
+            self.busqueda = [posicion, revisadas]
+        self.sucio = True
+
+    # %% Dibujo
+    def _superficies_visibles(self):
+        """Superficies de las filas visibles: las que faltan en la caché se generan de una vez"""
+        hasta = min(self.superior + self.por_pagina, len(self))
+        claves = [(self._indice(p), p == self.seleccion) for p in range(self.superior, hasta)]
+        faltan = [clave for clave in claves if clave not in self.superficies]
+        if faltan:
+            for (indice, seleccionada), texto in zip(faltan, self.historial.describir([i for i, _ in faltan])):
+                color = (255, 255, 0) if seleccionada else (255, 255, 255)
+                self.superficies[(indice, seleccionada)] = self.font.render(texto, True, color)
+        for clave in claves:
+            self.superficies.move_to_end(clave)
+        while len(self.superficies) > self.max_superficies:
+            self.superficies.popitem(last=False)
+        return [self.superficies[clave] for clave in claves]
+
+    def _linea_estado(self):
+        if self.modo == 'saltar':
+            return f"Ir al paso: {self.entrada}_   (Enter: ir, Esc: cancelar)"
+        if self.modo == 'buscar' or self.busqueda is not None:
+            linea = f"Buscar: {self.entrada if self.modo else self.texto_buscado}_"
+            if self.busqueda is not None:
+                linea += f"   buscando... {100 * self.busqueda[1] // max(len(self), 1)}%"
+            return linea
+        if self.mensaje:
+            return self.mensaje
+        posicion = f"{self._indice(self.seleccion) + 1} ({self.seleccion + 1}/{len(self)})" if len(self) else "-"
+        return f"Paso {posicion}   G: ir a paso   F: filtrar   /: buscar   N: siguiente   Esc: volver"
+
+    def dibujar(self):
+        self.screen.fill((0, 0, 0))
+        titulo = "Recorrido del agente" + (f" (solo {ACCIONES[self.filtro]})" if self.filtro is not None else "")
+        titulo = self.font.render(titulo, True, (255, 255, 255))
+        self.screen.blit(titulo, (self.width // 2 - titulo.get_width() // 2, 20))
+        for i, superficie in enumerate(self._superficies_visibles()):
+            self.screen.blit(superficie, (50, self.Y_FILAS + i * self.ALTO_FILA))
+        estado = self.font.render(self._linea_estado(), True, (255, 255, 255))
+        self.screen.blit(estado, (self.width // 2 - estado.get_width() // 2, self.height - 30))
+        pygame.display.flip()
+        self.sucio = False
+
+    # %% Eventos
+    def _tecla_entrada(self, event):
+        if event.key == pygame.K_ESCAPE:
+            self.modo = None
+            self.busqueda = None
+        elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+            if self.modo == 'saltar' and self.entrada:
+                self.saltar(int(self.entrada))
+            elif self.modo == 'buscar' and self.entrada and self.busqueda is None:
+                self.buscar(self.entrada, self.seleccion + 1)  # Siguiente coincidencia
+            self.modo = None
+        elif event.key == pygame.K_BACKSPACE:
+            self.entrada = self.entrada[:-1]
+        elif event.unicode and event.unicode.isprintable():
+            if self.modo == 'saltar' and not event.unicode.isdigit():
+                return
+            self.entrada += event.unicode
+        else:
+            return
+        if self.modo == 'buscar':
+            self.buscar(self.entrada, self.seleccion)  # La fila actual primero: al escribir más, sigue ahí
+        self.sucio = True
+
+    def _tecla(self, event):
+        self.mensaje = ''
+        self.sucio = True
+        movimientos = {pygame.K_UP: -1, pygame.K_DOWN: 1,
+                       pygame.K_PAGEUP: -self.por_pagina, pygame.K_PAGEDOWN: self.por_pagina}
+        if event.key in movimientos:
+            self.mover(self.seleccion + movimientos[event.key])
+        elif event.key == pygame.K_HOME:
+            self.mover(0)
+        elif event.key == pygame.K_END:
+            self.mover(len(self) - 1)
+        elif event.key == pygame.K_g:
+            self.modo, self.entrada = 'saltar', ''
+        elif event.key == pygame.K_f:
+            siguiente = 0 if self.filtro is None else self.filtro + 1
+            self.filtrar(siguiente if siguiente < len(ACCIONES) else None)
+        elif event.key == pygame.K_SLASH or event.unicode == '/':
+            self.modo, self.entrada = 'buscar', ''
+            self.busqueda = None
+        elif event.key == pygame.K_n and self.texto_buscado:
+            self.buscar(self.texto_buscado, self.seleccion + 1)
+        elif event.key in (pygame.K_ESCAPE, pygame.K_t, pygame.K_q):
+            self.abierto = False
+
+    def procesar(self, event):
+        if event.type == pygame.QUIT:
+            pygame.event.post(pygame.event.Event(pygame.QUIT))  # Que lo atienda también el bucle del juego
+            self.abierto = False
+        elif event.type == pygame.MOUSEWHEEL:
+            self.mover(self.seleccion - 3 * event.y)
+        elif event.type == pygame.KEYDOWN:
+            if self.modo is not None:
+                self._tecla_entrada(event)
+            else:
+                self._tecla(event)
+
+    def mostrar(self, fps=30):
+        """Abre la vista hasta que se cierre; solo redibuja cuando algo cambia"""
+        repeticion = pygame.key.get_repeat()
+        pygame.key.set_repeat(300, 40)
+        reloj = pygame.time.Clock()
+        self.abierto = True
+        self.sucio = True
+        while self.abierto:
+            for event in pygame.event.get():
+                self.procesar(event)
+                if not self.abierto:
+                    break
+            if not self.abierto:
+                break
+            if self.busqueda is not None:
+                self._continuar_busqueda()
+            if self.sucio:
+                self.dibujar()
+            reloj.tick(fps)
+        pygame.key.set_repeat(*repeticion)
 
 
-def esperar_tecla():
-    esperando = True
-    while esperando:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-                esperando = False
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                esperando = False
+def mostrar_arbol_decisiones(agente, font, screen, width, height):
+    VisorHistorial(agente.historial, screen, font).mostrar()
 
 
 # %% Juego principal
-def jugar_laberinto_pygame(laberinto, estado_inicial, estado_objetivo, agente):
+def jugar_laberinto_pygame(laberinto, estado_inicial, estado_objetivo, agente, grabacion=None, ruta_mapa=None,
+                           perfilador=None):
+    """
+    grabacion: archivo donde grabar la partida para repetirla después (ver repeticion.py)
+    perfilador: un perfilado.Perfilador que mide cada fase del cuadro (F3 muestra u oculta la línea de FPS)
+    """
     # Configuración de Pygame
     cell_size = 40
-    width = len(laberinto[0]) * cell_size
-    height = len(laberinto) * cell_size + 100  # Espacio adicional para texto
+    # Si el mapa no cabe, la vista se limita y una cámara sigue al agente (+ y - cambian el zoom)
+    (width, height), vista = tamano_ventana(len(laberinto), len(laberinto[0]), cell_size)
+    y_superposicion = height
+    superposicion = perfilador is not None
+    if perfilador is None:
+        perfilador = SIN_PERFILADO  # Sin perfilar, cada llamada al perfilador es un método vacío
+    else:
+        height += 24  # Una línea más para los FPS y los tiempos por fase
 
     screen = pygame.display.set_mode((width, height))
     pygame.display.set_caption(f"Laberinto con Agente: {agente.nombre}")
     font = pygame.font.SysFont(None, 24)
 
-    problema = Problema(estado_inicial, [estado_objetivo], laberinto, agente)
+    problema = perfilador.instrumentar(Problema(estado_inicial, [estado_objetivo], laberinto, agente))
     estado_actual = estado_inicial
+    pista = None
+    renderizador = RenderizadorIncremental(laberinto, screen, font, cell_size, vista)
+
+    # Teclas de acción (las mismas acciones que Problema.ejecutar_accion)
+    teclas = {pygame.K_UP: AVANZAR, pygame.K_LEFT: GIRAR_IZQUIERDA, pygame.K_RIGHT: GIRAR_DERECHA,
+              pygame.K_SPACE: SENSAR, pygame.K_o: VISION_OMNI}  # Tecla 'O' para activar visión omni
+    grabador = None
+    if grabacion is not None:
+        grabador = Grabador(grabacion, laberinto, estado_inicial, estado_objetivo, agente, ruta_mapa=ruta_mapa)
 
     clock = pygame.time.Clock()
     running = True
+    cuadro = 0
 
     while running:
+        perfilador.inicio_cuadro()
         # Actualizar cooldown de habilidades
         if agente.cooldown_omni > 0:
             agente.cooldown_omni -= 1
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
+        with perfilador.fase('eventos'):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
                     running = False
-                elif event.key == pygame.K_r:
-                    # Reiniciar el juego
-                    problema = Problema(estado_inicial, [estado_objetivo], laberinto, agente)
-                    estado_actual = estado_inicial
-                    agente.vision_omni_activada = False
-                    agente.cooldown_omni = 0
-                elif event.key == pygame.K_t:
-                    # Mostrar árbol de decisiones
-                    mostrar_arbol_decisiones(agente, font, screen, width, height)
-                elif event.key == pygame.K_UP:
-                    nuevo_estado = problema.avanzar(estado_actual)
-                    if nuevo_estado:
-                        agente.registrar_decision(estado_actual, Accion('avanzar'), nuevo_estado)
-                        estado_actual = nuevo_estado
-                elif event.key == pygame.K_LEFT:
-                    nuevo_estado = problema.girar_izquierda(estado_actual)
-                    if nuevo_estado:
-                        agente.registrar_decision(estado_actual, Accion('girar_izquierda'), nuevo_estado)
-                        estado_actual = nuevo_estado
-                elif event.key == pygame.K_RIGHT:
-                    nuevo_estado = problema.girar_derecha(estado_actual)
-                    if nuevo_estado:
-                        agente.registrar_decision(estado_actual, Accion('girar_derecha'), nuevo_estado)
-                        estado_actual = nuevo_estado
-                elif event.key == pygame.K_SPACE:
-                    resultado = problema.sensar_camino(estado_actual)
-                    agente.registrar_decision(estado_actual, Accion('sensar'),
-                                              "Camino libre" if resultado else "Obstáculo detectado")
-                elif event.key == pygame.K_o:  # Tecla 'O' para activar visión omni
-                    if (agente.habilidades.get('vision_omni', False) and
-                            agente.cooldown_omni == 0 and
-                            not agente.vision_omni_activada):
-                        agente.vision_omni_activada = True
-                        problema.sensar_camino(estado_actual)  # Forzar sensado inmediato
+
+                if event.type == pygame.KEYDOWN:
+                    if event.key != pygame.K_p:
+                        pista = None  # La pista solo vale para el estado en que se pidió
+                    if event.key == pygame.K_ESCAPE:
+                        running = False
+                    elif event.key == pygame.K_r:
+                        # Reiniciar el juego
+                        problema = perfilador.instrumentar(Problema(estado_inicial, [estado_objetivo], laberinto, agente))
+                        estado_actual = estado_inicial
+                        agente.vision_omni_activada = False
+                        agente.cooldown_omni = 0
+                        if grabador is not None:
+                            grabador.registrar(cuadro, REINICIAR)
+                    elif event.key == pygame.K_p:
+                        # Mejor acción hacia el objetivo (el campo de distancias queda en caché entre reinicios)
+                        campo = campo_para(problema)
+                        pista = campo.siguiente_accion(estado_actual) or "sin camino"
+                    elif event.key == pygame.K_t:
+                        # Mostrar árbol de decisiones
+                        mostrar_arbol_decisiones(agente, font, screen, width, height)
+                        renderizador.invalidar()
+                    elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS, pygame.K_MINUS,
+                                       pygame.K_KP_MINUS):
+                        # Acercar o alejar la cámara
+                        nivel = NIVELES_ZOOM.index(renderizador.cell_size)
+                        nivel += -1 if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS) else 1
+                        renderizador.zoom(NIVELES_ZOOM[max(0, min(nivel, len(NIVELES_ZOOM) - 1))])
+                    elif event.key == pygame.K_F3 and perfilador is not SIN_PERFILADO:
+                        # Mostrar u ocultar la línea de FPS (el perfilador sigue midiendo igual)
+                        superposicion = not superposicion
+                        screen.fill((0, 0, 0), (0, y_superposicion, width, height - y_superposicion))
+                        pygame.display.update()
+                    elif event.key in teclas:
+                        estado_actual, _ = problema.ejecutar_accion(estado_actual, teclas[event.key])
+                        if grabador is not None:
+                            grabador.registrar(cuadro, teclas[event.key])
 
         # Verificar si se alcanzó el objetivo
         if problema.es_objetivo(estado_actual):
@@ -452,26 +1161,39 @@ def jugar_laberinto_pygame(laberinto, estado_inicial, estado_objetivo, agente):
             pygame.time.wait(3000)
             running = False
 
-        # Dibujar
-        screen.fill((0, 0, 0))
-        visualizar_laberinto_pygame(laberinto, estado_actual, problema, screen, font, cell_size)
-        pygame.display.flip()
-        clock.tick(30)
-
+        # Dibujar (solo las celdas y textos que cambiaron)
+        if running:
+            with perfilador.fase('dibujo'):
+                renderizador.dibujar(estado_actual, problema, pista)
+            if superposicion:
+                perfilador.dibujar_superposicion(pygame, screen, font, y_superposicion)
+        with perfilador.fase('espera'):
+            clock.tick(CUADROS_POR_SEGUNDO)
+        perfilador.fin_cuadro(celdas_dibujadas=renderizador.celdas_dibujadas,
+                              celdas_reveladas=problema.mapa_visible.reveladas,
+                              estados_internados=len(Estado._internados))
+        cuadro += 1
+
+    if grabador is not None:
+        grabador.cerrar()
+    agente.cerrar()
     pygame.quit()
 
 
-def solicitar_posicion_valida(laberinto, mensaje):
+def solicitar_posicion_valida(laberinto, mensaje, alcance=None, desde=None, habilidades=None):
+    """Con alcance (IndiceAlcance) rechaza además las posiciones inalcanzables desde `desde` con esas habilidades"""
     while True:
         try:
             fila = int(input(f"Ingrese la fila para {mensaje}: "))
             columna = int(input(f"Ingrese la columna para {mensaje}: "))
 
             if 0 <= fila < len(laberinto) and 0 <= columna < len(laberinto[0]):
-                if laberinto[fila][columna] != 0:  # No es pared
-                    return fila, columna
-                else:
+                if laberinto[fila][columna] == 0:  # Pared
                     print("Error: No puedes colocar esta posición en una pared.")
+                elif alcance is not None and not alcance.alcanzable(desde, (fila, columna, 'derecha'), habilidades):
+                    print("Error: Con este agente no se puede llegar a esa posición desde el estado inicial.")
+                else:
+                    return fila, columna
             else:
                 print("Error: Posición fuera de los límites del laberinto.")
         except ValueError:
@@ -481,8 +1203,17 @@ def solicitar_posicion_valida(laberinto, mensaje):
 # %% Main
 if __name__ == '__main__':
     # Cargar el laberinto desde el archivo
+    # Acepta map.txt o un mapa binario (formato_mapa.py), que se abre con memmap sin copiarlo
+    # --perfilar traza.json mide cada fase del juego y guarda una traza de Chrome al salir (ver perfilado.py)
+    argumentos = sys.argv[1:]
+    ruta_traza = None
+    if '--perfilar' in argumentos:
+        i = argumentos.index('--perfilar')
+        ruta_traza = argumentos[i + 1]
+        del argumentos[i:i + 2]
+    ruta_mapa = argumentos[0] if argumentos else "map.txt"
     try:
-        laberinto = np.loadtxt("map.txt", delimiter=',', dtype=int)
+        laberinto = cargar_mapa(ruta_mapa, modo='c')  # Copia al escribir: las ediciones no tocan el archivo
     except:
         # Si no hay archivo, crear un laberinto de ejemplo
         laberinto = np.array([
@@ -498,50 +1229,36 @@ if __name__ == '__main__':
             [1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
         ])
 
+    # Crear agentes con diferentes habilidades (antes que las posiciones: el objetivo tiene que ser alcanzable)
+    print("\nSelecciona el tipo de agente:")
+    print("1. Agente básico (movimiento normal)")
+    print("2. Agente con visión limitada (no puede girar a la izquierda)")
+    print("3. Agente veloz (puede avanzar 2 celdas, pero no sensar)")
+    print("4. Agente Omni (visión en todas direcciones)")
+
+    opcion = input("Opción: ")
+
+    # Cualquier otra opción: agente básico
+    nombre, habilidades = PERFILES_AGENTE.get(opcion, PERFILES_AGENTE["1"])
+    agente = Agente(nombre, dict(habilidades))
+
     # Definir estados inicial y objetivo
     estado_inicial_fila, estado_inicial_columna = solicitar_posicion_valida(laberinto, "el estado inicial")
-    estado_objetivo_fila, estado_objetivo_columna = solicitar_posicion_valida(laberinto, "el estado objetivo")
+    estado_inicial = Estado(estado_inicial_fila, estado_inicial_columna, 'derecha')
+    estado_objetivo_fila, estado_objetivo_columna = solicitar_posicion_valida(
+        laberinto, "el estado objetivo", IndiceAlcance(laberinto), estado_inicial, habilidades)
 
     # Validar que el estado objetivo no sea una pared
     if laberinto[estado_objetivo_fila][estado_objetivo_columna] == 0:
         print("Error: El estado objetivo no puede estar en una pared.")
         sys.exit(1)
 
-    estado_inicial = Estado(estado_inicial_fila, estado_inicial_columna, 'derecha')
     estado_objetivo = Estado(estado_objetivo_fila, estado_objetivo_columna)
 
-    # Crear agentes con diferentes habilidades
-    print("\nSelecciona el tipo de agente:")
-    print("1. Agente básico (movimiento normal)")
-    print("2. Agente con visión limitada (no puede girar a la izquierda)")
-    print("3. Agente veloz (puede avanzar 2 celdas, pero no sensar)")
-    print("4. Agente Omni (visión en todas direcciones)")
-
-    opcion = input("Opción: ")
-
-    if opcion == "2":
-        agente = Agente("Explorador Zurdo", {
-            'puede_girar_izquierda': False,
-            'vision_lejana': False
-        })
-    elif opcion == "3":
-        agente = Agente("Corredor Veloz", {
-            'rango_movimiento': 2,
-            'vision_lejana': False,
-            'puede_sensar': False
-        })
-    elif opcion == "4":
-        agente = Agente("Explorador Omni", {
-            'vision_omni': True,
-            'vision_lejana': False,
-            'puede_girar_izquierda': True,
-            'puede_girar_derecha': True,
-            'rango_movimiento': 1
-        })
-    else:
-        agente = Agente("Explorador Básico", {
-            'vision_lejana': False
-        })
-
-    # Iniciar el juego
-    jugar_laberinto_pygame(laberinto, estado_inicial, estado_objetivo, agente)
\ No newline at end of file
+    # Iniciar el juego (python main.py map.txt partida.rep graba la partida; ver repeticion.py)
+    ruta_grabacion = argumentos[1] if len(argumentos) > 1 else None
+    perfilador = Perfilador() if ruta_traza else None
+    jugar_laberinto_pygame(laberinto, estado_inicial, estado_objetivo, agente, ruta_grabacion, ruta_mapa, perfilador)
+    if perfilador is not None:
+        perfilador.exportar_traza(ruta_traza)
+        print(perfilador.resumen())
\ No newline at end of file
@@ -0,0 +1,188 @@
+import json
+import os
+import time
+from collections import defaultdict, deque
+
+# Métodos que Perfilador.instrumentar envuelve con un temporizador
+METODOS_PROBLEMA = ('ejecutar_accion', 'sensar_camino', 'revelar_rayo', 'avanzar', 'girar_izquierda', 'girar_derecha')
+METODOS_AGENTE = ('registrar_decision',)
+
+
+class _Fase:
+    """Contexto que mide una fase del cuadro (reutilizable: un objeto por nombre de fase)"""
+    __slots__ = ('perfilador', 'nombre', 'inicio')
+
+    def __init__(self, perfilador, nombre):
+        self.perfilador = perfilador
+        self.nombre = nombre
+        self.inicio = 0
+
+    def __enter__(self):
+        self.inicio = time.perf_counter_ns()
+
+    def __exit__(self, *excepcion):
+        self.perfilador.anotar(self.nombre, self.inicio, time.perf_counter_ns(), 'fase')
+
+
+class Perfilador:
+    """
+    Instrumentación opcional del bucle del juego.
+
+    - fase(nombre): contexto que mide una fase del cuadro (eventos, dibujo, espera...).
+    - instrumentar(problema): envuelve los métodos de METODOS_PROBLEMA/METODOS_AGENTE de ese Problema
+      y su agente con temporizadores (solo en esos objetos: el resto del programa no paga nada).
+    - fin_cuadro(**contadores): cierra el cuadro y anota contadores (celdas dibujadas, reveladas...).
+    - exportar_traza(ruta): eventos en el formato JSON de trazas de Chrome (chrome://tracing o Perfetto).
+
+    Los tiempos de los últimos `ventana` cuadros dan los FPS y las medias por fase de la superposición.
+    Se guardan como mucho `max_eventos` eventos para la traza (los más antiguos se descartan).
+    """
+
+    def __init__(self, ventana=60, max_eventos=1_000_000):
+        self.origen = time.perf_counter_ns()
+        self.eventos = deque(maxlen=max_eventos)  # (nombre, categoría, inicio, duración) en ns
+        self.contadores = deque(maxlen=max_eventos)  # (instante, dict de contadores)
+        self.cuadros = deque(maxlen=ventana)  # (duración del cuadro, tiempos por nombre, contadores)
+        self.totales = defaultdict(int)  # ns acumulados por nombre en toda la sesión
+        self.llamadas = defaultdict(int)
+        self._fases = {}
+        self._tiempos = defaultdict(int)
+        self._inicio_cuadro = None
+        self._texto = None
+        self._ultimo_texto = 0
+
+    # %% Medición
+    def fase(self, nombre):
+        fase = self._fases.get(nombre)
+        if fase is None:
+            fase = self._fases[nombre] = _Fase(self, nombre)
+        return fase
+
+    def anotar(self, nombre, inicio, fin, categoria='metodo'):
+        duracion = fin - inicio
+        self._tiempos[nombre] += duracion
+        self.totales[nombre] += duracion
+        self.llamadas[nombre] += 1
+        self.eventos.append((nombre, categoria, inicio, duracion))
+
+    def _envolver(self, nombre, funcion):
+        reloj = time.perf_counter_ns
+        anotar = self.anotar
+
+        def medida(*args, **kwargs):
+            inicio = reloj()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                anotar(nombre, inicio, reloj())
+        medida.original = funcion
+        return medida
+
+    def instrumentar(self, problema):
+        """Mide los métodos de este Problema y de su agente. Devuelve el mismo Problema"""
+        for objeto, metodos in ((problema, METODOS_PROBLEMA), (problema.agente, METODOS_AGENTE)):
+            for nombre in metodos:
+                metodo = getattr(objeto, nombre)
+                if not hasattr(metodo, 'original'):  # No envolver dos veces (el agente sigue tras reiniciar)
+                    setattr(objeto, nombre, self._envolver(nombre, metodo))
+        return problema
+
+    def inicio_cuadro(self):
+        self._inicio_cuadro = time.perf_counter_ns()
+        self._tiempos = defaultdict(int)
+
+    def fin_cuadro(self, **contadores):
+        """Cierra el cuadro: anota su duración y los contadores dados (valores enteros)"""
+        fin = time.perf_counter_ns()
+        self.anotar('cuadro', self._inicio_cuadro, fin, 'cuadro')
+        if contadores:
+            self.contadores.append((fin, contadores))
+        self.cuadros.append((fin - self._inicio_cuadro, self._tiempos, contadores))
+
+    # %% Resúmenes
+    @property
+    def fps(self):
+        total = sum(duracion for duracion, _, _ in self.cuadros)
+        return len(self.cuadros) * 1e9 / total if total else 0.0
+
+    def medias(self):
+        """Milisegundos medios por cuadro de cada fase y método en la ventana"""
+        sumas = defaultdict(int)
+        for _, tiempos, _ in self.cuadros:
+            for nombre, duracion in tiempos.items():
+                sumas[nombre] += duracion
+        n = max(len(self.cuadros), 1)
+        return {nombre: total / n / 1e6 for nombre, total in sumas.items() if nombre != 'cuadro'}
+
+    def texto_superposicion(self):
+        partes = [f"FPS {self.fps:.1f}"]
+        partes += [f"{nombre} {ms:.2f} ms" for nombre, ms in sorted(self.medias().items(), key=lambda p: -p[1])[:5]]
+        if self.cuadros and self.cuadros[-1][2]:
+            partes += [f"{nombre} {valor}" for nombre, valor in self.cuadros[-1][2].items()]
+        return " | ".join(partes)
+
+    def dibujar_superposicion(self, pygame, screen, font, y, cada_ms=250):
+        """Dibuja FPS y fases en una línea a partir de la altura y; el texto se rehace cada `cada_ms` ms"""
+        ahora = time.perf_counter_ns()
+        if self._texto is not None and ahora - self._ultimo_texto < cada_ms * 1_000_000:
+            return
+        self._ultimo_texto = ahora
+        self._texto = font.render(self.texto_superposicion(), True, (255, 255, 0))
+        banda = pygame.Rect(0, y, screen.get_width(), font.get_linesize())
+        screen.fill((0, 0, 0), banda)
+        screen.blit(self._texto, (10, y))
+        pygame.display.update(banda)
+
+    def resumen(self):
+        """Tabla de tiempo total, llamadas y media por llamada de cada nombre medido"""
+        lineas = [f"{'nombre':<20}{'total ms':>12}{'llamadas':>10}{'media us':>12}"]
+        for nombre, total in sorted(self.totales.items(), key=lambda p: -p[1]):
+            llamadas = self.llamadas[nombre]
+            lineas.append(f"{nombre:<20}{total / 1e6:>12.2f}{llamadas:>10}{total / llamadas / 1e3:>12.1f}")
+        return "\n".join(lineas)
+
+    # %% Traza
+    def exportar_traza(self, ruta):
+        """Escribe los eventos en formato de trazas de Chrome (JSON con tiempos en microsegundos)"""
+        pid = os.getpid()
+        eventos = [{'name': nombre, 'cat': categoria, 'ph': 'X', 'pid': pid, 'tid': 0,
+                    'ts': (inicio - self.origen) / 1000, 'dur': duracion / 1000}
+                   for nombre, categoria, inicio, duracion in self.eventos]
+        eventos += [{'name': 'contadores', 'ph': 'C', 'pid': pid, 'tid': 0, 'ts': (instante - self.origen) / 1000,
+                     'args': contadores}
+                    for instante, contadores in self.contadores]
+        with open(ruta, 'w') as archivo:
+            json.dump({'traceEvents': eventos, 'displayTimeUnit': 'ms'}, archivo)
+
+
+class _PerfiladorNulo:
+    """Mismos métodos que Perfilador sin hacer nada: el bucle del juego lo usa cuando no se perfila"""
+
+    class _FaseNula:
+        __slots__ = ()
+
+        def __enter__(self):
+            pass
+
+        def __exit__(self, *excepcion):
+            pass
+
+    _fase = _FaseNula()
+
+    def fase(self, nombre):
+        return self._fase
+
+    def instrumentar(self, problema):
+        return problema
+
+    def inicio_cuadro(self):
+        pass
+
+    def fin_cuadro(self, **contadores):
+        pass
+
+    def dibujar_superposicion(self, pygame, screen, font, y, cada_ms=250):
+        pass
+
+
+SIN_PERFILADO = _PerfiladorNulo()
@@ -0,0 +1,486 @@
+import heapq
+import time
+
+import numpy as np
+
+from codigos import (DIRECCIONES, ARRIBA, DERECHA, ABAJO, IZQUIERDA, CODIGO_DIRECCION, DELTA_FILA, DELTA_COLUMNA, ACCIONES,
+                     AVANZAR, GIRAR_IZQUIERDA, GIRAR_DERECHA, celdas_transitables)
+from recorrido import TablasRecorrido
+
+# Coste de entrar en cada tipo de celda: camino, agua, arena y bosque (pared y montaña no se pisan)
+COSTO_TERRENO = np.array([0, 1, 2, 3, 4, 0], dtype=np.int64)
+INFINITO = np.iinfo(np.int32).max // 2
+ALGORITMOS = ('bfs', 'dijkstra', 'astar')
+# A* expande a la vez las cubetas de f en [mínima, mínima + VENTANA_ASTAR): menos rondas a cambio de reabrir estados
+VENTANA_ASTAR = 8
+# Con más celdas objetivo, la heurística mide la distancia a su rectángulo envolvente
+MAX_OBJETIVOS_HEURISTICA = 8
+
+
+def _giros_entre(origen, destino):
+    """Número mínimo de giros de 90 grados entre dos direcciones (0, 1 o 2)"""
+    diferencia = (destino - origen) & 3
+    return np.minimum(diferencia, 4 - diferencia)
+
+
+def _tabla_giros():
+    """
+    Giros mínimos para apuntar a las direcciones que acercan al objetivo, indexados por
+    direccion * 9 + (signo(df) + 1) * 3 + signo(dc) + 1
+    """
+    tabla = np.zeros((4, 3, 3), dtype=np.int64)
+    for direccion in range(4):
+        for signo_fila in (-1, 0, 1):
+            for signo_columna in (-1, 0, 1):
+                giros_vertical = _giros_entre(direccion, ARRIBA if signo_fila < 0 else ABAJO)
+                giros_horizontal = _giros_entre(direccion, IZQUIERDA if signo_columna < 0 else DERECHA)
+                if signo_fila == 0:
+                    giros = giros_horizontal if signo_columna else 0
+                else:
+                    # Hay que avanzar en los dos ejes: se empieza por el que convenga
+                    giros = giros_vertical if signo_columna == 0 else 1 + min(giros_vertical, giros_horizontal)
+                tabla[direccion, signo_fila + 1, signo_columna + 1] = giros
+    return tabla.ravel()
+
+
+_GIROS = _tabla_giros()
+
+
+# %% Resultado
+class ResultadoPlan:
+    def __init__(self, algoritmo, acciones, estados, costo, expandidos, generados, tiempo):
+        self.algoritmo = algoritmo
+        self.acciones = acciones  # Nombres de acciones de Problema, o None si no hay camino
+        self.estados = estados  # (fila, columna, direccion) desde el inicio hasta el objetivo
+        self.costo = costo
+        self.expandidos = expandidos
+        self.generados = generados
+        self.tiempo = tiempo
+
+    @property
+    def encontrado(self):
+        return self.acciones is not None
+
+    def __str__(self):
+        if not self.encontrado:
+            return f"{self.algoritmo}: sin camino ({self.expandidos} expandidos, {self.tiempo:.3f} s)"
+        return (f"{self.algoritmo}: {len(self.acciones)} acciones, costo {self.costo} "
+                f"({self.expandidos} expandidos, {self.generados} generados, {self.tiempo:.3f} s)")
+
+
+# %% Cola por cubetas
+class _ColaCubetas:
+    """
+    Cola de prioridad con prioridades enteras: cada cubeta guarda arreglos de estados junto con
+    el coste g que tenían al entrar, para descartar después las entradas obsoletas sin recalcular nada.
+    """
+
+    def __init__(self):
+        self.cubetas = {}
+        self.claves = []
+
+    def __bool__(self):
+        return bool(self.claves)
+
+    def minima(self):
+        return self.claves[0] if self.claves else INFINITO
+
+    def agregar(self, prioridades, estados, costes):
+        if len(estados) == 0:
+            return
+        if prioridades.min() == prioridades.max():
+            grupos = [(int(prioridades[0]), estados, costes)]
+        else:
+            orden = np.argsort(prioridades, kind='stable')
+            prioridades, estados, costes = prioridades[orden], estados[orden], costes[orden]
+            cortes = np.flatnonzero(prioridades[1:] != prioridades[:-1]) + 1
+            inicios, finales = [0] + cortes.tolist(), cortes.tolist() + [len(estados)]
+            grupos = ((valor, estados[i:j], costes[i:j])
+                      for valor, i, j in zip(prioridades[inicios].tolist(), inicios, finales))
+
+        for valor, grupo, coste in grupos:
+            lista = self.cubetas.get(valor)
+            if lista is None:
+                self.cubetas[valor] = [(grupo, coste)]
+                heapq.heappush(self.claves, valor)
+            else:
+                lista.append((grupo, coste))
+
+    def extraer(self, ventana=1):
+        """Saca las cubetas con prioridad menor que la mínima + `ventana`"""
+        valor = heapq.heappop(self.claves)
+        grupos = self.cubetas.pop(valor)
+        while self.claves and self.claves[0] < valor + ventana:
+            grupos += self.cubetas.pop(heapq.heappop(self.claves))
+        if len(grupos) == 1:
+            return valor, grupos[0][0], grupos[0][1]
+        return valor, np.concatenate([e for e, _ in grupos]), np.concatenate([c for _, c in grupos])
+
+
+# %% Planificador
+class Planificador:
+    """
+    Búsqueda óptima en el espacio (fila, columna, direccion) con el modelo de transición de Problema.
+
+    Cada estado es un índice (fila * ancho + columna) * 4 + direccion y los conjuntos abierto/cerrado,
+    los costes y los padres son arreglos de NumPy de ese tamaño. La búsqueda se hace por cubetas
+    de prioridad entera: todos los estados de una cubeta se expanden a la vez con operaciones
+    vectorizadas, así que el coste por estado es mucho menor que con un heap de objetos Estado.
+
+    Costes: girar cuesta 1; avanzar cuesta la suma del terreno de las celdas en las que se entra
+    (1 camino, 2 agua, 3 arena, 4 bosque), o 1 por acción con costos='unitario'.
+    """
+
+    def __init__(self, laberinto, habilidades, tablas=None):
+        self.laberinto = np.asarray(laberinto)
+        self.alto, self.ancho = self.laberinto.shape
+        self.tablas = tablas if tablas is not None else TablasRecorrido(self.laberinto)
+
+        self.puede_girar_izquierda = habilidades.get('puede_girar_izquierda', True)
+        self.puede_girar_derecha = habilidades.get('puede_girar_derecha', True)
+        self.rango = habilidades.get('rango_movimiento', 1)
+
+        self.num_estados = self.alto * self.ancho * 4
+        self.tipo_indice = np.int32 if self.num_estados < np.iinfo(np.int32).max else np.int64
+        self._libre = self.tablas.libre.reshape(4, -1)
+        self._transitable = celdas_transitables(self.laberinto).ravel()
+        self._costo_celda = COSTO_TERRENO[np.clip(self.laberinto, 0, 5)].ravel()
+        self._paso_celda = DELTA_FILA * self.ancho + DELTA_COLUMNA
+
+    # %% Conversión de estados
+    def indice(self, estado):
+        """Índice de un estado dado como Estado o como tupla (fila, columna, direccion)"""
+        if isinstance(estado, tuple):
+            fila, columna, direccion = estado
+        else:
+            fila, columna, direccion = estado.fila, estado.columna, estado.direccion
+        return (fila * self.ancho + columna) * 4 + CODIGO_DIRECCION.get(direccion, direccion)
+
+    def tupla(self, indice):
+        celda, direccion = divmod(int(indice), 4)
+        fila, columna = divmod(celda, self.ancho)
+        return fila, columna, DIRECCIONES[direccion]
+
+    # %% Transiciones vectorizadas
+    def _costo_avance(self, celdas, direcciones, pasos, costos, hacia_atras=False):
+        """Suma del terreno de las celdas recorridas (unitario: 1 por acción)"""
+        if costos == 'unitario':
+            return np.ones(len(celdas), dtype=np.int64)
+        paso = self._paso_celda[direcciones] * (-1 if hacia_atras else 1)
+        total = np.zeros(len(celdas), dtype=np.int64)
+        # Hacia delante se cuentan las celdas 1..pasos; hacia atrás, el destino y las anteriores
+        desplazamiento = 0 if hacia_atras else 1
+        for j in range(int(pasos.max(initial=0))):
+            activos = j < pasos
+            total[activos] += self._costo_celda[celdas[activos] + (j + desplazamiento) * paso[activos]]
+        return total
+
+    def sucesores(self, estados, costos='terreno'):
+        """Devuelve (vecinos, costes, acciones, origen) de todas las transiciones desde `estados`"""
+        celdas, direcciones = estados >> 2, estados & 3
+        vecinos, costes, acciones, origen = [], [], [], []
+        posiciones = np.arange(len(estados))
+
+        pasos = np.minimum(self.rango, self._libre[direcciones, celdas].astype(np.int64))
+        validos = pasos > 0
+        c, d, k = celdas[validos], direcciones[validos], pasos[validos]
+        vecinos.append((c + k * self._paso_celda[d]) * 4 + d)
+        costes.append(self._costo_avance(c, d, k, costos))
+        acciones.append(np.full(len(c), AVANZAR, dtype=np.int8))
+        origen.append(posiciones[validos])
+
+        for codigo, puede, giro in ((GIRAR_IZQUIERDA, self.puede_girar_izquierda, 3),
+                                    (GIRAR_DERECHA, self.puede_girar_derecha, 1)):
+            if puede:
+                vecinos.append((celdas << 2) | ((direcciones + giro) & 3))
+                costes.append(np.ones(len(estados), dtype=np.int64))
+                acciones.append(np.full(len(estados), codigo, dtype=np.int8))
+                origen.append(posiciones)
+
+        return np.concatenate(vecinos), np.concatenate(costes), np.concatenate(acciones), np.concatenate(origen)
+
+    def predecesores(self, estados, costos='terreno', celda_inicio=-1):
+        """Transiciones inversas: (previos, costes, acciones) tales que la acción lleva del previo a `estados`"""
+        celdas, direcciones = estados >> 2, estados & 3
+        previos, costes, acciones, origen = [], [], [], []
+        posiciones = np.arange(len(estados))
+
+        # Avanzar: el previo está k celdas detrás y su avance se detiene justo aquí
+        paso = self._paso_celda[direcciones]
+        filas, columnas = np.divmod(celdas, self.ancho)
+        margen = np.choose(direcciones, (self.alto - 1 - filas, columnas, filas, self.ancho - 1 - columnas))
+        for k in range(1, self.rango + 1):
+            validos = k <= margen
+            previa = np.where(validos, celdas - k * paso, 0)
+            validos &= self._transitable[previa] | (previa == celda_inicio)
+            validos &= np.minimum(self.rango, self._libre[direcciones, previa].astype(np.int64)) == k
+            previos.append(previa[validos] * 4 + direcciones[validos])
+            costes.append(self._costo_avance(celdas[validos], direcciones[validos],
+                                             np.full(validos.sum(), k), costos, hacia_atras=True))
+            acciones.append(np.full(validos.sum(), AVANZAR, dtype=np.int8))
+            origen.append(posiciones[validos])
+
+        # Girar a la izquierda lleva de d + 1 a d; girar a la derecha, de d - 1 a d
+        for codigo, puede, giro in ((GIRAR_IZQUIERDA, self.puede_girar_izquierda, 1),
+                                    (GIRAR_DERECHA, self.puede_girar_derecha, 3)):
+            if puede:
+                previos.append((celdas << 2) | ((direcciones + giro) & 3))
+                costes.append(np.ones(len(estados), dtype=np.int64))
+                acciones.append(np.full(len(estados), codigo, dtype=np.int8))
+                origen.append(posiciones)
+
+        return np.concatenate(previos), np.concatenate(costes), np.concatenate(acciones), np.concatenate(origen)
+
+    def heuristica(self, estados, objetivos, costos='terreno'):
+        """
+        Cota inferior admisible y consistente del coste hasta el objetivo más cercano:
+        distancia Manhattan (en avances si los costes son unitarios) más los giros imprescindibles
+        para mirar hacia las direcciones que acercan al objetivo.
+        """
+        return self._preparar_heuristica(objetivos, costos)(estados)
+
+    def _preparar_heuristica(self, objetivos, costos):
+        """
+        Analiza los objetivos una sola vez por búsqueda y devuelve la función que evalúa la heurística.
+        Con muchas celdas objetivo se usa la distancia a su rectángulo envolvente: la misma cota respecto
+        al punto del rectángulo más cercano, que sigue siendo admisible y consistente y cuesta como un solo objetivo.
+        """
+        filas_obj, columnas_obj = np.divmod(np.unique(np.asarray(objetivos) >> 2), self.ancho)
+        if len(filas_obj) > MAX_OBJETIVOS_HEURISTICA:
+            rectangulos = [(int(filas_obj.min()), int(filas_obj.max()), int(columnas_obj.min()), int(columnas_obj.max()))]
+        else:
+            rectangulos = [(f, f, c, c) for f, c in zip(filas_obj.tolist(), columnas_obj.tolist())]
+
+        def heuristica(estados):
+            filas, columnas = np.divmod(estados >> 2, self.ancho)
+            h = np.full(len(estados), INFINITO, dtype=np.int64)
+            for fila_min, fila_max, columna_min, columna_max in rectangulos:
+                df = (fila_min if fila_min == fila_max else np.clip(filas, fila_min, fila_max)) - filas
+                dc = (columna_min if columna_min == columna_max else np.clip(columnas, columna_min, columna_max)) - columnas
+                if costos == 'unitario':
+                    # Cada avance recorre como mucho `rango` celdas
+                    distancia = -(-np.abs(df) // self.rango) - (-np.abs(dc) // self.rango)
+                else:
+                    # Cada celda recorrida cuesta al menos 1
+                    distancia = np.abs(df) + np.abs(dc)
+                distancia += _GIROS[(estados & 3) * 9 + (np.sign(df) + 1) * 3 + np.sign(dc) + 1]
+                np.minimum(h, distancia, out=h)
+            return h
+        return heuristica
+
+    # %% Búsquedas
+    def _relajar(self, g, padre, accion, estados, vecinos, costes, acciones, origen):
+        """Actualiza costes y padres; devuelve los vecinos mejorados y su nuevo coste"""
+        nuevo = g[estados[origen]].astype(np.int64) + costes
+        mejora = nuevo < g[vecinos]
+        vecinos, nuevo, acciones, padres = vecinos[mejora], nuevo[mejora], acciones[mejora], estados[origen[mejora]]
+        np.minimum.at(g, vecinos, nuevo.astype(g.dtype))
+        ganadores = g[vecinos] == nuevo
+        vecinos, nuevo, padres, acciones = vecinos[ganadores], nuevo[ganadores], padres[ganadores], acciones[ganadores]
+        padre[vecinos] = padres
+        accion[vecinos] = acciones
+        # Si un vecino empata desde varios padres, solo queda la última escritura: así no hay duplicados
+        unicos = (padre[vecinos] == padres) & (accion[vecinos] == acciones)
+        return vecinos[unicos], nuevo[unicos]
+
+    def buscar(self, inicio, objetivos, algoritmo='dijkstra', costos=None, bidireccional=False, solo_posicion=False):
+        """
+        Busca un plan óptimo desde `inicio` hasta cualquiera de `objetivos` (Estado o tuplas).
+        algoritmo: 'bfs' (número de acciones), 'dijkstra' o 'astar' (por defecto con costes de terreno).
+        Por defecto 'dijkstra': con la cola por cubetas, A* expande menos estados pero en más rondas y no suele ganar.
+        solo_posicion: el objetivo se alcanza en cualquier dirección (Problema.es_objetivo exige también la dirección).
+        """
+        if algoritmo not in ALGORITMOS:
+            raise ValueError(f"Algoritmo desconocido: {algoritmo}. Opciones: {ALGORITMOS}")
+        if costos is None:
+            costos = 'unitario' if algoritmo == 'bfs' else 'terreno'
+        if bidireccional and algoritmo == 'astar':
+            raise ValueError("La búsqueda bidireccional solo está disponible para 'bfs' y 'dijkstra'")
+
+        inicial = self.indice(inicio)
+        metas = np.array([self.indice(o) for o in objetivos], dtype=np.int64)
+        if solo_posicion:
+            metas = np.unique(((metas >> 2) << 2)[:, None] + np.arange(4)).astype(np.int64)
+
+        t0 = time.perf_counter()
+        if bidireccional:
+            resultado = self._buscar_bidireccional(inicial, metas, costos)
+        else:
+            resultado = self._buscar(inicial, metas, costos, usar_heuristica=algoritmo == 'astar')
+        plan, costo, expandidos, generados = resultado
+
+        acciones = estados = None
+        if plan is not None:
+            acciones = [ACCIONES[a] for a in plan[1]]
+            estados = [self.tupla(s) for s in plan[0]]
+        return ResultadoPlan(algoritmo + ('-bidireccional' if bidireccional else ''), acciones, estados,
+                             costo, expandidos, generados, time.perf_counter() - t0)
+
+    def _buscar(self, inicial, metas, costos, usar_heuristica):
+        """
+        Dijkstra (o BFS) expande cada cubeta por separado y termina al sacar un objetivo. A* saca varias
+        cubetas de f por ronda, así que un estado expandido aún puede mejorar y se reabre; el objetivo
+        es óptimo cuando ninguna entrada pendiente tiene f menor que su coste.
+        """
+        g = np.full(self.num_estados, INFINITO, dtype=np.int32)
+        padre = np.full(self.num_estados, -1, dtype=self.tipo_indice)
+        accion = np.full(self.num_estados, -1, dtype=np.int8)
+        cerrado = np.zeros(self.num_estados, dtype=bool)
+        es_meta = np.zeros(self.num_estados, dtype=bool)
+        es_meta[metas] = True
+
+        if usar_heuristica:
+            h, ventana = self._preparar_heuristica(metas, costos), VENTANA_ASTAR
+        else:
+            h, ventana = (lambda estados: np.zeros(len(estados), dtype=np.int64)), 1
+
+        g[inicial] = 0
+        abiertos = _ColaCubetas()
+        inicio = np.array([inicial], dtype=np.int64)
+        abiertos.agregar(h(inicio), inicio, np.zeros(1, dtype=np.int64))
+        expandidos = generados = 0
+        meta = -1
+
+        while abiertos and (meta < 0 or abiertos.minima() < g[meta]):
+            _, estados, costes = abiertos.extraer(ventana)
+            estados = estados[(g[estados] == costes) & ~cerrado[estados]]  # Descarta entradas obsoletas
+            if len(estados) == 0:
+                continue
+
+            cerrado[estados] = True
+            expandidos += len(estados)
+            alcanzadas = estados[es_meta[estados]]
+            if len(alcanzadas):
+                alcanzada = int(alcanzadas[np.argmin(g[alcanzadas])])
+                if meta < 0 or g[alcanzada] < g[meta]:
+                    meta = alcanzada
+                if ventana == 1:
+                    break
+
+            vecinos, costes, acciones, origen = self.sucesores(estados, costos)
+            if ventana == 1:
+                libres = ~cerrado[vecinos]
+                vecinos, costes, acciones, origen = vecinos[libres], costes[libres], acciones[libres], origen[libres]
+            vecinos, nuevo = self._relajar(g, padre, accion, estados, vecinos, costes, acciones, origen)
+            cerrado[vecinos] = False  # Reapertura (solo ocurre con ventana > 1)
+            generados += len(vecinos)
+            abiertos.agregar(nuevo + h(vecinos), vecinos, nuevo)
+
+        if meta < 0:
+            return None, None, expandidos, generados
+        return self._reconstruir(padre, accion, inicial, meta), int(g[meta]), expandidos, generados
+
+    def _buscar_bidireccional(self, inicial, metas, costos):
+        lados = []
+        for fuentes in (np.array([inicial], dtype=np.int64), metas):
+            g = np.full(self.num_estados, INFINITO, dtype=np.int32)
+            g[fuentes] = 0
+            cola = _ColaCubetas()
+            cola.agregar(np.zeros(len(fuentes), dtype=np.int64), fuentes, np.zeros(len(fuentes), dtype=np.int64))
+            lados.append({
+                'g': g, 'cola': cola,
+                'padre': np.full(self.num_estados, -1, dtype=self.tipo_indice),
+                'accion': np.full(self.num_estados, -1, dtype=np.int8),
+                'cerrado': np.zeros(self.num_estados, dtype=bool),
+            })
+        adelante, atras = lados
+        celda_inicio = inicial >> 2
+
+        # Mejor encuentro conocido entre las dos búsquedas
+        mejor, encuentro = INFINITO, -1
+        comunes = np.intersect1d([inicial], metas)
+        if len(comunes):
+            mejor, encuentro = 0, int(comunes[0])
+        expandidos = generados = 0
+
+        while adelante['cola'] and atras['cola']:
+            if adelante['cola'].minima() + atras['cola'].minima() >= mejor:
+                break
+            # Se avanza por el lado con la frontera más barata
+            es_adelante = adelante['cola'].minima() <= atras['cola'].minima()
+            lado, otro = (adelante, atras) if es_adelante else (atras, adelante)
+
+            _, estados, costes = lado['cola'].extraer()
+            estados = estados[(lado['g'][estados] == costes) & ~lado['cerrado'][estados]]
+            if len(estados) == 0:
+                continue
+            lado['cerrado'][estados] = True
+            expandidos += len(estados)
+
+            if es_adelante:
+                vecinos, costes, acciones, origen = self.sucesores(estados, costos)
+            else:
+                vecinos, costes, acciones, origen = self.predecesores(estados, costos, celda_inicio)
+            libres = ~lado['cerrado'][vecinos]
+            vecinos, nuevo = self._relajar(lado['g'], lado['padre'], lado['accion'], estados, vecinos[libres],
+                                           costes[libres], acciones[libres], origen[libres])
+            generados += len(vecinos)
+            lado['cola'].agregar(nuevo, vecinos, nuevo)
+
+            if len(vecinos):
+                total = nuevo + otro['g'][vecinos]
+                i = int(np.argmin(total))
+                if total[i] < mejor:
+                    mejor, encuentro = int(total[i]), int(vecinos[i])
+
+        if encuentro < 0:
+            return None, None, expandidos, generados
+
+        camino, acciones = self._reconstruir(adelante['padre'], adelante['accion'], inicial, encuentro)
+        # En la búsqueda hacia atrás el "padre" es el estado siguiente camino del objetivo
+        estado = encuentro
+        while atras['padre'][estado] >= 0 and atras['g'][estado] > 0:
+            acciones.append(int(atras['accion'][estado]))
+            estado = int(atras['padre'][estado])
+            camino.append(estado)
+        return (camino, acciones), mejor, expandidos, generados
+
+    def explorar_hacia(self, objetivos, costos='terreno', solo_posicion=False):
+        """
+        Dijkstra completo hacia atrás desde los objetivos.
+        Devuelve (distancia, accion): para cada índice de estado, el coste óptimo hasta el objetivo
+        (INFINITO si no se puede llegar) y el código de la primera acción de un plan óptimo.
+        """
+        metas = np.array([self.indice(o) for o in objetivos], dtype=np.int64)
+        if solo_posicion:
+            metas = np.unique(((metas >> 2) << 2)[:, None] + np.arange(4)).astype(np.int64)
+
+        g = np.full(self.num_estados, INFINITO, dtype=np.int32)
+        siguiente = np.full(self.num_estados, -1, dtype=self.tipo_indice)
+        accion = np.full(self.num_estados, -1, dtype=np.int8)
+        cerrado = np.zeros(self.num_estados, dtype=bool)
+        g[metas] = 0
+        cola = _ColaCubetas()
+        cola.agregar(np.zeros(len(metas), dtype=np.int64), metas, np.zeros(len(metas), dtype=np.int64))
+
+        while cola:
+            _, estados, costes = cola.extraer()
+            estados = estados[(g[estados] == costes) & ~cerrado[estados]]
+            if len(estados) == 0:
+                continue
+            cerrado[estados] = True
+            previos, costes, acciones, origen = self.predecesores(estados, costos)
+            libres = ~cerrado[previos]
+            previos, nuevo = self._relajar(g, siguiente, accion, estados, previos[libres], costes[libres],
+                                           acciones[libres], origen[libres])
+            cola.agregar(nuevo, previos, nuevo)
+        return g, accion
+
+    @staticmethod
+    def _reconstruir(padre, accion, inicial, meta):
+        camino, acciones = [meta], []
+        estado = meta
+        while estado != inicial:
+            acciones.append(int(accion[estado]))
+            estado = int(padre[estado])
+            camino.append(estado)
+        camino.reverse()
+        acciones.reverse()
+        return camino, acciones
+
+
+def planificar(problema, algoritmo='dijkstra', costos=None, bidireccional=False, solo_posicion=False):
+    """Planifica desde el estado inicial de un Problema hasta sus objetivos con las habilidades de su agente"""
+    planificador = Planificador(problema.laberinto, problema.agente.habilidades, problema.tablas)
+    return planificador.buscar(problema.estado_inicial, problema.estados_objetivos, algoritmo, costos,
+                               bidireccional, solo_posicion)
@@ -0,0 +1,131 @@
+import tempfile
+
+import numpy as np
+
+from codigos import ARRIBA, DERECHA, ABAJO, IZQUIERDA, celdas_transitables
+
+
+def _tipo_distancia(longitud):
+    """Entero sin signo más pequeño capaz de guardar distancias de hasta `longitud` celdas"""
+    for tipo in (np.uint8, np.uint16, np.uint32):
+        if longitud <= np.iinfo(tipo).max:
+            return tipo
+    return np.uint64
+
+
+def libres_hacia_delante(transitable):
+    """Para cada índice del último eje, cuántas celdas transitables consecutivas hay justo después"""
+    n = transitable.shape[-1]
+    indices = np.arange(n)
+    # Índice de la primera celda bloqueada a partir de cada posición (n si no hay ninguna)
+    bloqueo = np.where(transitable, n, indices)
+    siguiente_bloqueo = np.minimum.accumulate(bloqueo[..., ::-1], axis=-1)[..., ::-1]
+    libres = np.zeros(transitable.shape, dtype=np.int64)
+    libres[..., :-1] = siguiente_bloqueo[..., 1:] - indices[1:]
+    return libres
+
+
+def libres_hacia_atras(transitable):
+    """Para cada índice del último eje, cuántas celdas transitables consecutivas hay justo antes"""
+    return libres_hacia_delante(transitable[..., ::-1])[..., ::-1]
+
+
+class TablasRecorrido:
+    """
+    Distancia libre precalculada desde cada celda en cada dirección.
+
+    libre[d, f, c] es el número de celdas transitables seguidas que hay delante de (f, c) mirando
+    en la dirección d (códigos de codigos.DIRECCIONES), sin contar la propia celda. Con ella,
+    sensar y avanzar cuestan lo mismo sea cual sea el alcance o el rango de movimiento.
+    """
+
+    # A partir de este número de celdas se calcula por bandas de filas para no crear temporales enormes
+    CELDAS_POR_BANDA = 1 << 22
+
+    def __init__(self, laberinto, archivo=None):
+        """
+        archivo: ruta donde guardar las tablas como memmap. Si el laberinto es un np.memmap y no se da
+        ruta, las tablas van a un archivo temporal: así un mapa enorme no necesita caber en memoria.
+        """
+        en_disco = archivo is not None or isinstance(laberinto, np.memmap)
+        self.laberinto = np.asarray(laberinto)
+        self.alto, self.ancho = self.laberinto.shape
+        forma, tipo = (4, self.alto, self.ancho), _tipo_distancia(max(self.alto, self.ancho))
+        if en_disco:
+            self.libre = np.memmap(archivo if archivo is not None else tempfile.TemporaryFile(),
+                                   dtype=tipo, mode='w+', shape=forma)
+        else:
+            self.libre = np.zeros(forma, dtype=tipo)
+        self.reconstruir()
+
+    @classmethod
+    def desde_libre(cls, laberinto, libre):
+        """Envuelve tablas ya calculadas (por ejemplo, en memoria compartida) sin recalcularlas"""
+        tablas = cls.__new__(cls)
+        tablas.laberinto = np.asarray(laberinto)
+        tablas.alto, tablas.ancho = tablas.laberinto.shape
+        tablas.libre = libre
+        return tablas
+
+    def reconstruir(self):
+        """Recalcula las cuatro tablas completas"""
+        if self.laberinto.size > self.CELDAS_POR_BANDA or isinstance(self.libre, np.memmap):
+            self._reconstruir_por_bandas()
+            return
+        transitable = celdas_transitables(self.laberinto)
+        self.libre[DERECHA] = libres_hacia_delante(transitable)
+        self.libre[IZQUIERDA] = libres_hacia_atras(transitable)
+        self.libre[ABAJO] = libres_hacia_delante(transitable.T).T
+        self.libre[ARRIBA] = libres_hacia_atras(transitable.T).T
+
+    def _reconstruir_por_bandas(self):
+        """
+        Mismo resultado que reconstruir, recorriendo el laberinto por bandas de filas en orden:
+        las direcciones horizontales se resuelven dentro de cada banda y las verticales con una
+        recurrencia fila a fila que solo arrastra la fila anterior.
+        """
+        filas_por_banda = max(1, self.CELDAS_POR_BANDA // self.ancho)
+        anterior_transitable = np.zeros(self.ancho, dtype=bool)
+        anterior_arriba = np.zeros(self.ancho, dtype=np.int64)
+        for inicio in range(0, self.alto, filas_por_banda):
+            transitable = celdas_transitables(self.laberinto[inicio:inicio + filas_por_banda])
+            self.libre[DERECHA, inicio:inicio + filas_por_banda] = libres_hacia_delante(transitable)
+            self.libre[IZQUIERDA, inicio:inicio + filas_por_banda] = libres_hacia_atras(transitable)
+            for i, fila_transitable in enumerate(transitable):
+                anterior_arriba = np.where(anterior_transitable, anterior_arriba + 1, 0)
+                self.libre[ARRIBA, inicio + i] = anterior_arriba
+                anterior_transitable = fila_transitable
+
+        siguiente_transitable = np.zeros(self.ancho, dtype=bool)
+        siguiente_abajo = np.zeros(self.ancho, dtype=np.int64)
+        for fin in range(self.alto, 0, -filas_por_banda):
+            inicio = max(0, fin - filas_por_banda)
+            transitable = celdas_transitables(self.laberinto[inicio:fin])
+            for i in range(fin - inicio - 1, -1, -1):
+                siguiente_abajo = np.where(siguiente_transitable, siguiente_abajo + 1, 0)
+                self.libre[ABAJO, inicio + i] = siguiente_abajo
+                siguiente_transitable = transitable[i]
+
+    def actualizar_celda(self, fila, columna):
+        """Corrige las tablas tras editar una celda: solo cambian su fila y su columna"""
+        fila_transitable = celdas_transitables(self.laberinto[fila])
+        self.libre[DERECHA, fila] = libres_hacia_delante(fila_transitable)
+        self.libre[IZQUIERDA, fila] = libres_hacia_atras(fila_transitable)
+
+        columna_transitable = celdas_transitables(self.laberinto[:, columna])
+        self.libre[ABAJO, :, columna] = libres_hacia_delante(columna_transitable)
+        self.libre[ARRIBA, :, columna] = libres_hacia_atras(columna_transitable)
+
+    def distancia(self, fila, columna, direccion):
+        """Celdas transitables seguidas delante de (fila, columna) en la dirección dada"""
+        return int(self.libre[direccion, fila, columna])
+
+    def hasta_borde(self, fila, columna, direccion):
+        """Celdas que quedan dentro del mapa delante de (fila, columna) en la dirección dada"""
+        if direccion == ARRIBA:
+            return fila
+        if direccion == ABAJO:
+            return self.alto - 1 - fila
+        if direccion == IZQUIERDA:
+            return columna
+        return self.ancho - 1 - columna
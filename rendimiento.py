@@ -0,0 +1,330 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Sin ventana: pygame dibuja sobre superficies en memoria
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from codigos import celdas_transitables
+from generador import generar
+from planificador import Planificador
+from alcance import IndiceAlcance
+from main import (Agente, Estado, Problema, PERFILES_AGENTE, RenderizadorIncremental, pygame, tamano_ventana,
+                  visualizar_laberinto_pygame)
+
+TAMANOS = (15, 64, 256, 1024, 4096)
+VERSION_BASE = 1
+
+
+# %% Mapas
+def generar_mapa(tamano, semilla=0):
+    """Laberinto cuadrado con bucles y la mezcla de terrenos por defecto de generador.py"""
+    return generar('bucles', tamano, tamano, semilla)
+
+
+def estados_al_azar(laberinto, n, rng):
+    """n estados sobre celdas transitables, con dirección al azar"""
+    celdas = np.flatnonzero(celdas_transitables(laberinto))
+    elegidas = rng.choice(celdas, n)
+    filas, columnas = np.divmod(elegidas, laberinto.shape[1])
+    return [Estado.interno(int(f), int(c), int(d))
+            for f, c, d in zip(filas.tolist(), columnas.tolist(), rng.integers(4, size=n).tolist())]
+
+
+def _problema(laberinto, perfil, estados):
+    nombre, habilidades = PERFILES_AGENTE[perfil]
+    agente = Agente(nombre, dict(habilidades))
+    return Problema(estados[0], [estados[-1]], laberinto, agente)
+
+
+# %% Pruebas
+# Cada prueba prepara lo necesario fuera de la medición y devuelve la función a cronometrar,
+# que recibe el número de llamada
+def _sensar(habilidades_extra, omni=False):
+    def preparar(laberinto, rng, llamadas):
+        estados = estados_al_azar(laberinto, llamadas, rng)
+        problema = _problema(laberinto, "4" if omni else "1", estados)
+        problema.agente.habilidades.update(habilidades_extra)
+        agente = problema.agente
+
+        def llamada(i):
+            if omni:
+                agente.vision_omni_activada = True
+            problema.sensar_camino(estados[i])
+        return llamada
+    return preparar
+
+
+def _avanzar(rango):
+    def preparar(laberinto, rng, llamadas):
+        estados = estados_al_azar(laberinto, llamadas, rng)
+        problema = _problema(laberinto, "1", estados)
+        problema.agente.habilidades['rango_movimiento'] = rango
+
+        def llamada(i):
+            problema.avanzar(estados[i])
+        return llamada
+    return preparar
+
+
+def _registrar_decision(laberinto, rng, llamadas):
+    estados = estados_al_azar(laberinto, llamadas + 1, rng)
+    agente = Agente(*PERFILES_AGENTE["1"])
+
+    def llamada(i):
+        agente.registrar_decision(estados[i], 'avanzar', estados[i + 1])
+    return llamada
+
+
+def _planificar(algoritmo):
+    def preparar(laberinto, rng, llamadas):
+        inicios = estados_al_azar(laberinto, llamadas, rng)
+        objetivos = estados_al_azar(laberinto, llamadas, rng)
+        planificador = Planificador(laberinto, PERFILES_AGENTE["1"][1])
+
+        def llamada(i):
+            planificador.buscar(inicios[i], [objetivos[i]], algoritmo, solo_posicion=True)
+        return llamada
+    return preparar
+
+
+def _alcanzable(perfil):
+    def preparar(laberinto, rng, llamadas):
+        inicios = estados_al_azar(laberinto, llamadas, rng)
+        objetivos = estados_al_azar(laberinto, llamadas, rng)
+        habilidades = PERFILES_AGENTE[perfil][1]
+        alcance = IndiceAlcance(laberinto)
+        alcance.alcanzable(inicios[0], objetivos[0], habilidades)  # Con rango > 1 se construye en la primera consulta
+
+        def llamada(i):
+            alcance.alcanzable(inicios[i], objetivos[i], habilidades)
+        return llamada
+    return preparar
+
+
+def _pantalla(laberinto, cell_size):
+    pygame.font.init()
+    alto, ancho = laberinto.shape
+    return pygame.Surface((ancho * cell_size, alto * cell_size + 100)), pygame.font.SysFont(None, 24)
+
+
+def _tamano_celda(laberinto):
+    # Superficies de como mucho unos 2048 píxeles de lado
+    return max(1, min(40, 2048 // max(laberinto.shape)))
+
+
+def _visualizar(laberinto, rng, llamadas):
+    estados = estados_al_azar(laberinto, llamadas, rng)
+    problema = _problema(laberinto, "1", estados)
+    for estado in estados:
+        problema.sensar_camino(estado)  # Parte del mapa visible, como en una partida
+    cell_size = _tamano_celda(laberinto)
+    pantalla, fuente = _pantalla(laberinto, cell_size)
+
+    def llamada(i):
+        visualizar_laberinto_pygame(laberinto, estados[i], problema, pantalla, fuente, cell_size)
+    return llamada
+
+
+def _dibujar_incremental(laberinto, rng, llamadas):
+    problema = _problema(laberinto, "1", estados_al_azar(laberinto, 2, rng))
+    cell_size = _tamano_celda(laberinto)
+    pantalla, fuente = _pantalla(laberinto, cell_size)
+    pygame.display.set_mode((1, 1))  # display.update necesita una ventana, aunque sea ficticia
+    renderizador = RenderizadorIncremental(laberinto, pantalla, fuente, cell_size)
+    estado = problema.estado_inicial
+    renderizador.dibujar(estado, problema)  # El primer cuadro es un redibujado completo
+    acciones = rng.integers(4, size=llamadas).tolist()  # avanzar, girar a un lado o al otro, sensar
+
+    def llamada(i):
+        nonlocal estado
+        estado, _ = problema.aplicar_accion(estado, acciones[i])
+        renderizador.dibujar(estado, problema)
+    return llamada
+
+
+def _dibujar_camara(laberinto, rng, llamadas):
+    # Ventana del juego: en mapas grandes, vista limitada que sigue al agente y minimapa
+    problema = _problema(laberinto, "1", estados_al_azar(laberinto, 2, rng))
+    pygame.font.init()
+    ventana, vista = tamano_ventana(*laberinto.shape)
+    pygame.display.set_mode((1, 1))
+    renderizador = RenderizadorIncremental(laberinto, pygame.Surface(ventana), pygame.font.SysFont(None, 24), 40, vista)
+    estado = problema.estado_inicial
+    renderizador.dibujar(estado, problema)
+    acciones = rng.integers(4, size=llamadas).tolist()
+
+    def llamada(i):
+        nonlocal estado
+        estado, _ = problema.aplicar_accion(estado, acciones[i])
+        renderizador.dibujar(estado, problema)
+    return llamada
+
+
+# nombre -> (preparar, llamadas por defecto, tamaño máximo por defecto)
+PRUEBAS = {
+    'sensar_normal': (_sensar({}), 20000, None),
+    'sensar_lejana': (_sensar({'vision_lejana': True}), 20000, None),
+    'sensar_omni': (_sensar({}, omni=True), 20000, None),
+    'avanzar_rango_1': (_avanzar(1), 20000, None),
+    'avanzar_rango_2': (_avanzar(2), 20000, None),
+    'avanzar_rango_8': (_avanzar(8), 20000, None),
+    'registrar_decision': (_registrar_decision, 20000, None),
+    # Cada búsqueda puede recorrer el mapa entero
+    'planificar_bfs': (_planificar('bfs'), 20, 1024),
+    'planificar_astar': (_planificar('astar'), 20, 1024),
+    # Lo que evita planificar: inicio y objetivo validados con el índice de alcance
+    'alcanzable_basico': (_alcanzable("1"), 20000, None),
+    'alcanzable_veloz': (_alcanzable("3"), 20000, None),
+    # Redibujado completo celda a celda: a partir de 1024x1024 cada cuadro tarda segundos
+    'visualizar_laberinto': (_visualizar, 20, 256),
+    'dibujar_incremental': (_dibujar_incremental, 2000, 1024),
+    'dibujar_camara': (_dibujar_camara, 2000, None),
+}
+
+
+# %% Medición
+def medir(preparar, laberinto, llamadas, semilla=0, calentamiento=100):
+    """
+    Prepara la prueba y cronometra cada llamada con perf_counter_ns. La memoria pico (tracemalloc)
+    se mide en una pasada aparte que incluye la preparación y el calentamiento, para no frenar la medición.
+    """
+    Estado.limpiar_internados()
+    gc.collect()
+    tracemalloc.start()
+    llamada = preparar(laberinto, np.random.default_rng(semilla), llamadas)
+    for i in range(min(calentamiento, llamadas)):
+        llamada(i)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Se vuelve a preparar para cronometrar desde el mismo estado inicial
+    llamada = preparar(laberinto, np.random.default_rng(semilla), llamadas)
+    gc.collect()
+    duraciones = np.empty(llamadas, dtype=np.int64)
+    reloj = time.perf_counter_ns
+    for i in range(llamadas):
+        inicio = reloj()
+        llamada(i)
+        duraciones[i] = reloj() - inicio
+
+    total = int(duraciones.sum())
+    p50, p90, p99 = np.percentile(duraciones, [50, 90, 99]) / 1000
+    return {
+        'llamadas': llamadas,
+        'ops_por_segundo': llamadas / (total / 1e9) if total else float('inf'),
+        'p50_us': float(p50),
+        'p90_us': float(p90),
+        'p99_us': float(p99),
+        'max_us': float(duraciones.max() / 1000),
+        'memoria_pico_bytes': int(pico),
+    }
+
+
+def ejecutar(pruebas=None, tamanos=TAMANOS, escala_llamadas=1.0, semilla=0, sin_limites=False, progreso=None):
+    """Ejecuta las pruebas en cada tamaño; devuelve {'prueba@tamaño': métricas}"""
+    resultados = {}
+    for tamano in tamanos:
+        laberinto = generar_mapa(tamano, semilla)
+        for nombre in pruebas or PRUEBAS:
+            preparar, llamadas, maximo = PRUEBAS[nombre]
+            if maximo is not None and tamano > maximo and not sin_limites:
+                continue
+            clave = f"{nombre}@{tamano}"
+            resultados[clave] = medir(preparar, laberinto, max(1, int(llamadas * escala_llamadas)), semilla)
+            if progreso:
+                progreso(clave, resultados[clave])
+    return resultados
+
+
+# %% Líneas base
+def plataforma():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pygame': pygame.version.ver,
+        'sistema': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+    }
+
+
+def guardar_base(ruta, resultados):
+    with open(ruta, 'w') as archivo:
+        json.dump({'version': VERSION_BASE, 'plataforma': plataforma(), 'resultados': resultados},
+                  archivo, indent=2)
+
+
+def cargar_base(ruta):
+    with open(ruta) as archivo:
+        base = json.load(archivo)
+    if base.get('version') != VERSION_BASE:
+        raise ValueError(f"Versión de línea base no soportada: {base.get('version')}")
+    return base
+
+
+def regresiones(resultados, base, umbral=0.25):
+    """
+    Pruebas que empeoran más que `umbral` (fracción) respecto a la línea base, en latencia p50,
+    operaciones por segundo o memoria pico. Devuelve una lista de (prueba, métrica, antes, ahora).
+    """
+    encontradas = []
+    for clave, actual in resultados.items():
+        anterior = base['resultados'].get(clave)
+        if anterior is None:
+            continue
+        if actual['p50_us'] > anterior['p50_us'] * (1 + umbral):
+            encontradas.append((clave, 'p50_us', anterior['p50_us'], actual['p50_us']))
+        if actual['ops_por_segundo'] < anterior['ops_por_segundo'] / (1 + umbral):
+            encontradas.append((clave, 'ops_por_segundo', anterior['ops_por_segundo'], actual['ops_por_segundo']))
+        if actual['memoria_pico_bytes'] > anterior['memoria_pico_bytes'] * (1 + umbral) + 4096:
+            encontradas.append((clave, 'memoria_pico_bytes', anterior['memoria_pico_bytes'],
+                                actual['memoria_pico_bytes']))
+    return encontradas
+
+
+def _linea(clave, r):
+    return (f"{clave:<28} {r['ops_por_segundo']:>12.0f} {r['p50_us']:>9.2f} {r['p90_us']:>9.2f} "
+            f"{r['p99_us']:>9.2f} {r['memoria_pico_bytes'] / 2 ** 20:>10.2f}")
+
+
+def linea_de_comandos(argumentos=None):
+    parser = argparse.ArgumentParser(description="Pruebas de rendimiento de sensado, movimiento y dibujo")
+    parser.add_argument('--pruebas', nargs='+', choices=list(PRUEBAS), help="Por defecto, todas")
+    parser.add_argument('--tamanos', nargs='+', type=int, default=list(TAMANOS))
+    parser.add_argument('--escala', type=float, default=1.0, help="Multiplica el número de llamadas de cada prueba")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--sin-limites', action='store_true',
+                        help="Ejecutar también las pruebas de dibujo en los mapas más grandes")
+    parser.add_argument('--guardar', help="Guardar los resultados como línea base JSON")
+    parser.add_argument('--comparar', help="Línea base JSON contra la que buscar regresiones")
+    parser.add_argument('--umbral', type=float, default=0.25, help="Empeoramiento tolerado (0.25 = 25%%)")
+    args = parser.parse_args(argumentos)
+
+    print(f"{'Prueba':<28} {'ops/s':>12} {'p50 (us)':>9} {'p90 (us)':>9} {'p99 (us)':>9} {'pico (MB)':>10}")
+    resultados = ejecutar(args.pruebas, args.tamanos, args.escala, args.semilla, args.sin_limites,
+                          progreso=lambda clave, r: print(_linea(clave, r), flush=True))
+    if args.guardar:
+        guardar_base(args.guardar, resultados)
+        print(f"\nLínea base guardada en {args.guardar}")
+
+    if args.comparar:
+        encontradas = regresiones(resultados, cargar_base(args.comparar), args.umbral)
+        if encontradas:
+            print(f"\nRegresiones (más de un {args.umbral:.0%} peor que {args.comparar}):")
+            for clave, metrica, antes, ahora in encontradas:
+                print(f"  {clave:<28} {metrica:<20} {antes:>14.2f} -> {ahora:>14.2f}")
+            return 1
+        print(f"\nSin regresiones respecto a {args.comparar}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(linea_de_comandos())
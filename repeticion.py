@@ -0,0 +1,268 @@
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from codigos import ACCIONES, DIRECCIONES
+from campos_distancia import huella_laberinto
+from recorrido import TablasRecorrido
+
+# Formato de grabación: cabecera con los metadatos en JSON (perfil del agente, inicio, objetivo, huella
+# del mapa, semilla) seguida de un evento de 5 bytes por tecla: cuadro en que se pulsó y acción.
+MAGIA = b'REPETIC\x00'
+VERSION = 1
+# Magia, versión, longitud de los metadatos
+_CABECERA = struct.Struct('<8sHI')
+EVENTO = np.dtype([('cuadro', '<u4'), ('accion', 'u1')])
+
+REINICIAR = len(ACCIONES)  # Tecla R: además de los códigos de codigos.ACCIONES
+CUADROS_POR_SEGUNDO = 30  # Los del juego
+
+
+def huella_mapa(laberinto):
+    """Huella del mapa como uint8, para que map.txt y su versión binaria den la misma"""
+    return huella_laberinto(np.asarray(laberinto, dtype=np.uint8))
+
+
+# %% Grabación
+class Grabador:
+    """Escribe los eventos de una partida por bloques: la memoria no crece con la duración de la partida"""
+
+    def __init__(self, ruta, laberinto, estado_inicial, estado_objetivo, agente, semilla=None, ruta_mapa=None,
+                 bloque=4096):
+        metadatos = {
+            'agente': agente.nombre,
+            'habilidades': agente.habilidades,
+            'inicio': [estado_inicial.fila, estado_inicial.columna, estado_inicial.codigo_direccion],
+            'objetivo': [estado_objetivo.fila, estado_objetivo.columna, estado_objetivo.codigo_direccion],
+            'huella': huella_mapa(laberinto),
+            'mapa': os.path.abspath(ruta_mapa) if ruta_mapa else None,
+            'semilla': semilla,
+        }
+        metadatos = json.dumps(metadatos, ensure_ascii=False).encode('utf-8')
+        self.archivo = open(ruta, 'wb')
+        self.archivo.write(_CABECERA.pack(MAGIA, VERSION, len(metadatos)))
+        self.archivo.write(metadatos)
+        self.eventos = np.zeros(bloque, dtype=EVENTO)
+        self.pendientes = 0
+        self.total = 0
+
+    def registrar(self, cuadro, accion):
+        """Anota una tecla: código de codigos.ACCIONES o REINICIAR"""
+        if self.pendientes == len(self.eventos):
+            self.volcar()
+        self.eventos[self.pendientes] = (cuadro, accion)
+        self.pendientes += 1
+        self.total += 1
+
+    def volcar(self):
+        self.archivo.write(self.eventos[:self.pendientes].tobytes())
+        self.archivo.flush()
+        self.pendientes = 0
+
+    def cerrar(self):
+        if self.archivo is not None:
+            self.volcar()
+            self.archivo.close()
+            self.archivo = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+
+def leer_grabacion(ruta):
+    """Devuelve (metadatos, eventos); los eventos se abren con memmap (dtype EVENTO)"""
+    with open(ruta, 'rb') as archivo:
+        datos = archivo.read(_CABECERA.size)
+        if len(datos) < _CABECERA.size or not datos.startswith(MAGIA):
+            raise ValueError(f"{ruta} no es una grabación")
+        magia, version, longitud = _CABECERA.unpack(datos)
+        if version != VERSION:
+            raise ValueError(f"Versión de grabación no soportada: {version}")
+        metadatos = json.loads(archivo.read(longitud).decode('utf-8'))
+
+    desplazamiento = _CABECERA.size + longitud
+    # Si la partida se cortó a medio escribir, el último evento incompleto se ignora
+    n = (os.path.getsize(ruta) - desplazamiento) // EVENTO.itemsize
+    if n == 0:
+        return metadatos, np.zeros(0, dtype=EVENTO)
+    return metadatos, np.memmap(ruta, dtype=EVENTO, mode='r', offset=desplazamiento, shape=(n,))
+
+
+# %% Repetición
+# Todo lo que cambia al aplicar eventos; se guarda cada `intervalo` pasos
+Instantanea = namedtuple('Instantanea', 'cuadro estado visibilidad cooldown_omni omni_activada decisiones')
+
+
+class Reproductor:
+    """
+    Vuelve a ejecutar una grabación sin pygame, evento por evento, tan rápido como se pueda.
+
+    Cada `intervalo` pasos guarda una instantánea (posición, mapa visible, cooldown y longitud del
+    historial): ir_a(n) parte de la última instantánea anterior a n en lugar de repetir desde el principio.
+    Cada instantánea ocupa lo que el mapa visible (un bit por celda).
+    """
+
+    def __init__(self, ruta, laberinto=None, intervalo=4096):
+        from formato_mapa import cargar_mapa
+        from main import Agente, Estado
+
+        self.metadatos, self.eventos = leer_grabacion(ruta)
+        if laberinto is None:
+            if not self.metadatos['mapa']:
+                raise ValueError("La grabación no indica el mapa: hay que pasarlo")
+            laberinto = cargar_mapa(self.metadatos['mapa'])
+        if huella_mapa(laberinto) != self.metadatos['huella']:
+            raise ValueError("El mapa no es el de la grabación")
+
+        self.laberinto = laberinto
+        self.tablas = TablasRecorrido(laberinto)
+        self.intervalo = intervalo
+        self.estado_inicial = Estado.interno(*self.metadatos['inicio'])
+        self.estado_objetivo = Estado(*self.metadatos['objetivo'])
+        # Historial sin límite: restaurar() necesita las decisiones anteriores en memoria
+        self.agente = Agente(self.metadatos['agente'], self.metadatos['habilidades'])
+
+        self.paso = 0  # Eventos ya aplicados
+        self.cuadro = 0
+        self._nuevo_problema()
+        self.instantaneas = [self._instantanea()]
+
+    def __len__(self):
+        return len(self.eventos)
+
+    def _nuevo_problema(self):
+        from main import Problema
+        self.problema = Problema(self.estado_inicial, [self.estado_objetivo], self.laberinto, self.agente,
+                                 tablas=self.tablas)
+        self.estado = self.estado_inicial
+
+    def _instantanea(self):
+        agente = self.agente
+        return Instantanea(self.cuadro, self.estado, self.problema.mapa_visible.instantanea(), agente.cooldown_omni,
+                           agente.vision_omni_activada, len(agente.historial))
+
+    def _restaurar(self, indice):
+        instantanea = self.instantaneas[indice]
+        agente = self.agente
+        self._nuevo_problema()  # Objeto nuevo: el renderizador lo redibuja entero
+        self.problema.mapa_visible.restaurar(instantanea.visibilidad)
+        self.estado = instantanea.estado
+        self.paso, self.cuadro = indice * self.intervalo, instantanea.cuadro
+        agente.cooldown_omni, agente.vision_omni_activada = instantanea.cooldown_omni, instantanea.omni_activada
+
+        agente.historial.restaurar(instantanea.decisiones)
+        registros = agente.historial.arreglo(0, instantanea.decisiones)
+        agente.camino_visitado = set(zip(registros['fila'].tolist(), registros['columna'].tolist()))
+        agente.puntos_decision = {(fila, columna) for fila, columna in agente.camino_visitado
+                                  if self.problema.es_union(fila, columna)} if agente.es_punto_decision else set()
+
+    def _aplicar(self, cuadro, accion):
+        """Lo mismo que hace el juego con una tecla pulsada en ese cuadro"""
+        agente = self.agente
+        # El juego baja el cooldown una vez al empezar cada cuadro
+        agente.cooldown_omni = max(0, agente.cooldown_omni - (cuadro - self.cuadro))
+        self.cuadro = cuadro
+        if accion == REINICIAR:
+            self._nuevo_problema()
+            agente.vision_omni_activada = False
+            agente.cooldown_omni = 0
+        else:
+            self.estado, _ = self.problema.ejecutar_accion(self.estado, accion)
+
+    def avanzar(self, n=1):
+        """Aplica los n eventos siguientes (menos si se acaba la grabación)"""
+        fin = min(self.paso + n, len(self.eventos))
+        if fin <= self.paso:
+            return
+        eventos = self.eventos[self.paso:fin]
+        for cuadro, accion in zip(eventos['cuadro'].tolist(), eventos['accion'].tolist()):
+            self._aplicar(cuadro, accion)
+            self.paso += 1
+            if self.paso == len(self.instantaneas) * self.intervalo:
+                self.instantaneas.append(self._instantanea())
+
+    def ir_a(self, paso):
+        """Deja el estado como después de `paso` eventos"""
+        paso = max(0, min(paso, len(self.eventos)))
+        # Última instantánea ya tomada antes del paso pedido
+        indice = min(paso // self.intervalo, len(self.instantaneas) - 1)
+        if paso < self.paso or indice * self.intervalo > self.paso:
+            self._restaurar(indice)
+        self.avanzar(paso - self.paso)
+
+    @property
+    def terminado(self):
+        return self.paso == len(self.eventos)
+
+
+# %% Repetición en pantalla
+def mostrar(reproductor, velocidad=1.0, cell_size=40, salto=None):
+    """
+    Dibuja la repetición con pygame. velocidad: 1 a la velocidad del juego, 2 al doble, etc.;
+    0 o None sin límite. Flechas izquierda/derecha: saltar `salto` pasos (por defecto, un intervalo).
+    """
+    from main import RenderizadorIncremental, pygame, tamano_ventana
+
+    salto = salto or reproductor.intervalo
+    ventana, vista = tamano_ventana(*np.shape(reproductor.laberinto), cell_size)
+    screen = pygame.display.set_mode(ventana)
+    pygame.display.set_caption(f"Repetición: {reproductor.agente.nombre}")
+    renderizador = RenderizadorIncremental(reproductor.laberinto, screen, pygame.font.SysFont(None, 24), cell_size,
+                                           vista)
+    clock = pygame.time.Clock()
+
+    running = True
+    while running and not reproductor.terminado:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_RIGHT:
+                reproductor.ir_a(reproductor.paso + salto)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_LEFT:
+                reproductor.ir_a(reproductor.paso - salto)
+
+        cuadro = reproductor.cuadro
+        reproductor.avanzar()
+        renderizador.dibujar(reproductor.estado, reproductor.problema)
+        # Esperar los cuadros que pasaron en el juego entre este evento y el anterior
+        clock.tick(CUADROS_POR_SEGUNDO * velocidad / max(reproductor.cuadro - cuadro, 1) if velocidad else 0)
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    # Ejemplo: python repeticion.py partida.rep --hasta 500000 (sin ventana) o --mostrar --velocidad 4
+    parser = argparse.ArgumentParser(description="Repite una partida grabada con python main.py mapa partida.rep")
+    parser.add_argument('grabacion')
+    parser.add_argument('--mapa', help="Mapa de la partida (por defecto, la ruta guardada en la grabación)")
+    parser.add_argument('--hasta', type=int, default=None, help="Paso hasta el que repetir (por defecto, todos)")
+    parser.add_argument('--intervalo', type=int, default=4096, help="Pasos entre instantáneas")
+    parser.add_argument('--mostrar', action='store_true', help="Dibujar con pygame en lugar de repetir sin ventana")
+    parser.add_argument('--velocidad', type=float, default=1.0, help="Con --mostrar: 1 = velocidad del juego, 0 = sin límite")
+    args = parser.parse_args()
+
+    from formato_mapa import cargar_mapa
+    reproductor = Reproductor(args.grabacion, cargar_mapa(args.mapa) if args.mapa else None, args.intervalo)
+    if args.mostrar:
+        if args.hasta:
+            reproductor.ir_a(args.hasta)
+        mostrar(reproductor, args.velocidad)
+    else:
+        inicio = time.perf_counter()
+        reproductor.ir_a(len(reproductor) if args.hasta is None else args.hasta)
+        segundos = time.perf_counter() - inicio
+        estado = reproductor.estado
+        print(f"{reproductor.paso} pasos en {segundos:.2f} s ({reproductor.paso / max(segundos, 1e-9):.0f} pasos/s)",
+              file=sys.stderr)
+        print(f"Posición: ({estado.fila}, {estado.columna}) | Dirección: {DIRECCIONES[estado.codigo_direccion]} | "
+              f"Decisiones: {len(reproductor.agente.historial)} | "
+              f"Explorado: {reproductor.problema.mapa_visible.fraccion_explorada:.1%} | "
+              f"Objetivo alcanzado: {'sí' if reproductor.problema.es_objetivo(estado) else 'no'}")
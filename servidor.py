@@ -0,0 +1,447 @@
+import argparse
+import asyncio
+import random
+import struct
+import sys
+import time
+
+import numpy as np
+
+from codigos import ACCIONES, AVANZAR, GIRAR_IZQUIERDA, GIRAR_DERECHA, SENSAR, CODIGO_DIRECCION, NINGUNA
+from simulador_lote import SimuladorLote
+from main import PERFILES_AGENTE
+
+# %% Protocolo
+# Cliente -> servidor, mensajes de 2 bytes:
+# - HOLA + clave de PERFILES_AGENTE (b'H1'...): unirse con ese perfil
+# - ACCION + código de codigos.ACCIONES: actuar en el próximo tick (si llegan varias en un tick, vale la última)
+HOLA, ACCION = b'H', b'A'
+# Servidor -> cliente:
+# - BIENVENIDA: id del agente, alto y ancho del mapa y ticks por segundo. En el primer tick llega una INSTANTANEA.
+# - TICK: lo que cambió en el tick. Cabecera con el número de tick y cuántos registros siguen de cada tipo:
+#   AGENTE de los agentes que se movieron, giraron o entraron, CELDA de las celdas reveladas por primera vez,
+#   y los id (uint32) de los agentes que llegaron al objetivo (ya devueltos al inicio) y de los que se fueron.
+#   Conviene aplicar las salidas antes que los agentes: un id libre puede volver a usarse en un tick posterior.
+# - INSTANTANEA: el estado completo con el mismo formato (todos los agentes y todas las celdas reveladas);
+#   la recibe quien acaba de entrar o quien dejó de recibir ticks por leer demasiado lento.
+# - COMPLETO: no quedan plazas; el servidor cierra la conexión.
+BIENVENIDA, TICK, INSTANTANEA, COMPLETO = b'B', b'T', b'I', b'C'
+CABECERA_BIENVENIDA = struct.Struct('<cIIIf')
+CABECERA_TICK = struct.Struct('<cIIIII')
+AGENTE = np.dtype([('id', '<u4'), ('fila', '<u4'), ('columna', '<u4'), ('direccion', 'u1')])
+CELDA = np.dtype([('celda', '<u4'), ('valor', 'u1')])  # celda = fila * ancho + columna
+
+
+def tamano_tick(cabecera):
+    """Bytes de un TICK o INSTANTANEA a partir de su cabecera ya desempaquetada"""
+    _, _, agentes, celdas, llegadas, salidas = cabecera
+    return CABECERA_TICK.size + agentes * AGENTE.itemsize + celdas * CELDA.itemsize + (llegadas + salidas) * 4
+
+
+def decodificar_tick(datos):
+    """Separa un TICK o INSTANTANEA en (tipo, tick, agentes, celdas, llegadas, salidas)"""
+    cabecera = CABECERA_TICK.unpack_from(datos)
+    tipo, tick, n_agentes, n_celdas, n_llegadas, n_salidas = cabecera
+    inicio = CABECERA_TICK.size
+    agentes = np.frombuffer(datos, AGENTE, n_agentes, inicio)
+    inicio += agentes.nbytes
+    celdas = np.frombuffer(datos, CELDA, n_celdas, inicio)
+    inicio += celdas.nbytes
+    llegadas = np.frombuffer(datos, '<u4', n_llegadas, inicio)
+    salidas = np.frombuffer(datos, '<u4', n_salidas, inicio + llegadas.nbytes)
+    return tipo, tick, agentes, celdas, llegadas, salidas
+
+
+# %% Servidor
+class _ConexionAgente(asyncio.Protocol):
+    """Una conexión de cliente: lee sus mensajes sin corrutinas propias y avisa al servidor si se atrasa"""
+
+    def __init__(self, servidor):
+        self.servidor = servidor
+        self.transport = None
+        self.id = None
+        self.pendiente = bytearray()
+        self.atrasado = False  # El búfer de salida superó el límite: no se le envían ticks
+        self.ticks_atrasado = 0
+        self.necesita_instantanea = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.set_write_buffer_limits(high=self.servidor.limite_bufer)
+
+    def data_received(self, datos):
+        self.pendiente += datos
+        n = len(self.pendiente) & ~1
+        for i in range(0, n, 2):
+            tipo, valor = self.pendiente[i:i + 1], self.pendiente[i + 1]
+            if tipo == ACCION and self.id is not None and valor < len(ACCIONES):
+                self.servidor.acciones[self.id] = valor
+            elif tipo == HOLA and self.id is None:
+                self.servidor.unir(self, chr(valor))
+                if self.id is None:
+                    return
+            else:
+                self.transport.close()
+                return
+        del self.pendiente[:n]
+
+    def pause_writing(self):
+        self.atrasado = True
+
+    def resume_writing(self):
+        # Se perdió al menos un tick: en el próximo recibe el estado completo
+        self.atrasado = False
+        self.ticks_atrasado = 0
+        self.necesita_instantanea = True
+
+    def connection_lost(self, excepcion):
+        self.servidor.quitar(self)
+
+
+class ServidorSimulacion:
+    """
+    Laberinto compartido por muchos agentes conectados por TCP o sockets Unix.
+
+    Cada tick se aplican de una vez (SimuladorLote.paso) las acciones recibidas desde el tick anterior y se
+    envía a todos el mismo mensaje con los cambios (ver el protocolo al principio del módulo). La niebla de
+    guerra es común: lo que revela un agente lo ven todos.
+
+    Contrapresión: si el búfer de salida de un cliente supera `limite_bufer` bytes deja de recibir ticks y,
+    cuando lo vacía, recibe una INSTANTANEA; tras `max_atraso` ticks sin vaciarlo se le desconecta.
+    """
+
+    def __init__(self, laberinto, inicio, objetivo=None, max_agentes=4096, ticks_por_segundo=20,
+                 limite_bufer=256 * 1024, max_atraso=100):
+        """
+        inicio: (fila, columna[, dirección]) donde aparecen los agentes y adonde vuelven al llegar al objetivo.
+        objetivo: (fila, columna[, dirección]) o None; como en Estado, la dirección por defecto es 'derecha'.
+        """
+        self.laberinto = np.asarray(laberinto)
+        self.alto, self.ancho = self.laberinto.shape
+        self._valores = self.laberinto.ravel()
+        fila, columna, direccion = (*inicio, 'derecha')[:3]
+        self.inicio = (fila, columna, CODIGO_DIRECCION.get(direccion, direccion))
+        self.objetivo = None
+        if objetivo is not None:
+            fila_objetivo, columna_objetivo, direccion_objetivo = (*objetivo, 'derecha')[:3]
+            self.objetivo = (fila_objetivo, columna_objetivo, direccion_objetivo)
+        self.ticks_por_segundo = ticks_por_segundo
+        self.limite_bufer = limite_bufer
+        self.max_atraso = max_atraso
+
+        self.simulador = SimuladorLote(self.laberinto, [fila] * max_agentes, [columna] * max_agentes,
+                                       [self.inicio[2]] * max_agentes, registrar_visibilidad=True,
+                                       visibilidad_compartida=True)
+        self.simulador.tomar_reveladas()  # La celda de inicio ya la conoce quien recibe la instantánea
+        self.activos = np.zeros(max_agentes, dtype=bool)
+        self.acciones = np.full(max_agentes, NINGUNA, dtype=np.int8)
+        self.conexiones = {}  # id -> _ConexionAgente
+        self._libres = list(range(max_agentes - 1, -1, -1))
+        self._entradas = []
+        self._salidas = []
+
+        self.tick = 0
+        self.segundos_tick = 0.0
+        self.ticks_tarde = 0
+        self.bytes_enviados = 0
+        self.desconectados_por_atraso = 0
+
+    # %% Agentes
+    def unir(self, conexion, perfil):
+        """Da una plaza libre a la conexión con el perfil pedido (o le responde COMPLETO)"""
+        if perfil not in PERFILES_AGENTE or not self._libres:
+            conexion.transport.write(COMPLETO)
+            conexion.transport.close()
+            return
+        i = self._libres.pop()
+        self.simulador.asignar_habilidades([i], PERFILES_AGENTE[perfil][1])
+        self.simulador.reiniciar([i], *self.inicio)
+        self.activos[i] = True
+        self.conexiones[i] = conexion
+        self._entradas.append(i)
+        conexion.id = i
+        conexion.necesita_instantanea = True
+        conexion.transport.write(CABECERA_BIENVENIDA.pack(BIENVENIDA, i, self.alto, self.ancho,
+                                                          self.ticks_por_segundo))
+
+    def quitar(self, conexion):
+        i = conexion.id
+        if i is None or self.conexiones.get(i) is not conexion:
+            return
+        del self.conexiones[i]
+        self.activos[i] = False
+        self.acciones[i] = NINGUNA
+        self._salidas.append(i)  # La plaza se libera tras anunciar la salida
+
+    # %% Ticks
+    def _mensaje(self, tipo, agentes, celdas, llegadas, salidas):
+        sim = self.simulador
+        registros = np.empty(len(agentes), dtype=AGENTE)
+        registros['id'] = agentes
+        registros['fila'] = sim.filas[agentes]
+        registros['columna'] = sim.columnas[agentes]
+        registros['direccion'] = sim.direcciones[agentes]
+        reveladas = np.empty(len(celdas), dtype=CELDA)
+        reveladas['celda'] = celdas
+        reveladas['valor'] = self._valores[celdas]
+        return b''.join((CABECERA_TICK.pack(tipo, self.tick, len(agentes), len(celdas), len(llegadas), len(salidas)),
+                         registros.tobytes(), reveladas.tobytes(),
+                         np.asarray(llegadas, dtype='<u4').tobytes(), np.asarray(salidas, dtype='<u4').tobytes()))
+
+    def instantanea(self):
+        return self._mensaje(INSTANTANEA, np.flatnonzero(self.activos),
+                             np.flatnonzero(self.simulador.mapas_visibles[0]), (), ())
+
+    def paso(self):
+        """Aplica las acciones pendientes de todos los agentes y devuelve el mensaje TICK con los cambios"""
+        sim = self.simulador
+        antes = (sim.filas.copy(), sim.columnas.copy(), sim.direcciones.copy())
+        # Como en el juego: el cooldown baja una vez por tick y después se actúa
+        sim.actualizar_cooldown()
+        sim.paso(self.acciones)
+        self.acciones.fill(NINGUNA)
+
+        llegadas = np.empty(0, dtype=np.int64)
+        if self.objetivo is not None:
+            llegadas = np.flatnonzero(self.activos & sim.es_objetivo(*self.objetivo))
+            if len(llegadas):
+                sim.reiniciar(llegadas, *self.inicio)
+
+        cambiados = self.activos & ((sim.filas != antes[0]) | (sim.columnas != antes[1]) |
+                                    (sim.direcciones != antes[2]))
+        cambiados[self._entradas] = self.activos[self._entradas]
+        salidas = self._salidas
+        self.tick += 1
+        mensaje = self._mensaje(TICK, np.flatnonzero(cambiados), sim.tomar_reveladas(), llegadas, salidas)
+        self._libres.extend(salidas)
+        self._entradas, self._salidas = [], []
+        return mensaje
+
+    def difundir(self, mensaje):
+        """Envía el mensaje del tick a cada conexión, o una instantánea a quien la necesite"""
+        instantanea = None
+        for conexion in list(self.conexiones.values()):
+            if conexion.atrasado:
+                conexion.ticks_atrasado += 1
+                if conexion.ticks_atrasado > self.max_atraso:
+                    self.desconectados_por_atraso += 1
+                    conexion.transport.abort()
+                continue
+            if conexion.necesita_instantanea:
+                if instantanea is None:
+                    instantanea = self.instantanea()
+                conexion.necesita_instantanea = False
+                conexion.transport.write(instantanea)
+                self.bytes_enviados += len(instantanea)
+            else:
+                conexion.transport.write(mensaje)
+                self.bytes_enviados += len(mensaje)
+
+    async def ejecutar(self, informe=None):
+        """Bucle de ticks a ritmo fijo; si un tick se pasa de tiempo, el siguiente empieza de inmediato"""
+        loop = asyncio.get_running_loop()
+        periodo = 1 / self.ticks_por_segundo
+        siguiente = loop.time()
+        while True:
+            inicio = time.perf_counter()
+            self.difundir(self.paso())
+            self.segundos_tick += time.perf_counter() - inicio
+            if informe and self.tick % round(informe * self.ticks_por_segundo) == 0:
+                print(self.resumen(), file=sys.stderr)
+            siguiente += periodo
+            espera = siguiente - loop.time()
+            if espera < 0:
+                self.ticks_tarde += 1
+                siguiente, espera = loop.time(), 0
+            await asyncio.sleep(espera)
+
+    async def servir(self, host='127.0.0.1', puerto=8765, ruta_unix=None, informe=None):
+        """Acepta conexiones por TCP (o por el socket Unix `ruta_unix`) y ejecuta los ticks indefinidamente"""
+        loop = asyncio.get_running_loop()
+        if ruta_unix:
+            servidor = await loop.create_unix_server(lambda: _ConexionAgente(self), ruta_unix, backlog=1024)
+        else:
+            servidor = await loop.create_server(lambda: _ConexionAgente(self), host, puerto, backlog=1024)
+        async with servidor:
+            await self.ejecutar(informe)
+
+    def resumen(self):
+        ms_tick = 1000 * self.segundos_tick / max(self.tick, 1)
+        return (f"Tick {self.tick} | Agentes: {int(self.activos.sum())} | {ms_tick:.2f} ms/tick | "
+                f"Ticks tarde: {self.ticks_tarde} | Enviado: {self.bytes_enviados / 1e6:.1f} MB | "
+                f"Desconectados por atraso: {self.desconectados_por_atraso}")
+
+
+# %% Generador de carga
+# Peso de cada acción de los clientes de prueba
+PESOS_ACCIONES = {AVANZAR: 5, GIRAR_IZQUIERDA: 2, GIRAR_DERECHA: 2, SENSAR: 1}
+
+
+class _ClienteCarga(asyncio.Protocol):
+    """Cliente de prueba: responde a cada tick con una acción al azar y cuenta lo que recibe"""
+
+    def __init__(self, carga, perfil, pausa):
+        self.carga = carga
+        self.perfil = perfil
+        self.pausa = pausa  # Segundos sin leer cada cierto tiempo (clientes lentos), o 0
+        self.transport = None
+        self.id = None
+        self.tick = 0
+        self.pendiente = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.write(HOLA + self.perfil.encode())
+        if self.pausa:
+            asyncio.get_running_loop().call_later(random.uniform(0, self.pausa), self._pausar)
+
+    def _pausar(self):
+        if self.transport.is_closing():
+            return
+        self.transport.pause_reading()
+        asyncio.get_running_loop().call_later(self.pausa, self._reanudar)
+
+    def _reanudar(self):
+        if self.transport.is_closing():
+            return
+        self.transport.resume_reading()
+        asyncio.get_running_loop().call_later(self.pausa, self._pausar)
+
+    def data_received(self, datos):
+        self.pendiente += datos
+        leidos = 0
+        while len(self.pendiente) - leidos >= 1:
+            tipo = self.pendiente[leidos:leidos + 1]
+            if tipo == COMPLETO:
+                self.carga.rechazados += 1
+                leidos += 1
+            elif tipo == BIENVENIDA:
+                if len(self.pendiente) - leidos < CABECERA_BIENVENIDA.size:
+                    break
+                self.id = CABECERA_BIENVENIDA.unpack_from(self.pendiente, leidos)[1]
+                leidos += CABECERA_BIENVENIDA.size
+            else:
+                if len(self.pendiente) - leidos < CABECERA_TICK.size:
+                    break
+                cabecera = CABECERA_TICK.unpack_from(self.pendiente, leidos)
+                tamano = tamano_tick(cabecera)
+                if len(self.pendiente) - leidos < tamano:
+                    break
+                leidos += tamano
+                self.tick = cabecera[1]
+                self.carga.mensajes += 1
+                self.carga.instantaneas += tipo == INSTANTANEA
+        del self.pendiente[:leidos]
+        self.carga.bytes_recibidos += len(datos)
+        if self.id is not None and leidos:
+            self.transport.write(ACCION + bytes((self.carga.elegir_accion(),)))
+
+    def connection_lost(self, excepcion):
+        self.carga.clientes.discard(self)
+
+
+class GeneradorCarga:
+    """Abre muchas conexiones de prueba contra un ServidorSimulacion y resume lo que reciben"""
+
+    def __init__(self, n_clientes, perfil="1", lentos=0, pausa=2.0, semilla=None):
+        self.n_clientes = n_clientes
+        self.perfil = perfil
+        self.lentos = lentos
+        self.pausa = pausa
+        self.clientes = set()
+        self.rechazados = 0
+        self.mensajes = 0
+        self.instantaneas = 0
+        self.bytes_recibidos = 0
+        self._rng = random.Random(semilla)
+        self._acciones = list(PESOS_ACCIONES)
+        self._pesos = list(PESOS_ACCIONES.values())
+
+    def elegir_accion(self):
+        return self._rng.choices(self._acciones, self._pesos)[0]
+
+    async def conectar(self, host='127.0.0.1', puerto=8765, ruta_unix=None, por_tanda=100):
+        """Abre las conexiones en tandas (para no desbordar la cola de conexiones pendientes del servidor)"""
+        loop = asyncio.get_running_loop()
+        for inicio in range(0, self.n_clientes, por_tanda):
+            tanda = []
+            for i in range(inicio, min(inicio + por_tanda, self.n_clientes)):
+                cliente = _ClienteCarga(self, self.perfil, self.pausa if i < self.lentos else 0)
+                if ruta_unix:
+                    tanda.append(loop.create_unix_connection(lambda c=cliente: c, ruta_unix))
+                else:
+                    tanda.append(loop.create_connection(lambda c=cliente: c, host, puerto))
+                self.clientes.add(cliente)
+            await asyncio.gather(*tanda)
+
+    def resumen(self, segundos):
+        ticks = [c.tick for c in self.clientes]
+        atraso = max(ticks) - min(ticks) if ticks else 0
+        return (f"Conectados: {len(self.clientes)} | Rechazados: {self.rechazados} | "
+                f"Mensajes/s: {self.mensajes / segundos:.0f} | Instantáneas: {self.instantaneas} | "
+                f"Recibido: {self.bytes_recibidos / segundos / 1e6:.2f} MB/s | Mayor atraso: {atraso} ticks")
+
+    async def ejecutar(self, duracion, informe=5.0, **conexion):
+        await self.conectar(**conexion)
+        inicio = ultimo = time.perf_counter()
+        while time.perf_counter() - inicio < duracion:
+            await asyncio.sleep(min(informe, duracion - (time.perf_counter() - inicio)))
+            ahora = time.perf_counter()
+            print(self.resumen(ahora - ultimo), file=sys.stderr)
+            self.mensajes = self.instantaneas = self.bytes_recibidos = 0
+            ultimo = ahora
+        for cliente in list(self.clientes):
+            cliente.transport.close()
+
+
+def _subir_limite_archivos():
+    """Cada conexión es un descriptor de archivo: sube el límite blando al máximo permitido"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return
+    blando, duro = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if duro == resource.RLIM_INFINITY or duro > blando:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (duro if duro != resource.RLIM_INFINITY else 65536, duro))
+
+
+if __name__ == '__main__':
+    # Ejemplo: python servidor.py servir map.txt --inicio 0 8 --objetivo 14 3
+    # y en otra terminal: python servidor.py carga --clientes 2000 --duracion 30
+    parser = argparse.ArgumentParser(description="Servidor de simulación multiagente y generador de carga")
+    subparsers = parser.add_subparsers(dest='orden', required=True)
+    servir = subparsers.add_parser('servir', help="Aloja un laberinto compartido")
+    servir.add_argument('mapa')
+    servir.add_argument('--inicio', type=int, nargs=2, required=True, metavar=('FILA', 'COLUMNA'))
+    servir.add_argument('--objetivo', type=int, nargs=2, default=None, metavar=('FILA', 'COLUMNA'))
+    servir.add_argument('--max-agentes', type=int, default=4096)
+    servir.add_argument('--tps', type=float, default=20, help="Ticks por segundo")
+    servir.add_argument('--limite-bufer', type=int, default=256 * 1024, help="Bytes pendientes antes de saltar ticks")
+    servir.add_argument('--max-atraso', type=int, default=100, help="Ticks saltados antes de desconectar")
+    carga = subparsers.add_parser('carga', help="Conecta clientes de prueba con acciones al azar")
+    carga.add_argument('--clientes', type=int, default=1000)
+    carga.add_argument('--perfil', default="1", choices=sorted(PERFILES_AGENTE))
+    carga.add_argument('--lentos', type=int, default=0, help="Clientes que dejan de leer a ratos")
+    carga.add_argument('--pausa', type=float, default=2.0, help="Segundos que pasan sin leer los clientes lentos")
+    carga.add_argument('--duracion', type=float, default=30.0)
+    carga.add_argument('--semilla', type=int, default=None)
+    for subparser in (servir, carga):
+        subparser.add_argument('--host', default='127.0.0.1')
+        subparser.add_argument('--puerto', type=int, default=8765)
+        subparser.add_argument('--unix', help="Ruta de un socket Unix en lugar de TCP")
+        subparser.add_argument('--informe', type=float, default=5.0, help="Segundos entre resúmenes")
+    args = parser.parse_args()
+
+    _subir_limite_archivos()
+    try:
+        if args.orden == 'servir':
+            from formato_mapa import cargar_mapa
+            servidor = ServidorSimulacion(cargar_mapa(args.mapa), args.inicio, args.objetivo, args.max_agentes,
+                                          args.tps, args.limite_bufer, args.max_atraso)
+            asyncio.run(servidor.servir(args.host, args.puerto, args.unix, args.informe))
+        else:
+            generador = GeneradorCarga(args.clientes, args.perfil, args.lentos, args.pausa, args.semilla)
+            asyncio.run(generador.ejecutar(args.duracion, args.informe, host=args.host, puerto=args.puerto,
+                                           ruta_unix=args.unix))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,265 @@
+import numpy as np
+
+from codigos import (DIRECCIONES, CODIGO_DIRECCION, DELTA_FILA, DELTA_COLUMNA, GIRO_IZQUIERDA, GIRO_DERECHA,
+                     AVANZAR, GIRAR_IZQUIERDA, GIRAR_DERECHA, SENSAR, VISION_OMNI,
+                     ALCANCE_VISION_LEJANA, ALCANCE_OMNI, COOLDOWN_OMNI)
+from recorrido import TablasRecorrido
+
+
+# %% Perfiles de habilidades
+def habilidades_a_arreglos(habilidades, n):
+    """
+    Convierte las habilidades de los agentes en arreglos de NumPy.
+    habilidades: un dict (compartido por todos) o una lista con un dict por agente,
+    con las mismas claves y valores por defecto que usa Agente/Problema.
+    """
+    if isinstance(habilidades, dict) or habilidades is None:
+        habilidades = [habilidades or {}] * n
+    if len(habilidades) != n:
+        raise ValueError(f"Se esperaban {n} perfiles de habilidades, se recibieron {len(habilidades)}")
+
+    return {
+        'puede_girar_izquierda': np.array([h.get('puede_girar_izquierda', True) for h in habilidades], dtype=bool),
+        'puede_girar_derecha': np.array([h.get('puede_girar_derecha', True) for h in habilidades], dtype=bool),
+        'vision_lejana': np.array([h.get('vision_lejana', False) for h in habilidades], dtype=bool),
+        'vision_omni': np.array([h.get('vision_omni', False) for h in habilidades], dtype=bool),
+        'rango_movimiento': np.array([h.get('rango_movimiento', 1) for h in habilidades], dtype=np.int64),
+    }
+
+
+# %% Simulador por lotes
+class SimuladorLote:
+    """
+    Simula N agentes a la vez sobre un mismo laberinto, sin pygame.
+
+    Las posiciones, direcciones (códigos de codigos.DIRECCIONES) y habilidades viven en arreglos
+    de NumPy y cada método avanza a todos los agentes seleccionados con operaciones vectorizadas.
+    Los resultados coinciden con los métodos de Problema aplicados agente por agente.
+    """
+
+    def __init__(self, laberinto, filas, columnas, direcciones, habilidades=None, registrar_visibilidad=False,
+                 tablas=None, visibilidad_compartida=False):
+        self.laberinto = np.asarray(laberinto)
+        self.alto, self.ancho = self.laberinto.shape
+        # Se pueden compartir las tablas de un Problema construido sobre el mismo laberinto
+        self.tablas = tablas if tablas is not None else TablasRecorrido(self.laberinto)
+
+        self.filas = np.array(filas, dtype=np.int64)
+        self.columnas = np.array(columnas, dtype=np.int64)
+        self.direcciones = np.array([CODIGO_DIRECCION.get(d, d) for d in direcciones], dtype=np.int8)
+        self.n = len(self.filas)
+        if not (len(self.columnas) == len(self.direcciones) == self.n):
+            raise ValueError("filas, columnas y direcciones deben tener la misma longitud")
+
+        perfiles = habilidades_a_arreglos(habilidades, self.n)
+        self.puede_girar_izquierda = perfiles['puede_girar_izquierda']
+        self.puede_girar_derecha = perfiles['puede_girar_derecha']
+        self.vision_lejana = perfiles['vision_lejana']
+        self.vision_omni = perfiles['vision_omni']
+        self.rango_movimiento = perfiles['rango_movimiento']
+
+        self.vision_omni_activada = np.zeros(self.n, dtype=bool)
+        self.cooldown_omni = np.zeros(self.n, dtype=np.int64)
+
+        # Un mapa visible por agente (opcional, ocupa N x alto x ancho bytes) o, con visibilidad_compartida,
+        # uno solo para todos (mapas_visibles[0]) que además anota qué celdas se revelan por primera vez
+        self.mapas_visibles = None
+        self.visibilidad_compartida = visibilidad_compartida
+        self._reveladas_nuevas = []
+        if registrar_visibilidad:
+            self.mapas_visibles = np.zeros((1 if visibilidad_compartida else self.n, self.alto, self.ancho),
+                                           dtype=bool)
+            self._revelar(np.arange(self.n), self.filas, self.columnas)
+
+    @classmethod
+    def desde_estados(cls, laberinto, estados, habilidades=None, **kwargs):
+        """Crea el simulador a partir de objetos Estado (o cualquier objeto con fila/columna/direccion)"""
+        return cls(laberinto,
+                   [e.fila for e in estados],
+                   [e.columna for e in estados],
+                   [e.direccion for e in estados],
+                   habilidades, **kwargs)
+
+    def asignar_habilidades(self, mascara, habilidades):
+        """Cambia las habilidades de los agentes seleccionados (un dict para todos o uno por agente)"""
+        idx = self._indices(mascara)
+        for nombre, valores in habilidades_a_arreglos(habilidades, len(idx)).items():
+            getattr(self, nombre)[idx] = valores
+
+    def reiniciar(self, mascara, filas, columnas, direcciones):
+        """
+        Vuelve a colocar a los agentes seleccionados, olvidando su visión omni y lo que habían visto
+        (con visibilidad compartida, lo visto por todos se conserva)
+        """
+        idx = self._indices(mascara)
+        self.filas[idx] = filas
+        self.columnas[idx] = columnas
+        direcciones = np.atleast_1d(direcciones)
+        if direcciones.dtype.kind in 'UO':  # Nombres en lugar de códigos
+            direcciones = np.array([CODIGO_DIRECCION[d] for d in direcciones])
+        self.direcciones[idx] = direcciones
+        self.vision_omni_activada[idx] = False
+        self.cooldown_omni[idx] = 0
+        if self.mapas_visibles is not None:
+            if not self.visibilidad_compartida:
+                self.mapas_visibles[idx] = False
+            self._revelar(idx, self.filas[idx], self.columnas[idx])
+
+    def estado(self, i):
+        """Estado del agente i como tupla (fila, columna, direccion)"""
+        return int(self.filas[i]), int(self.columnas[i]), DIRECCIONES[self.direcciones[i]]
+
+    def _indices(self, mascara):
+        if mascara is None:
+            return np.arange(self.n)
+        mascara = np.asarray(mascara)
+        if mascara.dtype == bool:
+            return np.flatnonzero(mascara)
+        return mascara.astype(np.int64)
+
+    def _dentro(self, f, c):
+        return (f >= 0) & (f < self.alto) & (c >= 0) & (c < self.ancho)
+
+    def _distancia_libre(self, idx, direcciones):
+        return self.tablas.libre[direcciones, self.filas[idx], self.columnas[idx]].astype(np.int64)
+
+    def _hasta_borde(self, idx, direcciones):
+        f, c = self.filas[idx], self.columnas[idx]
+        return np.choose(direcciones, (f, self.ancho - 1 - c, self.alto - 1 - f, c))
+
+    def _revelar(self, idx, f, c):
+        if self.mapas_visibles is None:
+            return
+        dentro = self._dentro(f, c)
+        if not self.visibilidad_compartida:
+            self.mapas_visibles[idx[dentro], f[dentro], c[dentro]] = True
+            return
+        f, c = f[dentro], c[dentro]
+        nuevas = ~self.mapas_visibles[0, f, c]
+        if nuevas.any():
+            self._reveladas_nuevas.append(f[nuevas] * self.ancho + c[nuevas])
+            self.mapas_visibles[0, f, c] = True
+
+    def tomar_reveladas(self):
+        """
+        Con visibilidad compartida: índices planos (fila * ancho + columna) de las celdas reveladas
+        por primera vez desde la llamada anterior, sin repetir
+        """
+        if not self._reveladas_nuevas:
+            return np.empty(0, dtype=np.int64)
+        reveladas = np.unique(np.concatenate(self._reveladas_nuevas))
+        self._reveladas_nuevas.clear()
+        return reveladas
+
+    def _revelar_rayo(self, idx, direcciones, alcance):
+        """Revela hasta `alcance` celdas en línea recta, deteniéndose tras la primera pared o montaña"""
+        n = np.minimum(np.minimum(alcance, self._distancia_libre(idx, direcciones) + 1),
+                       self._hasta_borde(idx, direcciones))
+        df, dc = DELTA_FILA[direcciones], DELTA_COLUMNA[direcciones]
+        for i in range(1, alcance + 1):
+            alcanza = n >= i
+            self._revelar(idx[alcanza], self.filas[idx[alcanza]] + df[alcanza] * i,
+                          self.columnas[idx[alcanza]] + dc[alcanza] * i)
+
+    # %% Acciones
+    def avanzar(self, mascara=None):
+        """Avanza a los agentes seleccionados hasta rango_movimiento celdas. Devuelve quién se movió"""
+        idx = self._indices(mascara)
+        exito = np.zeros(self.n, dtype=bool)
+        if len(idx) == 0:
+            return exito
+
+        d = self.direcciones[idx]
+        avance = np.minimum(self.rango_movimiento[idx], self._distancia_libre(idx, d))
+
+        movidos = avance > 0
+        idx, avance = idx[movidos], avance[movidos]
+        self.filas[idx] += DELTA_FILA[d[movidos]] * avance
+        self.columnas[idx] += DELTA_COLUMNA[d[movidos]] * avance
+        # Revelar solo la celda final
+        self._revelar(idx, self.filas[idx], self.columnas[idx])
+        exito[idx] = True
+        return exito
+
+    def girar_izquierda(self, mascara=None):
+        """Gira 90 grados a la izquierda a quienes pueden hacerlo. Devuelve quién giró"""
+        idx = self._indices(mascara)
+        idx = idx[self.puede_girar_izquierda[idx]]
+        self.direcciones[idx] = GIRO_IZQUIERDA[self.direcciones[idx]]
+        exito = np.zeros(self.n, dtype=bool)
+        exito[idx] = True
+        return exito
+
+    def girar_derecha(self, mascara=None):
+        """Gira 90 grados a la derecha a quienes pueden hacerlo. Devuelve quién giró"""
+        idx = self._indices(mascara)
+        idx = idx[self.puede_girar_derecha[idx]]
+        self.direcciones[idx] = GIRO_DERECHA[self.direcciones[idx]]
+        exito = np.zeros(self.n, dtype=bool)
+        exito[idx] = True
+        return exito
+
+    def sensar(self, mascara=None):
+        """Sensa y revela según las habilidades de cada agente. Devuelve si la celda frontal es transitable"""
+        idx = self._indices(mascara)
+        if self.mapas_visibles is not None and len(idx):
+            omni = self.vision_omni_activada[idx]
+            lejana = ~omni & self.vision_lejana[idx]
+            normal = ~omni & ~lejana
+
+            idx_omni = idx[omni]
+            for direccion in range(4):
+                self._revelar_rayo(idx_omni, np.full(len(idx_omni), direccion, dtype=np.int8), ALCANCE_OMNI)
+            self._revelar_rayo(idx[lejana], self.direcciones[idx[lejana]], ALCANCE_VISION_LEJANA)
+
+            # Visión normal: solo la celda frontal, aunque sea pared
+            idx_normal = idx[normal]
+            d = self.direcciones[idx_normal]
+            self._revelar(idx_normal, self.filas[idx_normal] + DELTA_FILA[d], self.columnas[idx_normal] + DELTA_COLUMNA[d])
+
+        # La visión omni se consume al sensar
+        usada = idx[self.vision_omni_activada[idx]]
+        self.vision_omni_activada[usada] = False
+        self.cooldown_omni[usada] = COOLDOWN_OMNI
+
+        resultado = np.zeros(self.n, dtype=bool)
+        resultado[idx] = self._distancia_libre(idx, self.direcciones[idx]) > 0
+        return resultado
+
+    def activar_omni(self, mascara=None):
+        """Equivale a pulsar 'O': activa la visión omni y sensa de inmediato si está disponible"""
+        idx = self._indices(mascara)
+        idx = idx[self.vision_omni[idx] & (self.cooldown_omni[idx] == 0) & ~self.vision_omni_activada[idx]]
+        self.vision_omni_activada[idx] = True
+        self.sensar(idx)
+        exito = np.zeros(self.n, dtype=bool)
+        exito[idx] = True
+        return exito
+
+    def actualizar_cooldown(self):
+        """Descuenta un turno del cooldown de la visión omni"""
+        np.subtract(self.cooldown_omni, 1, out=self.cooldown_omni, where=self.cooldown_omni > 0)
+
+    def paso(self, acciones):
+        """
+        Aplica una acción por agente (códigos de codigos.ACCIONES, NINGUNA para no actuar).
+        Devuelve un arreglo booleano: si la acción tuvo efecto o, para sensar, si hay camino libre.
+        """
+        acciones = np.asarray(acciones)
+        exito = np.zeros(self.n, dtype=bool)
+        for codigo, metodo in ((GIRAR_IZQUIERDA, self.girar_izquierda),
+                               (GIRAR_DERECHA, self.girar_derecha),
+                               (AVANZAR, self.avanzar),
+                               (SENSAR, self.sensar),
+                               (VISION_OMNI, self.activar_omni)):
+            mascara = acciones == codigo
+            if mascara.any():
+                exito |= metodo(mascara)
+        return exito
+
+    def es_objetivo(self, fila, columna, direccion=None):
+        """Qué agentes están en el objetivo (si se da la dirección, también debe coincidir, como en Estado)"""
+        en_objetivo = (self.filas == fila) & (self.columnas == columna)
+        if direccion is not None:
+            en_objetivo &= self.direcciones == CODIGO_DIRECCION.get(direccion, direccion)
+        return en_objetivo
@@ -0,0 +1,32 @@
+import numpy as np
+
+from main import Agente, Estado, Problema, RenderizadorIncremental, pygame
+
+
+def _renderizador(laberinto, estado):
+    pygame.font.init()
+    pygame.display.set_mode((1, 1))
+    problema = Problema(estado, [Estado(0, 0)], laberinto, Agente('prueba', {}))
+    renderizador = RenderizadorIncremental(laberinto, pygame.Surface((1400, 800)), pygame.font.SysFont(None, 24),
+                                           40, (1100, 576))
+    return renderizador, problema
+
+
+def test_alejar_en_la_esquina_no_se_sale_del_mapa():
+    laberinto = np.ones((300, 300), dtype=np.int64)
+    estado = Estado(295, 295)
+    renderizador, problema = _renderizador(laberinto, estado)
+    renderizador.dibujar(estado, problema)
+    for cell_size in (32, 24, 16):
+        renderizador.zoom(cell_size)
+        renderizador.dibujar(estado, problema)
+        fila, columna = renderizador.camara
+        assert 0 <= fila <= 300 - renderizador.filas_vista
+        assert 0 <= columna <= 300 - renderizador.columnas_vista
+        assert fila <= 295 < fila + renderizador.filas_vista
+        assert columna <= 295 < columna + renderizador.columnas_vista
+
+
+def test_eje_sin_cambios_se_ajusta_al_mapa():
+    # El agente está dentro de los márgenes, pero la vista (de 34) ya no cabe a partir de 286
+    assert RenderizadorIncremental._eje(295, 286, 34, 300) == 266
@@ -0,0 +1,37 @@
+import gc
+import tracemalloc
+
+import numpy as np
+
+from campos_distancia import CacheCamposDistancia
+from generador import generar
+from main import Estado
+from planificador import Planificador
+
+
+def test_nbytes_cuenta_todo_lo_que_retiene_el_campo():
+    laberinto = generar('cuevas', 201, 201, 0)
+    cache = CacheCamposDistancia()
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.get_traced_memory()[0]
+        campo = cache.obtener(laberinto, (100, 100, 0), {}, solo_posicion=True)
+        gc.collect()
+        retenido = tracemalloc.get_traced_memory()[0] - antes
+    finally:
+        tracemalloc.stop()
+    assert retenido <= 1.1 * campo.nbytes
+    assert not hasattr(campo, 'planificador')
+
+
+def test_inicio_en_montana():
+    laberinto = np.ones((5, 5), dtype=np.int64)
+    laberinto[1:4, 1:4] = 0
+    laberinto[2, 2] = 5
+    laberinto[2, 1] = 1
+    campo = CacheCamposDistancia().obtener(laberinto, (0, 0, 0), {}, solo_posicion=True)
+    inicio = Estado(2, 2, 'arriba')
+    plan = Planificador(laberinto, {}).buscar(inicio, [Estado(0, 0)], 'dijkstra', solo_posicion=True)
+    assert campo.distancia_desde(inicio) == plan.costo
+    assert campo.siguiente_accion(inicio) == plan.acciones[0]
+    assert campo.distancia_desde(Estado(1, 1)) is None  # Pared
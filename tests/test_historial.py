@@ -0,0 +1,27 @@
+import numpy as np
+
+from historial import HistorialDecisiones, VENTANA_ARCHIVO, leer_registro
+
+
+def test_con_archivo_la_memoria_queda_acotada(tmp_path):
+    ruta = tmp_path / 'decisiones.log'
+    total = 2 * VENTANA_ARCHIVO + 123
+    with HistorialDecisiones(archivo=ruta) as historial:
+        for i in range(total):
+            historial.registrar(i % 1000, i // 1000, i & 3, 'avanzar', 'Camino libre' if i % 2 else object())
+            assert historial.capacidad <= VENTANA_ARCHIVO
+        assert all(len(columna) <= VENTANA_ARCHIVO for columna in historial.columnas.values())
+        assert len(historial.otros) <= VENTANA_ARCHIVO
+        assert len(historial) == total
+        assert historial[total - 1]['estado'] == ((total - 1) % 1000, (total - 1) // 1000, 'abajo')
+
+    registros = leer_registro(ruta)
+    assert len(registros) == total
+    assert np.array_equal(registros['fila'], np.arange(total) % 1000)
+
+
+def test_sin_archivo_ni_limite_crece():
+    historial = HistorialDecisiones(capacidad=4)
+    for i in range(10):
+        historial.registrar(0, i, 0, 'girar_izquierda', None)
+    assert historial.capacidad >= 10 and historial[0]['estado'] == (0, 0, 'arriba')
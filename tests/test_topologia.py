@@ -0,0 +1,45 @@
+import numpy as np
+
+from generador import generar
+from main import Agente, Estado, Problema
+from planificador import Planificador
+from topologia import planificar_en_grafo
+
+
+def _comparar(laberinto, inicio, objetivo, habilidades=None, costos='terreno', solo_posicion=False):
+    problema = Problema(inicio, [objetivo], laberinto, Agente('prueba', habilidades or {}))
+    grafo = planificar_en_grafo(problema, costos, solo_posicion)
+    celdas = Planificador(laberinto, habilidades or {}).buscar(inicio, [objetivo], 'dijkstra', costos,
+                                                                solo_posicion=solo_posicion)
+    assert grafo.costo == celdas.costo
+    if grafo.encontrado:
+        estado = inicio
+        for accion in grafo.acciones:
+            estado = getattr(problema, accion)(estado)
+        assert (estado.fila, estado.columna) == (objetivo.fila, objetivo.columna)
+    return grafo
+
+
+def test_inicio_en_montana():
+    laberinto = np.ones((5, 5), dtype=np.int64)
+    laberinto[1:4, 1:4] = 0
+    laberinto[2, 2] = 5
+    laberinto[2, 1] = 1
+    assert _comparar(laberinto, Estado(2, 2), Estado(0, 0), solo_posicion=True).encontrado
+
+
+def test_inicio_en_montana_al_azar():
+    rng = np.random.default_rng(0)
+    perfiles = [{}, {'puede_girar_izquierda': False}, {'puede_girar_izquierda': False, 'puede_girar_derecha': False}]
+    for semilla in range(60):
+        laberinto = generar(('cuevas', 'bucles')[semilla % 2], 15, 17, semilla)
+        laberinto[(rng.random(laberinto.shape) < 0.08) & (laberinto != 0)] = 5
+        montanas, libres = np.argwhere(laberinto == 5), np.argwhere((laberinto != 0) & (laberinto != 5))
+        if not len(montanas) or not len(libres):
+            continue
+        fila, columna = montanas[rng.integers(len(montanas))].tolist()
+        fila_objetivo, columna_objetivo = libres[rng.integers(len(libres))].tolist()
+        for costos in ('terreno', 'unitario'):
+            _comparar(laberinto, Estado(fila, columna, int(rng.integers(4))),
+                      Estado(fila_objetivo, columna_objetivo, int(rng.integers(4))),
+                      perfiles[semilla % 3], costos, bool(semilla % 2))
@@ -0,0 +1,462 @@
+import heapq
+import time
+
+import numpy as np
+
+from codigos import (ACCIONES, DIRECCIONES, CODIGO_DIRECCION, DELTA_FILA, DELTA_COLUMNA, AVANZAR, GIRAR_IZQUIERDA,
+                     GIRAR_DERECHA, celdas_transitables)
+from recorrido import TablasRecorrido
+from planificador import COSTO_TERRENO, INFINITO, ResultadoPlan
+
+# %% Vecindad
+# vecinas[celda]: bit d a 1 si se puede pasar a la celda vecina en la dirección d (0 para pared y montaña).
+# El grado (número de vecinas transitables) clasifica cada celda transitable:
+AISLADA, CALLEJON, PASILLO = 0, 1, 2  # Grado 3 o 4: unión
+GRADO = np.array([bin(m).count('1') for m in range(16)], dtype=np.uint8)
+
+
+def _otra_salida():
+    """OTRA_SALIDA[m, d]: en una celda de pasillo con vecinas m, la salida que no es d (-1 si no es pasillo)"""
+    tabla = np.full((16, 4), -1, dtype=np.int8)
+    for m in range(16):
+        if GRADO[m] == 2:
+            for d in range(4):
+                if m >> d & 1:
+                    tabla[m, d] = (m & ~(1 << d)).bit_length() - 1
+    return tabla
+
+
+OTRA_SALIDA = _otra_salida()
+
+
+def vecinas_de(tablas, transitable):
+    """Máscara de vecinas transitables de todas las celdas (aplanada), a partir de las tablas de recorrido"""
+    libre = tablas.libre.reshape(4, -1)
+    vecinas = np.zeros(libre.shape[1], dtype=np.uint8)
+    for d in range(4):
+        vecinas |= (libre[d] > 0).astype(np.uint8) << d
+    vecinas[~transitable.ravel()] = 0
+    return vecinas
+
+
+# %% Índice
+class IndiceTopologico:
+    """
+    Grafo de uniones del laberinto: los pasillos se contraen en aristas con peso.
+
+    Los nodos son las celdas transitables que no son pasillo (uniones, callejones sin salida y celdas
+    aisladas), más una celda de cada ciclo formado solo por pasillo. Desde cada nodo y en cada dirección
+    transitable sale una arista que sigue el pasillo hasta el siguiente nodo y guarda: celda de destino,
+    dirección de llegada, coste de terreno de las celdas en las que se entra, número de celdas y número
+    de curvas a la izquierda y a la derecha (cada curva es un giro del agente).
+
+    Las aristas viven en arreglos (nodos x 4) y el índice de nodo de cada celda en un arreglo del tamaño
+    del mapa. actualizar_celda corrige solo los nodos cuyos pasillos pasan por la zona editada.
+    """
+
+    def __init__(self, laberinto, tablas=None):
+        self.laberinto = np.asarray(laberinto)
+        self.alto, self.ancho = self.laberinto.shape
+        self.tablas = tablas if tablas is not None else TablasRecorrido(self.laberinto)
+        self.tipo_celda = np.int32 if self.laberinto.size < np.iinfo(np.int32).max else np.int64
+        self._paso_celda = DELTA_FILA * self.ancho + DELTA_COLUMNA
+        self.reconstruir()
+
+    # %% Construcción
+    def reconstruir(self):
+        """Recalcula el grafo completo"""
+        transitable = celdas_transitables(self.laberinto)
+        self.vecinas = vecinas_de(self.tablas, transitable)
+        self._costo_celda = COSTO_TERRENO[np.clip(self.laberinto, 0, 5)].ravel()
+
+        es_nodo = transitable.ravel() & (GRADO[self.vecinas] != PASILLO)
+        celdas = np.flatnonzero(es_nodo)
+        self.nodo_de = np.full(self.laberinto.size, -1, dtype=self.tipo_celda)
+        self._reservar(len(celdas))
+        self.nodos = 0
+        self._agregar_nodos(celdas)
+
+        visitada = self._recorrer_todos(celdas)
+        # Ciclos de pasillo sin ningún nodo: una celda de cada uno pasa a ser nodo
+        sueltas = np.flatnonzero(transitable.ravel() & ~es_nodo & ~visitada)
+        for celda in sueltas.tolist():
+            if not visitada[celda]:
+                nodo = self._agregar_nodos([celda])
+                for d in self.salidas(celda):
+                    self._guardar_arista(nodo, d, self.recorrer(celda, d, visitada=visitada))
+
+    def _reservar(self, capacidad):
+        capacidad = max(capacidad, 16)
+        self.celda_nodo = np.full(capacidad, -1, dtype=np.int64)
+        self.destino = np.full((capacidad, 4), -1, dtype=self.tipo_celda)  # Celda del nodo de destino
+        self.llegada = np.zeros((capacidad, 4), dtype=np.int8)  # Dirección con la que se llega
+        self.costo = np.zeros((capacidad, 4), dtype=np.int32)  # Terreno de las celdas en las que se entra
+        self.largo = np.zeros((capacidad, 4), dtype=np.int32)  # Celdas recorridas
+        self.curvas_izquierda = np.zeros((capacidad, 4), dtype=np.int32)
+        self.curvas_derecha = np.zeros((capacidad, 4), dtype=np.int32)
+
+    def _agregar_nodos(self, celdas):
+        """Da índice de nodo a las celdas (sin aristas todavía); devuelve el primero"""
+        celdas = np.asarray(celdas, dtype=np.int64)
+        primero, fin = self.nodos, self.nodos + len(celdas)
+        if fin > len(self.celda_nodo):
+            self._crecer(fin)
+        self.celda_nodo[primero:fin] = celdas
+        self.nodo_de[celdas] = np.arange(primero, fin)
+        self.nodos = fin
+        return primero
+
+    def _crecer(self, minimo):
+        capacidad = max(minimo, 2 * len(self.celda_nodo))
+        for nombre in ('celda_nodo', 'destino', 'llegada', 'costo', 'largo', 'curvas_izquierda', 'curvas_derecha'):
+            viejo = getattr(self, nombre)
+            nuevo = np.full((capacidad,) + viejo.shape[1:], -1 if nombre in ('celda_nodo', 'destino') else 0,
+                            dtype=viejo.dtype)
+            nuevo[:len(viejo)] = viejo
+            setattr(self, nombre, nuevo)
+
+    def _recorrer_todos(self, celdas):
+        """
+        Sigue a la vez todos los pasillos que salen de los nodos: en cada iteración avanzan una celda
+        todos los recorridos que aún no llegaron a un nodo. Devuelve qué celdas de pasillo se visitaron.
+        """
+        visitada = np.zeros(self.laberinto.size, dtype=bool)
+        nodos = np.repeat(self.nodo_de[celdas].astype(np.int64), 4)
+        direcciones = np.tile(np.arange(4, dtype=np.int64), len(celdas))
+        celda = np.repeat(celdas, 4)
+        salen = (self.vecinas[celda] >> direcciones & 1).astype(bool)
+        nodos, direcciones, celda = nodos[salen], direcciones[salen], celda[salen]
+
+        actual = celda + self._paso_celda[direcciones]
+        direccion = direcciones.copy()
+        costo = self._costo_celda[actual].astype(np.int64)
+        largo = np.ones(len(actual), dtype=np.int64)
+        izquierda = np.zeros(len(actual), dtype=np.int64)
+        derecha = np.zeros(len(actual), dtype=np.int64)
+        activos = np.arange(len(actual))
+
+        while len(activos):
+            llegaron = self.nodo_de[actual[activos]] >= 0
+            fin = activos[llegaron]
+            self.destino[nodos[fin], direcciones[fin]] = actual[fin]
+            self.llegada[nodos[fin], direcciones[fin]] = direccion[fin]
+            self.costo[nodos[fin], direcciones[fin]] = costo[fin]
+            self.largo[nodos[fin], direcciones[fin]] = largo[fin]
+            self.curvas_izquierda[nodos[fin], direcciones[fin]] = izquierda[fin]
+            self.curvas_derecha[nodos[fin], direcciones[fin]] = derecha[fin]
+
+            activos = activos[~llegaron]
+            c = actual[activos]
+            visitada[c] = True
+            nueva = OTRA_SALIDA[self.vecinas[c], (direccion[activos] + 2) & 3].astype(np.int64)
+            giro = (nueva - direccion[activos]) & 3
+            derecha[activos] += giro == 1
+            izquierda[activos] += giro == 3
+            direccion[activos] = nueva
+            actual[activos] = c + self._paso_celda[nueva]
+            costo[activos] += self._costo_celda[actual[activos]]
+            largo[activos] += 1
+        return visitada
+
+    # %% Recorrido de una arista
+    def salidas(self, celda):
+        """Direcciones en las que se puede salir de la celda"""
+        return [d for d in range(4) if self.vecinas[celda] >> d & 1]
+
+    def recorrer(self, celda, direccion, paradas=(), visitada=None):
+        """
+        Sigue el pasillo desde `celda` saliendo en `direccion` hasta un nodo, una celda de `paradas` o
+        la propia celda de partida (ciclo). Devuelve (celda final, dirección de llegada, coste, largo,
+        curvas a la izquierda, curvas a la derecha).
+        """
+        actual = celda + int(self._paso_celda[direccion])
+        costo, largo, izquierda, derecha = int(self._costo_celda[actual]), 1, 0, 0
+        while self.nodo_de[actual] < 0 and actual != celda and actual not in paradas:
+            if visitada is not None:
+                visitada[actual] = True
+            nueva = int(OTRA_SALIDA[self.vecinas[actual], (direccion + 2) & 3])
+            giro = (nueva - direccion) & 3
+            derecha += giro == 1
+            izquierda += giro == 3
+            direccion = nueva
+            actual += int(self._paso_celda[direccion])
+            costo += int(self._costo_celda[actual])
+            largo += 1
+        return actual, direccion, costo, largo, izquierda, derecha
+
+    def _guardar_arista(self, nodo, direccion, arista):
+        destino, llegada, costo, largo, izquierda, derecha = arista
+        self.destino[nodo, direccion] = destino
+        self.llegada[nodo, direccion] = llegada
+        self.costo[nodo, direccion] = costo
+        self.largo[nodo, direccion] = largo
+        self.curvas_izquierda[nodo, direccion] = izquierda
+        self.curvas_derecha[nodo, direccion] = derecha
+
+    def arista(self, nodo, direccion):
+        """Arista precalculada que sale del nodo en `direccion` (mismo formato que recorrer), o None"""
+        if self.destino[nodo, direccion] < 0:
+            return None
+        return (int(self.destino[nodo, direccion]), int(self.llegada[nodo, direccion]),
+                int(self.costo[nodo, direccion]), int(self.largo[nodo, direccion]),
+                int(self.curvas_izquierda[nodo, direccion]), int(self.curvas_derecha[nodo, direccion]))
+
+    def camino(self, celda, direccion, destino):
+        """Celdas por las que pasa el pasillo desde `celda` saliendo en `direccion` hasta `destino`, con la dirección de cada paso"""
+        pasos = []
+        while True:
+            celda += int(self._paso_celda[direccion])
+            pasos.append((celda, direccion))
+            if celda == destino:
+                return pasos
+            direccion = int(OTRA_SALIDA[self.vecinas[celda], (direccion + 2) & 3])
+
+    # %% Actualización incremental
+    def _nodos_alrededor(self, celda):
+        """Nodos cuyas aristas pasan por `celda` o llegan a ella"""
+        if not self.vecinas[celda] and self.nodo_de[celda] < 0:
+            return set()
+        nodo = self.nodo_de[celda]
+        if nodo >= 0:
+            return {int(nodo)} | {int(self.nodo_de[c]) for c in self.destino[nodo].tolist() if c >= 0}
+        return {int(self.nodo_de[self.recorrer(celda, d)[0]]) for d in self.salidas(celda)} - {-1}
+
+    def actualizar_celda(self, fila, columna):
+        """Corrige el grafo tras editar una celda (con las tablas de recorrido ya actualizadas)"""
+        celda = fila * self.ancho + columna
+        zona = [celda] + [celda + int(self._paso_celda[d]) for d in range(4)
+                          if 0 <= fila + DELTA_FILA[d] < self.alto and 0 <= columna + DELTA_COLUMNA[d] < self.ancho]
+        afectados = set()
+        for z in zona:
+            afectados |= self._nodos_alrededor(z)
+
+        # Vecindad, coste y papel de nodo de la zona con el laberinto nuevo
+        self._costo_celda[celda] = COSTO_TERRENO[min(max(int(self.laberinto[fila, columna]), 0), 5)]
+        filas, columnas = np.divmod(np.array(zona), self.ancho)
+        transitable = celdas_transitables(self.laberinto[filas, columnas])
+        libre = self.tablas.libre[:, filas, columnas]
+        for i, z in enumerate(zona):
+            vecinas = sum(1 << d for d in range(4) if libre[d, i] > 0) if transitable[i] else 0
+            self.vecinas[z] = vecinas
+            es_nodo = transitable[i] and GRADO[vecinas] != PASILLO
+            nodo = self.nodo_de[z]
+            if es_nodo and nodo < 0:
+                afectados.add(self._agregar_nodos([z]))
+            elif not es_nodo and nodo >= 0:
+                self.destino[nodo] = -1
+                self.celda_nodo[nodo] = -1  # Queda libre (los índices no se reutilizan)
+                self.nodo_de[z] = -1
+
+        for z in zona:
+            if self.nodo_de[z] < 0 and self.vecinas[z]:
+                # Si el pasillo se cerró en un ciclo sin nodos, esta celda pasa a ser nodo
+                if any(self.recorrer(z, d)[0] == z for d in self.salidas(z)):
+                    afectados.add(self._agregar_nodos([z]))
+                else:
+                    afectados |= self._nodos_alrededor(z)
+
+        for nodo in afectados:
+            celda_nodo = int(self.celda_nodo[nodo])
+            if celda_nodo < 0:
+                continue
+            self.destino[nodo] = -1
+            for d in self.salidas(celda_nodo):
+                self._guardar_arista(nodo, d, self.recorrer(celda_nodo, d))
+
+    # %% Consultas
+    def grado(self, fila, columna):
+        """Número de vecinas transitables (0 también para pared y montaña)"""
+        return int(GRADO[self.vecinas[fila * self.ancho + columna]])
+
+    def es_union(self, fila, columna):
+        return self.grado(fila, columna) > PASILLO
+
+    @property
+    def num_nodos(self):
+        return int((self.celda_nodo[:self.nodos] >= 0).sum())
+
+    @property
+    def num_aristas(self):
+        return int((self.destino[:self.nodos] >= 0).sum())
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.vecinas, self.nodo_de, self.celda_nodo, self.destino, self.llegada,
+                                      self.costo, self.largo, self.curvas_izquierda, self.curvas_derecha))
+
+    def aristas(self):
+        """Todas las aristas como arreglos: celda de origen, dirección de salida, celda de destino, coste y largo"""
+        nodos, direcciones = np.nonzero(self.destino[:self.nodos] >= 0)
+        return (self.celda_nodo[nodos], direcciones, self.destino[nodos, direcciones].astype(np.int64),
+                self.costo[nodos, direcciones], self.largo[nodos, direcciones])
+
+
+# %% Planificación sobre el grafo
+class PlanificadorGrafo:
+    """
+    A* sobre el grafo de uniones con el mismo modelo de costes que planificador.Planificador: el estado es
+    (celda de un nodo, dirección); en un nodo se puede girar y recorrer un pasillo cuesta su terreno (o una
+    acción por celda con costos='unitario') más los giros de sus curvas. Una curva hacia el lado que el
+    agente no puede girar cuesta tres giros hacia el otro. El inicio y los objetivos que caen en mitad de
+    un pasillo se tratan como nodos temporales.
+
+    Solo vale para rango_movimiento 1: con más alcance un avance puede saltarse una unión sin detenerse.
+    """
+
+    def __init__(self, indice, habilidades):
+        if habilidades.get('rango_movimiento', 1) != 1:
+            raise ValueError("El grafo de uniones solo sirve para rango_movimiento 1")
+        self.indice = indice
+        izquierda = habilidades.get('puede_girar_izquierda', True)
+        derecha = habilidades.get('puede_girar_derecha', True)
+        # Giros posibles en un nodo: (código de acción, cambio de dirección)
+        self.giros = [(GIRAR_IZQUIERDA, 3)] * bool(izquierda) + [(GIRAR_DERECHA, 1)] * bool(derecha)
+        # Cómo tomar una curva hacia cada lado: (acción, veces), o None si no se puede
+        self.curva = {
+            1: (GIRAR_DERECHA, 1) if derecha else ((GIRAR_IZQUIERDA, 3) if izquierda else None),
+            3: (GIRAR_IZQUIERDA, 1) if izquierda else ((GIRAR_DERECHA, 3) if derecha else None),
+        }
+
+    def _celda(self, estado):
+        if isinstance(estado, tuple):
+            fila, columna, direccion = estado
+        else:
+            fila, columna, direccion = estado.fila, estado.columna, estado.direccion
+        return fila * self.indice.ancho + columna, CODIGO_DIRECCION.get(direccion, direccion)
+
+    def _costo_arista(self, arista, costos):
+        destino, llegada, costo, largo, izquierda, derecha = arista
+        giros = 0
+        for lado, curvas in ((3, izquierda), (1, derecha)):
+            if curvas:
+                if self.curva[lado] is None:
+                    return None
+                giros += curvas * self.curva[lado][1]
+        return (largo if costos == 'unitario' else costo) + giros
+
+    def buscar(self, inicio, objetivos, costos='terreno', solo_posicion=False):
+        """Devuelve un ResultadoPlan con el mismo coste óptimo que Planificador.buscar"""
+        t0 = time.perf_counter()
+        indice = self.indice
+        ancho = indice.ancho
+        inicial = self._celda(inicio)
+        metas = {self._celda(o) for o in objetivos}
+        if solo_posicion:
+            metas = {(celda, d) for celda, _ in metas for d in range(4)}
+        celdas_meta = np.array(sorted({celda for celda, _ in metas}), dtype=np.int64)
+
+        # Nodos temporales: el inicio y los objetivos que están en mitad de un pasillo. Las aristas
+        # precalculadas que pasan por ellos se recorren de nuevo, deteniéndose en el nodo temporal.
+        paradas = {c for c in celdas_meta.tolist() + [inicial[0]] if indice.nodo_de[c] < 0}
+
+        # Inicio no transitable (montaña): no tiene pasillos, pero el primer avance sale a la celda vecina
+        # libre, como en Problema.avanzar; esas celdas pasan a ser nodos temporales
+        salidas_inicio = {}
+        if indice.nodo_de[inicial[0]] < 0 and not indice.vecinas[inicial[0]]:
+            fila, columna = divmod(inicial[0], ancho)
+            for d in range(4):
+                if indice.tablas.distancia(fila, columna, d) > 0:
+                    celda = inicial[0] + int(indice._paso_celda[d])
+                    salidas_inicio[d] = (celda, d, int(indice._costo_celda[celda]), 1, 0, 0)
+                    if indice.nodo_de[celda] < 0:
+                        paradas.add(celda)
+        cortadas = set()
+        for parada in paradas:
+            for d in indice.salidas(parada):
+                celda, llegada = indice.recorrer(parada, d, paradas)[:2]
+                if celda not in paradas:
+                    cortadas.add((celda, (llegada + 2) & 3))
+
+        def arista(celda, direccion):
+            if celda == inicial[0] and salidas_inicio:
+                return salidas_inicio.get(direccion)
+            if celda in paradas or (celda, direccion) in cortadas:
+                if not indice.vecinas[celda] >> direccion & 1:
+                    return None
+                return indice.recorrer(celda, direccion, paradas)
+            return indice.arista(indice.nodo_de[celda], direccion)
+
+        filas_meta, columnas_meta = np.divmod(celdas_meta, ancho)
+
+        def h(celda):
+            # Cada celda recorrida cuesta al menos 1, también con costes unitarios
+            fila, columna = divmod(celda, ancho)
+            return int(np.min(np.abs(filas_meta - fila) + np.abs(columnas_meta - columna)))
+
+        g = {inicial: 0}
+        padre = {inicial: None}
+        abiertos = [(h(inicial[0]), 0, inicial)]
+        cerrados = set()
+        expandidos = generados = 0
+        while abiertos:
+            _, coste, estado = heapq.heappop(abiertos)
+            if estado in cerrados:
+                continue
+            cerrados.add(estado)
+            expandidos += 1
+            if estado in metas:
+                acciones, estados = self._expandir(padre, estado, arista)
+                return ResultadoPlan('grafo', acciones, estados, coste, expandidos, generados,
+                                     time.perf_counter() - t0)
+
+            celda, direccion = estado
+            vecinos = [((celda, (direccion + giro) & 3), 1, codigo) for codigo, giro in self.giros]
+            siguiente = arista(celda, direccion)
+            if siguiente is not None:
+                costo = self._costo_arista(siguiente, costos)
+                if costo is not None:
+                    vecinos.append(((siguiente[0], siguiente[1]), costo, None))
+            for vecino, costo, accion in vecinos:
+                nuevo = coste + costo
+                if vecino not in cerrados and nuevo < g.get(vecino, INFINITO):
+                    g[vecino] = nuevo
+                    padre[vecino] = (estado, accion)
+                    heapq.heappush(abiertos, (nuevo + h(vecino[0]), nuevo, vecino))
+                    generados += 1
+
+        return ResultadoPlan('grafo', None, None, None, expandidos, generados, time.perf_counter() - t0)
+
+    def _expandir(self, padre, meta, arista):
+        """Convierte el camino en el grafo en las acciones y estados de Problema (pasillos celda a celda)"""
+        pasos = []
+        estado = meta
+        while padre[estado] is not None:
+            previo, accion = padre[estado]
+            pasos.append((previo, accion))
+            estado = previo
+        pasos.reverse()
+
+        ancho = self.indice.ancho
+        celda, direccion = estado
+        acciones = []
+        estados = [(celda // ancho, celda % ancho, DIRECCIONES[direccion])]
+
+        def aplicar(accion, nueva_celda, nueva_direccion):
+            acciones.append(ACCIONES[accion])
+            estados.append((nueva_celda // ancho, nueva_celda % ancho, DIRECCIONES[nueva_direccion]))
+
+        for (celda, direccion), accion in pasos:
+            if accion is not None:
+                aplicar(accion, celda, (direccion + (3 if accion == GIRAR_IZQUIERDA else 1)) & 3)
+                continue
+            for siguiente, nueva in self.indice.camino(celda, direccion, arista(celda, direccion)[0]):
+                if nueva != direccion:  # Curva del pasillo
+                    giro, veces = self.curva[(nueva - direccion) & 3]
+                    for _ in range(veces):
+                        direccion = (direccion + (3 if giro == GIRAR_IZQUIERDA else 1)) & 3
+                        aplicar(giro, celda, direccion)
+                aplicar(AVANZAR, siguiente, direccion)
+                celda = siguiente
+        return acciones, estados
+
+
+def planificar_en_grafo(problema, costos='terreno', solo_posicion=False):
+    """
+    Como planificador.planificar, pero sobre el grafo de uniones del Problema (Problema.topologia).
+    Con rango_movimiento distinto de 1 se usa el Planificador celda a celda.
+    """
+    if problema.agente.habilidades.get('rango_movimiento', 1) != 1:
+        from planificador import planificar
+        return planificar(problema, 'dijkstra', costos, solo_posicion=solo_posicion)
+    planificador = PlanificadorGrafo(problema.topologia, problema.agente.habilidades)
+    return planificador.buscar(problema.estado_inicial, problema.estados_objetivos, costos, solo_posicion)
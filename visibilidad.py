@@ -0,0 +1,190 @@
+import numpy as np
+
+from codigos import DESPLAZAMIENTOS, ARRIBA, ABAJO, IZQUIERDA
+
+# Número de bits a 1 de cada byte, para contar celdas reveladas sin desempaquetar
+_BITS_POR_BYTE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int64)
+# Máscaras de un byte: bits desde la posición k hasta el final y desde el principio hasta k (incluida)
+_DESDE = np.array([0xFF >> k for k in range(8)], dtype=np.uint8)
+_HASTA = np.array([(0xFF << (7 - k)) & 0xFF for k in range(8)], dtype=np.uint8)
+# Los rayos de hasta este largo se revelan celda a celda (más rápido que operar con bloques)
+RAYO_CORTO = 8
+
+
+class _FilaVisible:
+    """Permite seguir usando mapa_visible[fila][columna] para leer y escribir"""
+    __slots__ = ('mapa', 'fila')
+
+    def __init__(self, mapa, fila):
+        self.mapa = mapa
+        self.fila = fila
+
+    def __getitem__(self, columna):
+        return self.mapa[self.fila, columna]
+
+    def __setitem__(self, columna, valor):
+        self.mapa[self.fila, columna] = valor
+
+
+class MapaVisibilidad:
+    """
+    Niebla de guerra con un bit por celda (filas empaquetadas con np.packbits).
+
+    Las operaciones de revelado trabajan sobre bloques: desempaquetan solo los bytes afectados,
+    aplican una máscara y vuelven a empaquetar, contando a la vez cuántas celdas eran nuevas.
+    Así el número de celdas exploradas está siempre al día sin recorrer el mapa.
+    """
+
+    def __init__(self, alto, ancho):
+        self.alto = alto
+        self.ancho = ancho
+        self.bits = np.zeros((alto, (ancho + 7) // 8), dtype=np.uint8)
+        self.reveladas = 0
+
+    @property
+    def shape(self):
+        return self.alto, self.ancho
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    @property
+    def fraccion_explorada(self):
+        return self.reveladas / (self.alto * self.ancho)
+
+    def instantanea(self):
+        """Copia de los bits y del contador, para volver a este punto con restaurar()"""
+        return self.bits.copy(), self.reveladas
+
+    def restaurar(self, instantanea):
+        bits, self.reveladas = instantanea
+        np.copyto(self.bits, bits)
+
+    # %% Celdas sueltas
+    def visible(self, fila, columna):
+        return bool(self.bits[fila, columna >> 3] & (0x80 >> (columna & 7)))
+
+    def revelar(self, fila, columna):
+        """Revela una celda; devuelve True si no estaba revelada"""
+        mascara = 0x80 >> (columna & 7)
+        byte = self.bits[fila, columna >> 3]
+        if byte & mascara:
+            return False
+        self.bits[fila, columna >> 3] = byte | mascara
+        self.reveladas += 1
+        return True
+
+    # %% Regiones
+    def revelar_mascara(self, fila, columna, mascara):
+        """
+        Revela las celdas marcadas en una máscara booleana cuya esquina superior izquierda es (fila, columna).
+        La parte que cae fuera del mapa se ignora. Devuelve cuántas celdas nuevas se revelaron.
+        """
+        mascara = np.asarray(mascara, dtype=bool)
+        # Recortar al mapa
+        f0, c0 = max(fila, 0), max(columna, 0)
+        f1, c1 = min(fila + mascara.shape[0], self.alto), min(columna + mascara.shape[1], self.ancho)
+        if f0 >= f1 or c0 >= c1:
+            return 0
+        mascara = mascara[f0 - fila:f1 - fila, c0 - columna:c1 - columna]
+
+        b0, b1 = c0 >> 3, ((c1 - 1) >> 3) + 1
+        bloque = self.bits[f0:f1, b0:b1]
+        celdas = np.unpackbits(bloque, axis=1)
+        celdas[:, c0 - b0 * 8:c1 - b0 * 8] |= mascara
+        nuevo = np.packbits(celdas, axis=1)
+        nuevas = int(_BITS_POR_BYTE[nuevo & ~bloque].sum())
+        if nuevas:
+            self.bits[f0:f1, b0:b1] = nuevo
+            self.reveladas += nuevas
+        return nuevas
+
+    def revelar_rectangulo(self, fila_min, columna_min, fila_max, columna_max):
+        """Revela el rectángulo de filas [fila_min, fila_max) y columnas [columna_min, columna_max)"""
+        if fila_max <= fila_min or columna_max <= columna_min:
+            return 0
+        return self.revelar_mascara(fila_min, columna_min,
+                                    np.ones((fila_max - fila_min, columna_max - columna_min), dtype=bool))
+
+    def revelar_rayo(self, fila, columna, direccion, n):
+        """
+        Revela las n celdas que hay delante de (fila, columna) en la dirección dada. Los rayos verticales o
+        cortos van celda a celda; los horizontales largos aplican máscaras de byte solo a los bytes que tocan.
+        """
+        if n <= RAYO_CORTO or direccion == ARRIBA or direccion == ABAJO:
+            delta_fila, delta_columna = DESPLAZAMIENTOS[direccion]
+            nuevas = 0
+            for k in range(1, n + 1):
+                f, c = fila + k * delta_fila, columna + k * delta_columna
+                if 0 <= f < self.alto and 0 <= c < self.ancho:
+                    nuevas += self.revelar(f, c)
+            return nuevas
+
+        c0, c1 = (columna - n, columna) if direccion == IZQUIERDA else (columna + 1, columna + 1 + n)
+        c0, c1 = max(c0, 0), min(c1, self.ancho)
+        if not 0 <= fila < self.alto or c0 >= c1:
+            return 0
+        b0, b1 = c0 >> 3, (c1 - 1) >> 3
+        mascara = np.full(b1 - b0 + 1, 0xFF, dtype=np.uint8)
+        mascara[0] = _DESDE[c0 & 7]
+        mascara[-1] &= _HASTA[(c1 - 1) & 7]
+        bloque = self.bits[fila, b0:b1 + 1]
+        nuevas = int(_BITS_POR_BYTE[mascara & ~bloque].sum())
+        if nuevas:
+            bloque |= mascara
+            self.reveladas += nuevas
+        return nuevas
+
+    def revelar_cono(self, fila, columna, direccion, alcance):
+        """Revela un cono de 90 grados delante de (fila, columna): a profundidad k abarca 2k + 1 celdas"""
+        profundidad = np.arange(1, alcance + 1)[:, None]
+        lateral = np.arange(-alcance, alcance + 1)[None, :]
+        cono = np.abs(lateral) <= profundidad  # Filas: profundidad 1..alcance; columnas: desplazamiento lateral
+        if direccion == ARRIBA:
+            return self.revelar_mascara(fila - alcance, columna - alcance, cono[::-1])
+        if direccion == ABAJO:
+            return self.revelar_mascara(fila + 1, columna - alcance, cono)
+        if direccion == IZQUIERDA:
+            return self.revelar_mascara(fila - alcance, columna - alcance, cono.T[:, ::-1])
+        return self.revelar_mascara(fila - alcance, columna + 1, cono.T)
+
+    def revelar_radio(self, fila, columna, radio):
+        """Revela todas las celdas a distancia euclídea <= radio"""
+        desplazamiento = np.arange(-radio, radio + 1)
+        circulo = desplazamiento[:, None] ** 2 + desplazamiento[None, :] ** 2 <= radio * radio
+        return self.revelar_mascara(fila - radio, columna - radio, circulo)
+
+    # %% Lectura
+    def como_arreglo(self, fila_min=0, columna_min=0, fila_max=None, columna_max=None):
+        """Región desempaquetada como uint8 (1 = revelada)"""
+        fila_max = self.alto if fila_max is None else fila_max
+        columna_max = self.ancho if columna_max is None else columna_max
+        b0 = columna_min >> 3
+        celdas = np.unpackbits(self.bits[fila_min:fila_max, b0:(columna_max + 7) >> 3], axis=1)
+        return celdas[:, columna_min - b0 * 8:columna_max - b0 * 8]
+
+    def __array__(self, dtype=None, copy=None):
+        arreglo = self.como_arreglo()
+        return arreglo if dtype is None else arreglo.astype(dtype)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, tuple):
+            fila, columna = indice
+            if isinstance(fila, slice) or isinstance(columna, slice):
+                return self.como_arreglo()[indice]
+            return int(self.visible(fila, columna))
+        return _FilaVisible(self, indice)
+
+    def __setitem__(self, indice, valor):
+        if not valor:
+            raise ValueError("MapaVisibilidad solo permite revelar celdas")
+        fila, columna = indice
+        if isinstance(fila, slice) or isinstance(columna, slice):
+            filas = range(self.alto)[fila] if isinstance(fila, slice) else range(fila, fila + 1)
+            columnas = range(self.ancho)[columna] if isinstance(columna, slice) else range(columna, columna + 1)
+            if filas.step != 1 or columnas.step != 1:
+                raise ValueError("Solo se admiten cortes contiguos")
+            self.revelar_rectangulo(filas.start, columnas.start, filas.stop, columnas.stop)
+        else:
+            self.revelar(fila, columna)